@@ -0,0 +1,196 @@
+# async_learner.py
+# Learner chạy trên thread nền: liên tục gọi DQNAgent.learn trên replay buffer trong khi vòng lặp
+# chính vẫn chạy env. Vòng lặp hành động dùng bản sao suy luận (PolicyInference NumPy) được đồng bộ
+# định kỳ, nên không bao giờ đọc trọng số đang bị optimizer ghi dở.
+#
+# - Transition được gom theo khối ở phía actor rồi ghi vào buffer bằng push_batch, khoá chỉ lấy
+#   một lần mỗi khối; phía learner chỉ giữ khoá trong lúc sample/update_priorities.
+# - replay_ratio (số cập nhật trên mỗi bước env) được giữ bằng cách cho bên chạy nhanh hơn chờ:
+#   learner nghỉ khi đã đủ số cập nhật, actor chờ khi learner tụt lại quá max_lag cập nhật.
+# - Cập nhật target network do learner thực hiện giữa hai lần learn theo yêu cầu của vòng lặp chính.
+# Torch nhả GIL trong forward/backward nên trên CPU nhiều nhân hai bên chạy chồng lên nhau;
+# stats() cho biết mức chồng lấn thực tế. Chế độ này không tái lập bit-for-bit như chế độ đồng bộ.
+
+import threading
+import time
+from time import perf_counter
+
+import numpy as np
+
+from policy_inference import PolicyInference
+
+
+class _LockedReplay:
+    # Bọc replay buffer cho thread learner: sample/update_priorities dùng chung khoá với push theo khối
+    def __init__(self, memory, lock):
+        self.memory = memory
+        self.lock = lock
+
+    def __len__(self):
+        return len(self.memory)
+
+    def sample(self, batch_size):
+        with self.lock:
+            return self.memory.sample(batch_size)
+
+    def update_priorities(self, indices, td_errors):
+        with self.lock:
+            self.memory.update_priorities(indices, td_errors)
+
+    def __getattr__(self, name):
+        return getattr(self.memory, name)
+
+
+class AsyncLearner:
+    def __init__(self, agent, replay_ratio=0.25, sync_every=50, push_chunk=64, max_lag=32):
+        self.agent = agent
+        self.memory = agent.memory
+        self.replay_ratio = replay_ratio
+        self.sync_every = sync_every
+        self.max_lag = max_lag
+        self.lock = threading.Lock()
+        # Learner giữ khoá này trong mỗi lần cập nhật; paused() dùng nó để chụp checkpoint nhất quán
+        self._model_lock = threading.Lock()
+
+        state_size = self.memory.states.shape[1]
+        self._staging = (np.zeros((push_chunk, state_size), dtype=np.float32), np.zeros(push_chunk, dtype=np.int64),
+                         np.zeros((push_chunk, state_size), dtype=np.float32), np.zeros(push_chunk, dtype=np.float32),
+                         np.zeros(push_chunk, dtype=np.float32))
+        self._staged = 0
+
+        self.env_steps = 0
+        self.updates = 0
+        self._start_steps = None
+        # Mỗi bộ đếm chỉ do một thread ghi nên không cần khoá
+        self._target_requests = 0
+        self._target_done = 0
+        self.actor_wait = 0.0
+        self.learner_busy = 0.0
+        self.learner_idle = 0.0
+        self.error = None
+        self._sync()
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='async-learner', daemon=True)
+
+    def start(self):
+        agent = self.agent
+        # PhaseTimer không an toàn giữa hai thread; learner tự đo thời gian bận/chờ
+        agent.timer = None
+        agent.memory = _LockedReplay(self.memory, self.lock)
+        self._started_at = perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.flush()
+        self._stop.set()
+        self._thread.join()
+        self.agent.memory = self.memory
+        self._wall = perf_counter() - self._started_at
+        if self.error is not None:
+            raise self.error
+
+    # --- Phía actor (thread chính) ---
+    def act(self, state):
+        # Giống DQNAgent.choose_action nhưng phần tham lam chạy trên bản sao suy luận
+        agent = self.agent
+        if agent.rng.random() < agent.epsilon:
+            return agent.rng.randrange(agent.action_size)
+        return self.inference.act_one(state)
+
+    def push(self, state, action, next_state, reward, done):
+        if self.error is not None:
+            raise self.error
+        states, actions, next_states, rewards, dones = self._staging
+        k = self._staged
+        states[k] = state
+        actions[k] = action
+        next_states[k] = next_state
+        rewards[k] = reward
+        dones[k] = done
+        self._staged = k + 1
+        if self._staged == len(states):
+            self.flush()
+
+        self.env_steps += 1
+        if self._start_steps is not None and self.updates + self.max_lag < self._budget():
+            start = perf_counter()
+            while self.updates + self.max_lag < self._budget() and self._thread.is_alive():
+                time.sleep(0.0005)
+            self.actor_wait += perf_counter() - start
+
+    def flush(self):
+        k = self._staged
+        if k == 0:
+            return
+        with self.lock:
+            self.memory.push_batch(*(column[:k] for column in self._staging))
+        self._staged = 0
+
+    def end_episode(self):
+        # Ván bị cắt ngang: bỏ các bước n-step còn chờ (sau khi đã đưa hết khối đang gom vào buffer)
+        self.flush()
+        self.memory.end_episode()
+
+    def request_target_update(self):
+        self._target_requests += 1
+
+    def paused(self):
+        # with learner.paused(): ... -- learner dừng giữa hai lần cập nhật, buffer đã nhận mọi transition
+        self.flush()
+        return self._model_lock
+
+    def snapshot_state_dict(self):
+        # Trọng số của bản sao suy luận gần nhất; an toàn để lưu trong khi learner vẫn chạy
+        return self.inference.net.state_dict()
+
+    # --- Phía learner (thread nền) ---
+    def _budget(self):
+        return self.replay_ratio * (self.env_steps - self._start_steps)
+
+    def _sync(self):
+        # PolicyInference tự chép và đóng băng policy_net
+        self.inference = PolicyInference(self.agent.policy_net, backend='numpy')
+
+    def _run(self):
+        agent = self.agent
+        try:
+            while not self._stop.is_set():
+                if self._target_done < self._target_requests:
+                    self._target_done += 1
+                    with self._model_lock:
+                        agent.update_target_net()
+                if self._start_steps is None:
+                    if len(self.memory) < agent.batch_size:
+                        time.sleep(0.001)
+                        continue
+                    self._start_steps = self.env_steps
+                if self.updates >= self._budget():
+                    start = perf_counter()
+                    time.sleep(0.0005)
+                    self.learner_idle += perf_counter() - start
+                    continue
+
+                start = perf_counter()
+                with self._model_lock:
+                    agent.learn()
+                self.updates += 1
+                if self.updates % self.sync_every == 0:
+                    self._sync()
+                self.learner_busy += perf_counter() - start
+        except Exception as e:
+            self.error = e
+
+    def stats(self):
+        wall = (self._wall if self._stop.is_set() else perf_counter() - self._started_at) or 1e-9
+        steps_after_start = self.env_steps - self._start_steps if self._start_steps is not None else 0
+        return {
+            'async_updates': self.updates,
+            'async_replay_ratio': self.updates / steps_after_start if steps_after_start else 0.0,
+            'async_learner_busy_frac': self.learner_busy / wall,
+            'async_learner_idle_frac': self.learner_idle / wall,
+            'async_actor_wait_frac': self.actor_wait / wall,
+            # Tổng thời gian làm việc của hai bên chia cho thời gian thực: > 1 nghĩa là có chồng lấn
+            'async_concurrency': (wall - self.actor_wait + self.learner_busy) / wall,
+        }
@@ -0,0 +1,98 @@
+# benchmarks/bench_compact_model.py
+# So sánh các cách nạp model để chơi: DQNAgent + .pth (cách main.py cũ), PolicyInference + .pth và
+# CompactPolicy với file gọn fp16/int8 (compact_policy.py). Mỗi trường hợp chạy trong một tiến trình
+# mới để đo thời gian khởi động (từ lúc tạo tiến trình tới hành động đầu tiên, gồm cả import), bộ nhớ
+# thường trú (RSS) và độ trễ chọn một hành động p50/p99.
+#
+#   python benchmarks/bench_compact_model.py --model dqn_rapid_roll_best.pth
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL = os.path.join(ROOT, 'dqn_rapid_roll_best.pth')
+CASES = ('DQNAgent .pth', 'PolicyInference .pth', 'CompactPolicy fp16', 'CompactPolicy int8')
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+
+def run_child(case, path, samples):
+    # Chỉ import những gì cách nạp đó cần, rồi chọn hành động đầu tiên
+    sys.path.insert(0, ROOT)
+    if case == 'DQNAgent .pth':
+        import torch
+        from dqn_agent import DQNAgent
+        agent = DQNAgent(6, 3)
+        agent.policy_net.load_state_dict(torch.load(path, map_location=agent.device))
+        agent.policy_net.eval()
+        agent.epsilon = 0.0
+        act = agent.choose_action
+    else:
+        from compact_policy import load_policy
+        act = load_policy(path).act_one
+    import numpy as np
+    state = np.random.default_rng(0).random(6, dtype=np.float32)
+    act(state)
+    ready = time.time()
+    rss = rss_mb()
+    uses_torch = 'torch' in sys.modules
+
+    sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+    from run_benchmarks import measure_latency
+    latency = measure_latency(lambda: act(state), samples=samples)
+    print(json.dumps({'ready': ready, 'rss': rss, 'p50': latency['us_per_op'], 'p99': latency['us_p99'],
+                      'torch': uses_torch}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--repeats', type=int, default=5, help='Số lần khởi động mỗi trường hợp (báo trung vị)')
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--child', nargs=2, metavar=('CASE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child, args.samples)
+        return
+
+    sys.path.insert(0, ROOT)
+    import torch
+    from compact_policy import export_compact
+    from dqn_agent import QNetwork
+    directory = tempfile.mkdtemp(prefix='compact_model_bench_')
+    net = QNetwork.from_state_dict(torch.load(args.model, map_location='cpu'))
+    paths = {'DQNAgent .pth': args.model, 'PolicyInference .pth': args.model}
+    for fmt in ('fp16', 'int8'):
+        paths[f'CompactPolicy {fmt}'] = os.path.join(directory, f'model.{fmt}.npz')
+        export_compact(net, paths[f'CompactPolicy {fmt}'], fmt)
+
+    env = dict(os.environ, OMP_NUM_THREADS='1', MKL_NUM_THREADS='1', OPENBLAS_NUM_THREADS='1')
+    print(f"{'':22s} {'file':>9} {'khởi động':>10} {'RSS':>9} {'p50':>9} {'p99':>9}  torch")
+    for case in CASES:
+        runs = []
+        for _ in range(args.repeats):
+            launch = time.time()
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', case, paths[case],
+                                  '--samples', str(args.samples)], env=env, capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            result['startup'] = result['ready'] - launch
+            runs.append(result)
+        median = {key: sorted(r[key] for r in runs)[len(runs) // 2] for key in ('startup', 'rss', 'p50', 'p99')}
+        print(f"{case:22s} {os.path.getsize(paths[case]) / 1024:7.1f}KB {median['startup'] * 1000:8.0f}ms "
+              f"{median['rss']:7.1f}MB {median['p50']:7.1f}us {median['p99']:7.1f}us  {'có' if runs[0]['torch'] else 'không'}")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
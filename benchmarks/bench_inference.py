@@ -0,0 +1,57 @@
+# benchmarks/bench_inference.py
+# Độ trễ p50/p99 của DQNAgent.choose_action so với PolicyInference (các backend), batch 1 và theo batch.
+
+import argparse
+import os
+import sys
+import warnings
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_agent import DQNAgent
+from policy_inference import PolicyInference
+from run_benchmarks import measure_latency, STATE_SIZE, ACTION_SIZE
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dqn_rapid_roll_best.pth')
+
+
+def report(name, result, batch_size=1):
+    per_state = result['us_per_op'] / batch_size
+    print(f"{name:40s} p50 {result['us_per_op']:9.1f} us | p99 {result['us_p99']:9.1f} us | {per_state:8.2f} us/state")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[16, 256])
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+    warnings.filterwarnings('ignore')
+    rng = np.random.default_rng(args.seed)
+
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, memory_size=1)
+    agent.policy_net.load_state_dict(torch.load(args.model, map_location=agent.device))
+    agent.policy_net.eval()
+    agent.epsilon = 0.0
+    state = rng.random(STATE_SIZE, dtype=np.float32)
+    report('DQNAgent.choose_action', measure_latency(lambda: agent.choose_action(state), samples=args.samples))
+
+    engines = {backend: PolicyInference.load(args.model, backend=backend, seed=args.seed)
+               for backend in ('torch', 'torchscript', 'numpy')}
+    for backend, engine in engines.items():
+        report(f"PolicyInference[{backend}].act_one", measure_latency(lambda: engine.act_one(state), samples=args.samples))
+
+    for batch_size in args.batch_sizes:
+        states = rng.random((batch_size, STATE_SIZE), dtype=np.float32)
+
+        def loop_choose_action():
+            for s in states:
+                agent.choose_action(s)
+        report(f"choose_action x{batch_size} (loop)", measure_latency(loop_choose_action, samples=max(50, args.samples // batch_size)), batch_size)
+        for backend, engine in engines.items():
+            report(f"PolicyInference[{backend}].act B={batch_size}",
+                   measure_latency(lambda: engine.act(states, epsilon=0.05), samples=args.samples // 4), batch_size)
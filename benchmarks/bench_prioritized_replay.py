@@ -0,0 +1,58 @@
+# benchmarks/bench_prioritized_replay.py
+# Đo chi phí push / sample / update_priorities của PrioritizedReplayMemory so với ReplayMemory.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_agent import ReplayMemory, PrioritizedReplayMemory
+
+
+def time_us(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def fill(memory, capacity, rng, chunk=100000):
+    for start in range(0, capacity, chunk):
+        n = min(chunk, capacity - start)
+        states = rng.random((n, 6), dtype=np.float32)
+        memory.push_batch(states, rng.integers(0, 3, n), states, rng.random(n, dtype=np.float32), rng.random(n) < 0.01)
+
+
+def bench(memory_cls, capacity, batch_size, repeats, rng):
+    memory = memory_cls(capacity)
+    fill(memory, capacity, rng)
+    state = rng.random(6, dtype=np.float32)
+    results = {
+        'push': time_us(lambda: memory.push(state, 1, state, 0.1, False), repeats),
+        'sample': time_us(lambda: memory.sample(batch_size), repeats),
+    }
+    if isinstance(memory, PrioritizedReplayMemory):
+        indices = rng.integers(0, capacity, batch_size)
+        td_errors = rng.random(batch_size, dtype=np.float32)
+        results['update'] = time_us(lambda: memory.update_priorities(indices, td_errors), repeats)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--capacities', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--repeats', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    for capacity in args.capacities:
+        for memory_cls in (ReplayMemory, PrioritizedReplayMemory):
+            results = bench(memory_cls, capacity, args.batch_size, args.repeats, np.random.default_rng(args.seed))
+            cols = ' | '.join(f"{k}: {v:8.1f} us" for k, v in results.items())
+            print(f"{memory_cls.__name__:24s} cap={capacity:>8d} | {cols}")
@@ -0,0 +1,88 @@
+# benchmarks/bench_replay_memmap.py
+# So sánh ReplayMemory (RAM) với MemmapReplayMemory (numpy.memmap trên đĩa): độ trễ sample p50/p99 và
+# bộ nhớ thường trú (RSS, tách phần ẩn danh và phần ánh xạ file) ở các dung lượng lớn. RSS được đo sau
+# 10 / 100 / --samples lần sample, vì với memmap nó tăng theo số trang đã chạm tới, không theo dung lượng.
+# Mỗi trường hợp chạy trong một tiến trình riêng để RSS không lẫn nhau; "memmap-reader" là tiến trình
+# khác mở readonly buffer do "memmap" vừa ghi (như worker huấn luyện offline).
+#
+#   python benchmarks/bench_replay_memmap.py --capacities 1000000 10000000 --dir /tmp/replay_bench
+
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn_agent import ReplayMemory, MemmapReplayMemory
+from run_benchmarks import measure_latency, STATE_SIZE, ACTION_SIZE
+
+
+def rss_mb():
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                values[key] = int(rest.split()[0]) / 1024
+    return values
+
+
+def fill(memory, capacity, seed, chunk=100000):
+    rng = np.random.default_rng(seed)
+    for start in range(0, capacity, chunk):
+        n = min(chunk, capacity - start)
+        states = rng.random((n, STATE_SIZE), dtype=np.float32)
+        memory.push_batch(states, rng.integers(0, ACTION_SIZE, n), states, rng.random(n, dtype=np.float32), rng.random(n) < 0.01)
+
+
+def run_case(backend, capacity, directory, batch_size, samples, seed):
+    torch.set_num_threads(1)
+    before = rss_mb()
+    if backend == 'ram':
+        memory = ReplayMemory(capacity, STATE_SIZE, seed=seed)
+        fill(memory, capacity, seed)
+    elif backend == 'memmap':
+        shutil.rmtree(directory, ignore_errors=True)
+        memory = MemmapReplayMemory(directory, capacity, STATE_SIZE, seed=seed)
+        fill(memory, capacity, seed)
+        memory.flush()
+    else:
+        memory = MemmapReplayMemory(directory, capacity, STATE_SIZE, seed=seed, readonly=True)
+    # RSS sau tổng cộng 10 rồi 100 lần sample
+    rss = {}
+    sampled = 0
+    for total_samples in (10, 100):
+        for _ in range(total_samples - sampled):
+            memory.sample(batch_size)
+        sampled = total_samples
+        rss[total_samples] = rss_mb()['VmRSS'] - before['VmRSS']
+    latency = measure_latency(lambda: memory.sample(batch_size), warmup=0, samples=samples)
+    after = rss_mb()
+    rss[samples + 100] = after['VmRSS'] - before['VmRSS']
+    return {'p50': latency['us_per_op'], 'p99': latency['us_p99'], 'rss': rss,
+            'anon': after['RssAnon'] - before['RssAnon'], 'file': after['RssFile'] - before['RssFile']}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--capacities', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--dir', default=os.path.join('/tmp', 'replay_memmap_bench'))
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ctx = mp.get_context('spawn')
+    print(f"batch {args.batch_size}, {args.samples} lần sample; RSS là phần tăng thêm (MB)")
+    for capacity in args.capacities:
+        for backend in ('ram', 'memmap', 'memmap-reader'):
+            with ctx.Pool(1) as pool:
+                r = pool.apply(run_case, (backend, capacity, args.dir, args.batch_size, args.samples, args.seed))
+            rss = ' / '.join(f"{mb:6.1f}" for mb in r['rss'].values())
+            print(f"{backend:14s} cap={capacity:>9d} | sample p50 {r['p50']:6.1f} us p99 {r['p99']:6.1f} us | "
+                  f"RSS sau {'/'.join(map(str, r['rss']))} lần: {rss} MB (cuối: ẩn danh {r['anon']:.1f}, file {r['file']:.1f})")
+    shutil.rmtree(args.dir, ignore_errors=True)
@@ -0,0 +1,51 @@
+# benchmarks/bench_vector_env.py
+# So sánh env-steps/giây giữa VectorRapidRollEnv và vòng lặp qua N RapidRollEnv.
+# Mỗi cấu hình đo --repeats lần và lấy lần nhanh nhất (ít nhiễu do tải máy nhất).
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rapid_roll_env import RapidRollEnv
+from vector_env import VectorRapidRollEnv
+
+
+def bench_scalar(num_envs, num_steps, seed):
+    rng = np.random.default_rng(seed)
+    envs = [RapidRollEnv(headless=True, seed=seed + i) for i in range(num_envs)]
+    actions = rng.integers(0, 3, size=(num_steps, num_envs))
+    start = time.perf_counter()
+    for t in range(num_steps):
+        for env, action in zip(envs, actions[t]):
+            _, _, done, _ = env.step(action)
+            if done:
+                env.reset()
+    return num_envs * num_steps / (time.perf_counter() - start)
+
+
+def bench_vector(num_envs, num_steps, seed):
+    rng = np.random.default_rng(seed)
+    venv = VectorRapidRollEnv(num_envs, seed=seed)
+    actions = rng.integers(0, 3, size=(num_steps, num_envs))
+    start = time.perf_counter()
+    for t in range(num_steps):
+        venv.step(actions[t])
+    return num_envs * num_steps / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-envs', type=int, nargs='+', default=[16, 64, 128, 256, 1024])
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.num_envs:
+        scalar = max(bench_scalar(n, args.steps, args.seed) for _ in range(args.repeats))
+        vector = max(bench_vector(n, args.steps, args.seed) for _ in range(args.repeats))
+        print(f"N={n:4d} | scalar: {scalar:10.0f} steps/s | vector: {vector:10.0f} steps/s | x{vector / scalar:.1f}")
@@ -0,0 +1,290 @@
+# benchmarks/run_benchmarks.py
+# Bộ benchmark cho các đường nóng: env, replay buffer, learner và suy luận.
+# Kết quả ghi ra JSON; nếu có baseline thì so sánh và báo regression vượt ngưỡng (exit code 1).
+# Baseline phụ thuộc máy đo: hãy tạo lại bằng --save-baseline trên máy dùng để so sánh.
+#
+#   python benchmarks/run_benchmarks.py                       # chạy và so với benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --save-baseline       # ghi kết quả làm baseline mới
+#   python benchmarks/run_benchmarks.py --only replay learn   # chỉ chạy các benchmark có tên chứa chuỗi này
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from rapid_roll_env import RapidRollEnv
+from vector_env import VectorRapidRollEnv
+from dqn_agent import DQNAgent, ReplayMemory
+from policy_inference import PolicyInference
+
+STATE_SIZE = 6
+ACTION_SIZE = 3
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def measure(fn, ops_per_call=1, warmup=50, rounds=7, min_round_time=0.1):
+    # Đo thời gian mỗi thao tác (us): chạy warm-up rồi nhiều vòng. So sánh baseline dùng vòng nhanh
+    # nhất (ít nhiễu nhất do tải máy), trung vị để báo cáo
+    for _ in range(warmup):
+        fn()
+    # Chọn số lời gọi mỗi vòng sao cho một vòng kéo dài khoảng min_round_time
+    calls = 1
+    while calls < 1 << 20:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time:
+            break
+        calls = min(1 << 20, calls * 2 if elapsed == 0 else int(calls * min_round_time / elapsed) + 1)
+    per_op = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        per_op.append((time.perf_counter() - start) / (calls * ops_per_call) * 1e6)
+    per_op.sort()
+    return {'us_per_op': per_op[len(per_op) // 2], 'us_per_op_min': per_op[0], 'us_per_op_max': per_op[-1],
+            'ops_per_sec': 1e6 / per_op[len(per_op) // 2]}
+
+
+def measure_latency(fn, warmup=200, samples=5000):
+    # Đo độ trễ từng lời gọi để lấy p50/p99 (dùng cho suy luận batch 1)
+    for _ in range(warmup):
+        fn()
+    times = np.empty(samples)
+    for i in range(samples):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    times *= 1e6
+    return {'us_per_op': float(np.percentile(times, 50)), 'us_p99': float(np.percentile(times, 99)),
+            'ops_per_sec': 1e6 / float(np.percentile(times, 50))}
+
+
+# --- Các benchmark: mỗi hàm nhận seed và trả về dict kết quả ---
+
+def bench_env_step(frame_skip=1):
+    # Với frame_skip > 1 mỗi op là một lần step gồm frame_skip frame vật lý
+    def run(seed):
+        seed_everything(seed)
+        env = RapidRollEnv(headless=True, seed=seed, frame_skip=frame_skip)
+        actions = np.random.default_rng(seed).integers(0, ACTION_SIZE, 4096).tolist()
+        it = iter(())
+
+        def step():
+            nonlocal it
+            action = next(it, None)
+            if action is None:
+                it = iter(actions)
+                action = next(it)
+            if env.step(action)[2]:
+                env.reset()
+        return measure(step)
+    return run
+
+
+def bench_vector_env_step(num_envs):
+    # Mỗi op là một bước của một ván (một lời gọi step = num_envs op), so được trực tiếp với env.step
+    def run(seed):
+        seed_everything(seed)
+        venv = VectorRapidRollEnv(num_envs, seed=seed)
+        actions = np.random.default_rng(seed).integers(0, ACTION_SIZE, (256, num_envs))
+        t = 0
+
+        def step():
+            nonlocal t
+            venv.step(actions[t])
+            t = (t + 1) % len(actions)
+        return measure(step, ops_per_call=num_envs, warmup=20)
+    return run
+
+
+def bench_env_reset(seed):
+    seed_everything(seed)
+    env = RapidRollEnv(headless=True, seed=seed)
+    return measure(env.reset)
+
+
+def bench_get_state(next_platforms=0):
+    def run(seed):
+        seed_everything(seed)
+        env = RapidRollEnv(headless=True, seed=seed, next_platforms=next_platforms)
+        for _ in range(100):
+            env.step(1)
+        return measure(env._get_state)
+    return run
+
+
+def _filled_memory(capacity, seed, device='cpu'):
+    rng = np.random.default_rng(seed)
+    memory = ReplayMemory(capacity, STATE_SIZE, device=device)
+    memory.rng = np.random.default_rng(seed)
+    for start in range(0, capacity, 100000):
+        n = min(100000, capacity - start)
+        states = rng.random((n, STATE_SIZE), dtype=np.float32)
+        memory.push_batch(states, rng.integers(0, ACTION_SIZE, n), states, rng.random(n, dtype=np.float32), rng.random(n) < 0.01)
+    return memory
+
+
+def bench_replay_push(capacity):
+    def run(seed):
+        memory = _filled_memory(capacity, seed)
+        state = np.random.default_rng(seed).random(STATE_SIZE, dtype=np.float32)
+        return measure(lambda: memory.push(state, 1, state, 0.1, False))
+    return run
+
+
+def bench_replay_sample(capacity, batch_size=256):
+    def run(seed):
+        memory = _filled_memory(capacity, seed)
+        return measure(lambda: memory.sample(batch_size))
+    return run
+
+
+def bench_learn(batch_size):
+    def run(seed):
+        seed_everything(seed)
+        agent = DQNAgent(STATE_SIZE, ACTION_SIZE, batch_size=batch_size, memory_size=100000)
+        agent.memory = _filled_memory(100000, seed, device=agent.device)
+        return measure(agent.learn, warmup=20, min_round_time=0.2)
+    return run
+
+
+def bench_choose_action(seed):
+    seed_everything(seed)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, memory_size=1)
+    agent.epsilon = 0.0
+    state = np.random.default_rng(seed).random(STATE_SIZE, dtype=np.float32)
+    return measure_latency(lambda: agent.choose_action(state))
+
+
+def bench_policy_inference(backend, batch_size):
+    def run(seed):
+        seed_everything(seed)
+        agent = DQNAgent(STATE_SIZE, ACTION_SIZE, memory_size=1)
+        engine = PolicyInference(agent.policy_net, backend=backend, seed=seed)
+        states = np.random.default_rng(seed).random((batch_size, STATE_SIZE), dtype=np.float32)
+        if batch_size == 1:
+            return measure_latency(lambda: engine.act_one(states[0]))
+        return measure_latency(lambda: engine.act(states), samples=2000)
+    return run
+
+
+BENCHMARKS = {
+    'env.step': bench_env_step(),
+    'env.step[frame_skip=4]': bench_env_step(4),
+    'vector_env.step[N=16]': bench_vector_env_step(16),
+    'vector_env.step[N=256]': bench_vector_env_step(256),
+    'env.reset': bench_env_reset,
+    'env._get_state': bench_get_state(),
+    'env._get_state[next_platforms=4]': bench_get_state(4),
+    'replay.push[10k]': bench_replay_push(10000),
+    'replay.push[100k]': bench_replay_push(100000),
+    'replay.push[1M]': bench_replay_push(1000000),
+    'replay.sample[10k]': bench_replay_sample(10000),
+    'replay.sample[100k]': bench_replay_sample(100000),
+    'replay.sample[1M]': bench_replay_sample(1000000),
+    'learn[batch=32]': bench_learn(32),
+    'learn[batch=128]': bench_learn(128),
+    'learn[batch=256]': bench_learn(256),
+    'choose_action[batch=1]': bench_choose_action,
+    'policy_inference[numpy,batch=1]': bench_policy_inference('numpy', 1),
+    'policy_inference[torchscript,batch=1]': bench_policy_inference('torchscript', 1),
+    'policy_inference[numpy,batch=256]': bench_policy_inference('numpy', 256),
+}
+
+
+def compare(results, baseline, threshold):
+    # Trả về (regression, benchmark chưa có trong baseline); benchmark mới phải được ghi vào baseline
+    # (--save-baseline) thì mới được kiểm tra, nên thiếu cũng tính là lỗi
+    regressions = []
+    missing = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            missing.append(name)
+            continue
+        # Benchmark độ trễ không có us_per_op_min, khi đó so theo p50
+        key = 'us_per_op_min' if 'us_per_op_min' in result and 'us_per_op_min' in base else 'us_per_op'
+        ratio = result[key] / base[key]
+        result['vs_baseline'] = ratio
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions, missing
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', nargs='+', default=None, help='Chỉ chạy benchmark có tên chứa một trong các chuỗi này')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=1, help='torch.set_num_threads cho các benchmark')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25, help='Tỉ lệ chậm đi tối đa trước khi báo regression')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    selected = {name: fn for name, fn in BENCHMARKS.items()
+                if args.only is None or any(key in name for key in args.only)}
+
+    results = {}
+    for name, fn in selected.items():
+        results[name] = fn(args.seed)
+        extra = f" | p99 {results[name]['us_p99']:9.1f} us" if 'us_p99' in results[name] else ''
+        print(f"{name:38s} {results[name]['us_per_op']:10.2f} us/op | {results[name]['ops_per_sec']:12.0f} ops/s{extra}")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'torch': torch.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'threads': args.threads,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    exit_code = 0
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions, missing = compare(results, baseline, args.threshold)
+        if missing:
+            exit_code = 1
+            print(f"\nCHƯA CÓ TRONG BASELINE (chạy lại với --save-baseline): {', '.join(missing)}")
+        if regressions:
+            exit_code = 1
+            print(f"\nREGRESSION (ngưỡng +{args.threshold:.0%}):")
+            for name, ratio in regressions:
+                print(f"  {name}: chậm hơn baseline x{ratio:.2f}")
+        elif not missing:
+            print(f"\nKhông có regression so với baseline (ngưỡng +{args.threshold:.0%}).")
+
+    output = args.baseline if args.save_baseline else args.output
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Đã ghi kết quả vào {output}")
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
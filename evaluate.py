@@ -0,0 +1,199 @@
+# evaluate.py
+# Đánh giá checkpoint một cách tham lam (epsilon = 0) trên hàng nghìn ván headless có seed, chia cho
+# một pool tiến trình. Env không bao giờ cần cửa sổ nên mỗi worker chạy song song nhiều ván và chọn
+# hành động cho tất cả bằng một lần forward theo batch (PolicyInference).
+#
+#   python evaluate.py dqn_rapid_roll_best.pth --episodes 2000
+#   python evaluate.py old.pth new.pth --episodes 2000 --seed 1   # so sánh trên cùng tập seed
+#   python evaluate.py model.pth --start-speed 4.0                 # chỉ đánh giá vùng tốc độ cao
+#
+# Ván nào cũng có seed riêng, nên ván tệ có thể xem lại bằng RapidRollEnv.reset(seed=...).
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+import numpy as np
+
+from rapid_roll_env import RapidRollEnv, DEFAULT_DIFFICULTY, SCALE_FACTOR
+
+MAX_STEPS_PER_EPISODE = 3000
+DEATH_CAUSES = ('spike', 'fall', 'ceiling', 'timeout')
+
+_engines = {}
+
+
+def _init_worker():
+    import torch
+    torch.set_num_threads(1)
+
+
+def _get_engine(model_path, backend):
+    # Mỗi tiến trình chỉ nạp mỗi checkpoint một lần; file .npz (compact_policy.py) luôn chạy NumPy
+    from compact_policy import load_policy
+    key = (model_path, backend)
+    if key not in _engines:
+        _engines[key] = load_policy(model_path, backend=backend)
+    return _engines[key]
+
+
+def _warm_up(model_path, backend):
+    _get_engine(model_path, backend)
+
+
+def evaluate_seeds(model_path, seeds, max_steps, backend, envs_per_worker, jump_strength, frame_skip=1,
+                   difficulty=DEFAULT_DIFFICULTY, snap_platforms_to_pixels=True):
+    # Chạy các ván theo seeds, tối đa envs_per_worker ván cùng lúc; trả về list
+    # (seed, score, steps, total_reward, death_cause) theo đúng thứ tự seeds. steps và max_steps
+    # tính theo frame vật lý nên so sánh được giữa các model khác frame skip
+    engine = _get_engine(model_path, backend)
+    pending = list(enumerate(seeds))
+    pending.reverse()
+    results = [None] * len(seeds)
+
+    next_platforms = (engine.state_size - 6) // 3
+    envs = [RapidRollEnv(headless=True, jump_strength=jump_strength, next_platforms=next_platforms, frame_skip=frame_skip,
+                         difficulty=difficulty, snap_platforms_to_pixels=snap_platforms_to_pixels)
+            for _ in range(min(envs_per_worker, len(seeds)))]
+    slots = []
+    states = np.zeros((len(envs), engine.state_size), dtype=np.float32)
+    for i, env in enumerate(envs):
+        index, seed = pending.pop()
+        states[i] = env.reset(seed=seed)
+        slots.append([index, seed, 0.0])
+
+    active = list(range(len(envs)))
+    while active:
+        actions = engine.act(states[active]).tolist()
+        still_active = []
+        for i, action in zip(active, actions):
+            env, slot = envs[i], slots[i]
+            state, reward, done, info = env.step(action)
+            slot[2] += reward
+            if done or env.ticks >= max_steps:
+                index, seed, total_reward = slot
+                results[index] = (seed, env.score, env.ticks, total_reward, info.get('death_cause', 'timeout'))
+                if not pending:
+                    continue
+                index, seed = pending.pop()
+                state = env.reset(seed=seed)
+                slots[i] = [index, seed, 0.0]
+            states[i] = state
+            still_active.append(i)
+        active = still_active
+    return results
+
+
+def run_checkpoint(pool, model_path, seeds, args, frame_skip):
+    difficulty = DEFAULT_DIFFICULTY
+    if args.start_speed is not None:
+        difficulty = difficulty._replace(initial_scroll_speed=args.start_speed * SCALE_FACTOR)
+    chunk = max(1, min(args.chunk_size, -(-len(seeds) // args.workers)))
+    chunks = [seeds[i:i + chunk] for i in range(0, len(seeds), chunk)]
+    # Khởi động worker và nạp model trước khi bấm giờ để ván/s không tính thời gian spawn + import torch
+    for f in [pool.submit(_warm_up, model_path, args.backend) for _ in range(args.workers)]:
+        f.result()
+    start = time.time()
+    futures = [pool.submit(evaluate_seeds, model_path, c, args.max_steps, args.backend, args.envs_per_worker,
+                           args.jump_strength, frame_skip, difficulty, not args.continuous_physics) for c in chunks]
+    results = [r for f in futures for r in f.result()]
+    return results, time.time() - start
+
+
+def summarize(results, elapsed):
+    scores = np.array([r[1] for r in results], dtype=np.float64)
+    steps = np.array([r[2] for r in results], dtype=np.float64)
+    rewards = np.array([r[3] for r in results], dtype=np.float64)
+    causes = [r[4] for r in results]
+    n = len(results)
+    return {
+        'episodes': n,
+        'seconds': elapsed,
+        'episodes_per_sec': n / elapsed,
+        'steps_per_sec': steps.sum() / elapsed,
+        'score': {'mean': scores.mean(), 'std': scores.std(), 'min': scores.min(),
+                  'p10': np.percentile(scores, 10), 'p50': np.percentile(scores, 50),
+                  'p90': np.percentile(scores, 90), 'max': scores.max()},
+        'steps': {'mean': steps.mean(), 'p50': np.percentile(steps, 50), 'max': steps.max()},
+        'reward_mean': rewards.mean(),
+        'death_causes': {cause: causes.count(cause) / n for cause in DEATH_CAUSES},
+        'worst_seeds': [r[0] for r in sorted(results, key=lambda r: (r[1], r[2]))[:5]],
+    }
+
+
+def print_summary(name, s):
+    sc, st = s['score'], s['steps']
+    print(f"\n=== {name} ===")
+    print(f"{s['episodes']} ván trong {s['seconds']:.1f}s: {s['episodes_per_sec']:.1f} ván/s, {s['steps_per_sec']:.0f} frame/s")
+    print(f"Điểm   : mean {sc['mean']:.2f} ± {sc['std']:.2f} | min {sc['min']:.0f} | p10 {sc['p10']:.0f} | "
+          f"p50 {sc['p50']:.0f} | p90 {sc['p90']:.0f} | max {sc['max']:.0f}")
+    print(f"Sống sót: mean {st['mean']:.0f} frame | p50 {st['p50']:.0f} | max {st['max']:.0f} | reward TB {s['reward_mean']:.1f}")
+    print("Nguyên nhân kết thúc: " + ", ".join(f"{cause} {frac * 100:.1f}%" for cause, frac in s['death_causes'].items()))
+    print(f"Seed tệ nhất: {s['worst_seeds']}")
+
+
+def head_to_head(base_name, base_results, name, results):
+    # So sánh từng cặp trên cùng seed; khoảng tin cậy 95% của chênh lệch điểm trung bình
+    base = np.array([r[1] for r in base_results], dtype=np.float64)
+    other = np.array([r[1] for r in results], dtype=np.float64)
+    diff = other - base
+    half_width = 1.96 * diff.std(ddof=1) / np.sqrt(len(diff)) if len(diff) > 1 else float('nan')
+    wins, ties, losses = int((diff > 0).sum()), int((diff == 0).sum()), int((diff < 0).sum())
+    print(f"{name} vs {base_name}: thắng {wins} / hoà {ties} / thua {losses}, "
+          f"chênh lệch điểm TB {diff.mean():+.2f} (95% CI ±{half_width:.2f})")
+    return {'wins': wins, 'ties': ties, 'losses': losses, 'mean_diff': diff.mean(), 'ci95': half_width}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('checkpoints', nargs='+', help='Một hoặc nhiều file .pth; checkpoint đầu tiên là mốc so sánh')
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help='Seed sinh tập seed ván (dùng chung cho mọi checkpoint)')
+    parser.add_argument('--max-steps', type=int, default=MAX_STEPS_PER_EPISODE, help='Giới hạn frame vật lý mỗi ván (như train_dqn.py)')
+    parser.add_argument('--frame-skip', type=int, nargs='+', default=[1],
+                        help='Frame skip lúc huấn luyện: một giá trị cho mọi checkpoint hoặc mỗi checkpoint một giá trị')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--envs-per-worker', type=int, default=32, help='Số ván chạy song song trong mỗi tác vụ (batch inference)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Số ván tối đa mỗi tác vụ gửi cho worker')
+    parser.add_argument('--backend', default='numpy', choices=('numpy', 'torchscript', 'torch'))
+    parser.add_argument('--jump-strength', type=float, default=0.0)
+    parser.add_argument('--continuous-physics', action='store_true', help='Như train_dqn.py --continuous-physics')
+    parser.add_argument('--start-speed', type=float, default=None,
+                        help='Tốc độ cuộn lúc bắt đầu ván, theo đơn vị "Speed" hiển thị trong game (1.5 mặc định, 4.0 tối đa)')
+    parser.add_argument('--json', default=None, help='Ghi kết quả tổng hợp ra file JSON')
+    args = parser.parse_args()
+    if len(args.frame_skip) not in (1, len(args.checkpoints)):
+        parser.error('--frame-skip cần 1 giá trị hoặc đúng số checkpoint')
+    frame_skips = args.frame_skip * len(args.checkpoints) if len(args.frame_skip) == 1 else args.frame_skip
+
+    seed_rng = random.Random(args.seed)
+    seeds = [seed_rng.getrandbits(63) for _ in range(args.episodes)]
+
+    all_results = {}
+    report = {'seed': args.seed, 'episodes': args.episodes, 'max_steps': args.max_steps, 'start_speed': args.start_speed,
+              'checkpoints': {}}
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context('spawn'), initializer=_init_worker) as pool:
+        for path, frame_skip in zip(args.checkpoints, frame_skips):
+            results, elapsed = run_checkpoint(pool, path, seeds, args, frame_skip)
+            all_results[path] = results
+            report['checkpoints'][path] = summarize(results, elapsed)
+            print_summary(path, report['checkpoints'][path])
+
+    if len(args.checkpoints) > 1:
+        print("\n=== So sánh trực tiếp (cùng tập seed) ===")
+        base = args.checkpoints[0]
+        report['head_to_head'] = {path: head_to_head(base, all_results[base], path, all_results[path])
+                                  for path in args.checkpoints[1:]}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+        print(f"\nĐã ghi kết quả vào {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# instrumentation.py
+# Đo thời gian theo từng pha của vòng huấn luyện, ghi metric định kỳ ra file xoay vòng (JSONL/CSV)
+# và profiler tuỳ chọn (cProfile hoặc torch.profiler) cho N bước.
+
+import cProfile
+import csv
+import json
+import os
+import time
+from time import perf_counter_ns
+
+
+# --- Bộ đếm thời gian theo pha ---
+# lap(phase) cộng thời gian từ mốc trước đến hiện tại vào pha đó rồi đặt mốc mới, nên mỗi ranh giới
+# pha chỉ tốn một lần perf_counter_ns. Tổng các pha bằng thời gian thực giữa hai lần snapshot.
+class PhaseTimer:
+    __slots__ = ('totals', '_last')
+
+    def __init__(self, phases=()):
+        self.totals = {phase: 0 for phase in phases}
+        self._last = perf_counter_ns()
+
+    def mark(self):
+        self._last = perf_counter_ns()
+
+    def lap(self, phase):
+        now = perf_counter_ns()
+        self.totals[phase] = self.totals.get(phase, 0) + (now - self._last)
+        self._last = now
+
+    def snapshot(self, reset=True):
+        seconds = {phase: ns / 1e9 for phase, ns in self.totals.items()}
+        if reset:
+            self.totals = dict.fromkeys(self.totals, 0)
+        return seconds
+
+
+# --- Ghi metric ra file, tự xoay vòng khi vượt max_bytes (path -> path.1 -> ... -> path.N) ---
+class MetricsLogger:
+    def __init__(self, path, interval=10.0, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.format = 'csv' if path.endswith('.csv') else 'jsonl'
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.next_time = time.perf_counter() + interval
+        self._fieldnames = None
+        self._file = None
+        self._writer = None
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'a', newline='')
+        if self.format == 'csv':
+            self._writer = None
+            self._new_file = self._file.tell() == 0
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src, dst = f"{self.path}.{i}", f"{self.path}.{i + 1}"
+            if os.path.exists(src):
+                os.replace(src, dst)
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def due(self):
+        return time.perf_counter() >= self.next_time
+
+    def write(self, record):
+        self.next_time = time.perf_counter() + self.interval
+        if self.format == 'jsonl':
+            self._file.write(json.dumps(record) + '\n')
+        else:
+            if self._writer is None:
+                # Cột cố định theo bản ghi đầu tiên; mỗi file mới sau khi xoay vòng có header riêng
+                if self._fieldnames is None:
+                    self._fieldnames = list(record)
+                self._writer = csv.DictWriter(self._file, fieldnames=self._fieldnames, extrasaction='ignore')
+                if self._new_file:
+                    self._writer.writeheader()
+            self._writer.writerow(record)
+        self._file.flush()
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# --- Profiler tuỳ chọn: bật từ bước start_step, chạy num_steps bước rồi ghi kết quả ra out_dir ---
+class StepProfiler:
+    def __init__(self, kind, num_steps, start_step=0, out_dir='profiles'):
+        if kind not in ('cprofile', 'torch'):
+            raise ValueError(f"Profiler không hỗ trợ: {kind}")
+        self.kind = kind
+        self.num_steps = num_steps
+        self.start_step = start_step
+        self.out_dir = out_dir
+        self.steps = 0
+        self.active = False
+        self.finished = False
+        self._profiler = None
+
+    def step(self):
+        if self.finished:
+            return
+        self.steps += 1
+        if not self.active and self.steps > self.start_step:
+            self._start()
+        elif self.active and self.steps > self.start_step + self.num_steps:
+            self.stop()
+
+    def _start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self.kind == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            from torch.profiler import profile, ProfilerActivity
+            self._profiler = profile(activities=[ProfilerActivity.CPU], record_shapes=True)
+            self._profiler.__enter__()
+        self.active = True
+
+    def stop(self):
+        if not self.active:
+            return None
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        if self.kind == 'cprofile':
+            self._profiler.disable()
+            path = os.path.join(self.out_dir, f"train_{stamp}.prof")
+            self._profiler.dump_stats(path)
+        else:
+            self._profiler.__exit__(None, None, None)
+            path = os.path.join(self.out_dir, f"train_{stamp}.trace.json")
+            self._profiler.export_chrome_trace(path)
+        self.active = False
+        self.finished = True
+        print(f"Đã ghi profile {self.num_steps} bước vào: {path}")
+        return path
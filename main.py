@@ -1,38 +1,49 @@
 # main.py
 
 import pygame
-import torch
 import sys
 import os
+import math
+import time
+import argparse
+from collections import deque
+import numpy as np
 from rapid_roll_env import RapidRollEnv, SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, BLACK, YELLOW
-from dqn_agent import DQNAgent
+from compact_policy import load_policy
 
 # --- Các hằng số và thiết lập ---
 MODEL_PATH = 'dqn_rapid_roll_best.pth'
-STATE_SIZE = 6
-ACTION_SIZE = 3
 FPS = 60
 
-# --- Các hàm UI (không thay đổi) ---
+# --- Các hàm UI ---
+_text_cache = {}
+
+def render_text(text, font, color):
+    # Menu vẽ lại mỗi frame nhưng chữ gần như không đổi: chỉ rasterize một lần cho mỗi nội dung
+    key = (text, font, color)
+    if key not in _text_cache:
+        _text_cache[key] = font.render(text, True, color)
+    return _text_cache[key]
+
 def draw_button(text, font, text_color, rect, surface, hover_color=None):
     mx, my = pygame.mouse.get_pos()
     is_hovering = rect.collidepoint((mx, my))
     bg_color = hover_color if is_hovering and hover_color else BLACK
     pygame.draw.rect(surface, bg_color, rect, border_radius=8)
     pygame.draw.rect(surface, WHITE, rect, 2, border_radius=8)
-    text_surf = font.render(text, True, text_color)
+    text_surf = render_text(text, font, text_color)
     text_rect = text_surf.get_rect(center=rect.center)
     surface.blit(text_surf, text_rect)
     return is_hovering
 
 def draw_text(text, font, color, surface, x, y, center=False):
-    textobj = font.render(text, 1, color)
+    textobj = render_text(text, font, color)
     textrect = textobj.get_rect()
     if center: textrect.center = (x, y)
     else: textrect.topleft = (x, y)
     surface.blit(textobj, textrect)
 
-def main_menu(screen, fonts, high_score, game_settings):
+def main_menu(screen, fonts, clock, high_score, game_settings):
     btn_w, btn_h = 220, 50
     btn_x = SCREEN_WIDTH / 2 - btn_w / 2
     button_new_game = pygame.Rect(btn_x, 250, btn_w, btn_h)
@@ -58,9 +69,9 @@ def main_menu(screen, fonts, high_score, game_settings):
                 if is_hover_exit: return 'EXIT'
         
         pygame.display.update()
-        pygame.time.Clock().tick(FPS)
+        clock.tick(FPS)
 
-def game_over_screen(screen, fonts, last_score, high_score):
+def game_over_screen(screen, fonts, clock, last_score, high_score):
     running = True
     while running:
         screen.fill(BLACK)
@@ -73,9 +84,133 @@ def game_over_screen(screen, fonts, last_score, high_score):
             if event.type in [pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN]:
                 return 'MAIN_MENU'
         pygame.display.update()
-        pygame.time.Clock().tick(FPS)
+        clock.tick(FPS)
+
+# --- Chế độ xem nhiều ván AI cùng lúc (--spectate N) ---
+# N ván RapidRollEnv headless chạy song song, mỗi ván vẽ thu nhỏ vào một ô của lưới. Mỗi frame chỉ có
+# một lần forward theo batch cho mọi ván (policy.act) và một lần pygame.display.update cho mọi ô.
+# Ván kết thúc được chơi lại ngay với seed kế tiếp; thanh dưới cùng hiện điểm TB/cao nhất của các ván
+# đã xong, số ván chết mỗi phút (60 giây gần nhất), FPS thực tế và thời gian một lần forward.
+STATS_BAR_HEIGHT = 60
+CELL_GAP = 2
+
+def grid_layout(num_games, max_width=3 * SCREEN_WIDTH, max_height=SCREEN_HEIGHT):
+    # Chọn số cột sao cho mỗi ô lớn nhất mà cả lưới vẫn vừa max_width x max_height
+    best = None
+    for cols in range(1, num_games + 1):
+        rows = math.ceil(num_games / cols)
+        scale = min(1.0, max_width / (cols * SCREEN_WIDTH), max_height / (rows * SCREEN_HEIGHT))
+        if best is None or scale > best[2]:
+            best = (cols, rows, scale)
+    return best
+
+def spectate(policy, args, fonts):
+    from renderer import PygameRenderer
+    cols, rows, scale = grid_layout(args.spectate)
+    if args.cell_scale:
+        scale = args.cell_scale
+    cell_w, cell_h = int(SCREEN_WIDTH * scale), int(SCREEN_HEIGHT * scale)
+    grid_w, grid_h = cols * (cell_w + CELL_GAP) - CELL_GAP, rows * (cell_h + CELL_GAP) - CELL_GAP
+    screen = pygame.display.set_mode((grid_w, grid_h + STATS_BAR_HEIGHT))
+    pygame.display.set_caption(f"Rapid Roll AI - {args.spectate} ván")
+    clock = pygame.time.Clock()
+
+    envs, renderers = [], []
+    for i in range(args.spectate):
+        env = RapidRollEnv(headless=True, jump_strength=0.0, next_platforms=(policy.state_size - 6) // 3,
+                           snap_platforms_to_pixels=not args.continuous_physics)
+        envs.append(env)
+        cell = screen.subsurface((i % cols * (cell_w + CELL_GAP), i // cols * (cell_h + CELL_GAP), cell_w, cell_h))
+        renderers.append(PygameRenderer(surface=cell, scale=scale))
+    next_seed = args.seed
+    states = np.zeros((len(envs), policy.state_size), dtype=np.float32)
+    for i, env in enumerate(envs):
+        states[i] = env.reset(seed=next_seed)
+        next_seed += 1
+
+    # Đường kẻ giữa các ô và thanh thống kê nằm ngoài mọi ô nên chỉ vẽ một lần
+    screen.fill((60, 60, 60))
+    bar = pygame.Rect(0, grid_h, grid_w, STATS_BAR_HEIGHT)
+    pygame.display.flip()
+
+    scores = []
+    deaths = deque()
+    forward_time = 0.0
+    forwards = 0
+    start = time.monotonic()
+    last_stats = -1.0
+    frame = 0
+    # Mỗi ván có đồng hồ frame-skip riêng, về 0 khi ván đó reset: ván mới chọn hành động ngay ở frame đầu
+    # thay vì giữ hành động của ván trước tới lượt quyết định chung
+    game_frames = np.zeros(len(envs), dtype=np.int64)
+    forward_rows = 0
+    actions = np.ones(len(envs), dtype=np.int64)
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+        now = time.monotonic()
+        if args.duration and now - start >= args.duration:
+            break
+
+        decide = game_frames % args.frame_skip == 0
+        if decide.any():
+            t = time.perf_counter()
+            actions[decide] = policy.act(states[decide])
+            forward_time += time.perf_counter() - t
+            forwards += 1
+            forward_rows += int(decide.sum())
+        game_frames += 1
+        dirty = []
+        for i, env in enumerate(envs):
+            state, _, done, _ = env.step(int(actions[i]))
+            if done:
+                scores.append(env.score)
+                deaths.append(now)
+                state = env.reset(seed=next_seed)
+                next_seed += 1
+                game_frames[i] = 0
+            states[i] = state
+            dirty += renderers[i].render(env)
+        frame += 1
+
+        # Chữ thống kê đổi liên tục nên chỉ rasterize lại hai lần mỗi giây
+        if now - last_stats >= 0.5:
+            last_stats = now
+            while deaths and now - deaths[0] > 60:
+                deaths.popleft()
+            per_minute = len(deaths) * 60 / min(max(now - start, 1e-9), 60)
+            live_max = max(env.score for env in envs)
+            # Font mặc định của pygame không có dấu tiếng Việt nên chữ trên màn hình giữ tiếng Anh như menu
+            lines = (f"Games: {len(scores)} | Mean score: {np.mean(scores) if scores else 0:.1f} | "
+                     f"Max: {max(scores + [live_max])} | Deaths/min: {per_minute:.1f}",
+                     f"FPS: {clock.get_fps():.1f} | Forward x{forward_rows / max(forwards, 1):.1f}: "
+                     f"{forward_time / max(forwards, 1) * 1e6:.0f} us")
+            screen.fill(BLACK, bar)
+            for k, line in enumerate(lines):
+                screen.blit(fonts['small'].render(line, True, WHITE), (10, bar.top + 6 + 26 * k))
+            dirty.append(bar)
+        pygame.display.update(dirty)
+        clock.tick(args.fps)
+
+    elapsed = time.monotonic() - start
+    print(f"{len(scores)} ván xong trong {elapsed:.1f} giây | điểm TB {np.mean(scores) if scores else 0:.2f} | "
+          f"cao nhất {max(scores, default=0)} | {frame / elapsed:.1f} frame/giây x {len(envs)} ván | "
+          f"forward TB {forward_time / max(forwards, 1) * 1e6:.0f} us")
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frame-skip', type=int, default=1, help='Frame skip đã dùng khi huấn luyện model (train_dqn.py --frame-skip)')
+    parser.add_argument('--continuous-physics', action='store_true', help='Toạ độ platform liên tục, như khi huấn luyện với train_dqn.py --continuous-physics')
+    parser.add_argument('--model', default=MODEL_PATH, help='Checkpoint .pth hoặc model gọn .npz (compact_policy.py, không cần torch)')
+    parser.add_argument('--spectate', type=int, default=0, metavar='N', help='Xem N ván AI cùng lúc trong một lưới thay vì menu')
+    parser.add_argument('--cell-scale', type=float, default=None, help='Tỉ lệ thu nhỏ mỗi ô (mặc định: vừa khung 3 x 1 màn hình)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed của ván đầu tiên ở chế độ --spectate, các ván sau tăng dần')
+    parser.add_argument('--fps', type=int, default=FPS, help='Giới hạn FPS ở chế độ --spectate (0: không giới hạn, để đo tải)')
+    parser.add_argument('--duration', type=float, default=0, help='Tự thoát --spectate sau số giây này (0: chạy tới khi đóng cửa sổ)')
+    args = parser.parse_args()
+
     pygame.init()
     pygame.font.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -84,20 +219,28 @@ def main():
     fonts = { 'small': pygame.font.Font(None, 30), 'main': pygame.font.Font(None, 45), 'title': pygame.font.Font(None, 70) }
 
     # --- Tải AI Agent ---
-    agent = DQNAgent(STATE_SIZE, ACTION_SIZE)
+    # Chỉ nạp phần suy luận (không target net, optimizer hay replay buffer như DQNAgent)
+    policy = None
     ai_available = False
-    if os.path.exists(MODEL_PATH):
+    if os.path.exists(args.model):
         try:
-            agent.policy_net.load_state_dict(torch.load(MODEL_PATH, map_location=agent.device))
-            agent.policy_net.eval()
-            agent.epsilon = 0.0
+            policy = load_policy(args.model)
             ai_available = True
             print("Tải model AI thành công!")
         except Exception as e:
             print(f"Lỗi khi tải model: {e}")
             print("Model có thể không tương thích. Hãy huấn luyện lại. Chế độ AI không khả dụng.")
     else:
-        print(f"CẢNH BÁO: Không tìm thấy file model tại '{MODEL_PATH}'. Chế độ AI không khả dụng.")
+        print(f"CẢNH BÁO: Không tìm thấy file model tại '{args.model}'. Chế độ AI không khả dụng.")
+
+    if args.spectate:
+        if not ai_available:
+            print("Chế độ --spectate cần một model AI.")
+            pygame.quit()
+            sys.exit(1)
+        spectate(policy, args, fonts)
+        pygame.quit()
+        sys.exit()
 
     game_state = 'MAIN_MENU'
     high_score = 0
@@ -105,17 +248,22 @@ def main():
 
     while True:
         if game_state == 'MAIN_MENU':
-            result = main_menu(screen, fonts, high_score, game_settings)
+            result = main_menu(screen, fonts, clock, high_score, game_settings)
             if result == 'TOGGLE_AI':
                 if ai_available: game_settings['ai_mode'] = not game_settings['ai_mode']
             elif result == 'EXIT': break
             else: game_state = result
         
         elif game_state == 'PLAYING':
-            env = RapidRollEnv(jump_strength=0.0)
+            # Model dùng next_platforms (train_dqn.py --next-platforms) có state lớn hơn 6
+            env = RapidRollEnv(jump_strength=0.0, next_platforms=(policy.state_size - 6) // 3 if policy else 0,
+                               snap_platforms_to_pixels=not args.continuous_physics)
             state = env.reset()
             game_mode = 'AI' if game_settings['ai_mode'] else 'HUMAN'
+            # Vẽ cùng khung hình của env, trong đúng một lần cập nhật màn hình
+            env.renderer.set_label('mode', f"Mode: {game_mode}", (SCREEN_WIDTH - 100, 10), fonts['small'])
             
+            frame = 0
             playing = True
             while playing:
                 for event in pygame.event.get():
@@ -123,7 +271,11 @@ def main():
                 
                 action = 1
                 if game_mode == 'AI':
-                    action = agent.choose_action(state)
+                    # Env vẫn chạy từng frame để hiển thị mượt; AI chỉ chọn hành động mỗi frame_skip frame
+                    # và giữ nguyên ở giữa, đúng như lúc huấn luyện
+                    if frame % args.frame_skip == 0:
+                        ai_action = policy.act_one(state)
+                    action = ai_action
                 else:
                     keys = pygame.key.get_pressed()
                     if keys[pygame.K_LEFT] or keys[pygame.K_a]: action = 0
@@ -132,9 +284,8 @@ def main():
                 next_state, _, done, _ = env.step(action)
                 state = next_state
                 env.render()
-                draw_text(f"Mode: {game_mode}", fonts['small'], WHITE, screen, SCREEN_WIDTH - 100, 10)
-                pygame.display.flip()
                 clock.tick(FPS)
+                frame += 1
                 if done: playing = False
 
             last_score = env.score
@@ -142,7 +293,7 @@ def main():
             game_state = 'GAME_OVER'
 
         elif game_state == 'GAME_OVER':
-            result = game_over_screen(screen, fonts, last_score, high_score)
+            result = game_over_screen(screen, fonts, clock, last_score, high_score)
             if result == 'EXIT': break
             else: game_state = result
 
@@ -0,0 +1,105 @@
+# policy_inference.py
+# Suy luận tham lam (greedy) cho QNetwork đã huấn luyện: nạp checkpoint .pth, đóng băng trọng số và
+# chọn hành động theo batch. Backend:
+#   'numpy'       - forward thuần NumPy trên bộ đệm cấp phát sẵn, không qua autograd
+#   'torchscript' - torch.jit.script + freeze + optimize_for_inference
+#   'torch'       - QNetwork gốc chạy trong torch.inference_mode
+
+import copy
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from dqn_agent import QNetwork
+
+
+def linear_layers(net):
+    # Các cặp (weight, bias) NumPy của mạng, theo thứ tự; giữa hai lớp là ReLU
+    layers = [(m.weight.detach().numpy(), m.bias.detach().numpy()) for m in net.model if isinstance(m, nn.Linear)]
+    if net.dueling:
+        # V + A - mean(A) tuyến tính theo đầu ra của thân chung: gộp hai đầu thành một lớp Linear
+        a_w, a_b = net.advantage.weight.detach().numpy(), net.advantage.bias.detach().numpy()
+        v_w, v_b = net.value.weight.detach().numpy(), net.value.bias.detach().numpy()
+        layers.append((a_w - a_w.mean(0, keepdims=True) + v_w, a_b - a_b.mean() + v_b))
+    return layers
+
+
+class PolicyInference:
+    def __init__(self, net, backend='numpy', max_batch=1024, seed=None):
+        if backend not in ('numpy', 'torchscript', 'torch'):
+            raise ValueError(f"Backend không hỗ trợ: {backend}")
+        self.backend = backend
+        self.max_batch = max_batch
+        self.rng = np.random.default_rng(seed)
+
+        # Đóng băng một bản sao: net của nơi gọi (ví dụ policy_net đang huấn luyện) giữ nguyên thiết bị,
+        # chế độ train và requires_grad. self.net là bản sao đó (trọng số tại thời điểm tạo engine)
+        net = self.net = copy.deepcopy(net).cpu().eval()
+        for p in net.parameters():
+            p.requires_grad_(False)
+        self.state_size = net.state_size
+        self.action_size = net.action_size
+
+        # Bộ đệm đầu vào dùng lại giữa các lần gọi; bản tensor chia sẻ bộ nhớ với bản NumPy
+        self._input = np.zeros((max_batch, self.state_size), dtype=np.float32)
+        self._input_t = torch.from_numpy(self._input)
+
+        if backend == 'numpy':
+            layers = linear_layers(net)
+            self._weights = [np.ascontiguousarray(w.T) for w, _ in layers]
+            self._biases = [b.copy() for _, b in layers]
+            self._hidden = [np.empty((max_batch, w.shape[1]), dtype=np.float32) for w in self._weights]
+        elif backend == 'torchscript':
+            scripted = torch.jit.freeze(torch.jit.script(net))
+            self._module = torch.jit.optimize_for_inference(scripted)
+        else:
+            self._module = net
+
+    @classmethod
+    def load(cls, path, backend='numpy', **kwargs):
+        # Kiến trúc suy ra từ trọng số (model dùng next_platforms có state lớn hơn 6, model dueling có đầu V/A riêng)
+        return cls(QNetwork.from_state_dict(torch.load(path, map_location='cpu')), backend=backend, **kwargs)
+
+    def export_torchscript(self, path):
+        if self.backend != 'torchscript':
+            raise ValueError("Chỉ export được khi dùng backend 'torchscript'")
+        torch.jit.save(self._module, path)
+
+    def q_values(self, states):
+        # states: (B, state_size) hoặc (state_size,); trả về view trên bộ đệm nội bộ, hãy copy nếu cần giữ lại
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim == 1:
+            states = states[None]
+        n = len(states)
+        if n > self.max_batch:
+            return np.concatenate([self.q_values(states[i:i + self.max_batch]).copy()
+                                   for i in range(0, n, self.max_batch)])
+        x = self._input[:n]
+        np.copyto(x, states)
+
+        if self.backend == 'numpy':
+            last = len(self._weights) - 1
+            for i, (w, b, out) in enumerate(zip(self._weights, self._biases, self._hidden)):
+                h = out[:n]
+                np.matmul(x, w, out=h)
+                h += b
+                if i < last:
+                    np.maximum(h, 0, out=h)
+                x = h
+            return x
+        with torch.inference_mode():
+            return self._module(self._input_t[:n]).numpy()
+
+    def act(self, states, epsilon=0.0):
+        # Epsilon-greedy vector hoá trên cả batch
+        actions = self.q_values(states).argmax(axis=1)
+        if epsilon > 0:
+            explore = self.rng.random(len(actions)) < epsilon
+            actions = np.where(explore, self.rng.integers(0, self.action_size, len(actions)), actions)
+        return actions
+
+    def act_one(self, state, epsilon=0.0):
+        if epsilon > 0 and self.rng.random() < epsilon:
+            return int(self.rng.integers(self.action_size))
+        return int(self.q_values(state)[0].argmax())
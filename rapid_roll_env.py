@@ -1,7 +1,7 @@
 # rapid_roll_env.py
 
-import pygame
 import random
+from collections import deque, namedtuple
 import numpy as np
 
 # --- Các hằng số ---
@@ -22,58 +22,181 @@ SPEED_INCREASE_RATE = 0.0001 * SCALE_FACTOR # Tăng tốc độ cuộn theo th
 # --- Màu sắc ---
 WHITE, BLACK, RED, BLUE, YELLOW = (255, 255, 255), (0, 0, 0), (255, 0, 0), (0, 0, 255), (255, 255, 0)
 
-# --- Lớp Platform---
-class Platform(pygame.Rect):
+# --- Độ khó của một ván (đổi được mỗi lần reset, xem curriculum.py) ---
+# Tốc độ tính theo pixel/frame như các hằng số trên, gap_low/gap_high là khoảng cách dọc (pixel) giữa hai
+# platform liên tiếp. State vẫn chuẩn hoá tốc độ theo INITIAL_SCROLL_SPEED..MAX_SCROLL_SPEED để cùng một
+# model dùng được ở mọi độ khó.
+DifficultyConfig = namedtuple('DifficultyConfig', ('initial_scroll_speed', 'max_scroll_speed', 'speed_increase_rate',
+                                                   'spike_chance', 'gap_low', 'gap_high'))
+DEFAULT_DIFFICULTY = DifficultyConfig(INITIAL_SCROLL_SPEED, MAX_SCROLL_SPEED, SPEED_INCREASE_RATE, SPIKE_CHANCE,
+                                      int(80 * SCALE_FACTOR), int(120 * SCALE_FACTOR))
+
+def _round_half_away(v):
+    # Cách pygame.Rect làm tròn khi gán toạ độ thực (rect.y = 2.5 -> 3, rect.y = -2.5 -> -3)
+    return int(v + 0.5) if v >= 0 else -int(0.5 - v)
+
+# --- Lớp Platform: bản ghi thuần Python, không phụ thuộc pygame ---
+class Platform:
+    __slots__ = ('x', 'y', 'width', 'height', 'is_spike')
+
     def __init__(self, x, y, width, height, is_spike=False):
-        super().__init__(x, y, width, height)
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
         self.is_spike = is_spike
 
+    @property
+    def left(self): return self.x
+    @property
+    def top(self): return self.y
+    @property
+    def bottom(self): return self.y + self.height
+    @property
+    def centerx(self): return self.x + self.width // 2
+
+# --- Bảng màn chơi sinh sẵn ---
+# num_levels màn, mỗi màn length platform; mỗi platform có ba số ngẫu nhiên đều trong [0, 1) cho khoảng
+# cách, toạ độ x và gai. Lúc reset, env quy đổi một hàng của bảng theo DifficultyConfig của ván thành các
+# list Python, nên vòng lặp vật lý chỉ còn đọc phần tử tiếp theo, không gọi RNG. Cùng một bảng dùng được
+# cho mọi độ khó: tăng spike_chance chỉ biến thêm platform thành gai, bố cục giữ nguyên. Ván dài hơn
+# length platform thì quay lại đầu màn (256 đủ cho 3000 frame ở tốc độ tối đa).
+class LevelTable:
+    def __init__(self, seed=0, num_levels=1024, length=256):
+        self.seed = seed
+        self.num_levels = num_levels
+        self.length = length
+        rng = np.random.default_rng(seed)
+        self.gap_u, self.x_u, self.spike_u = rng.random((3, num_levels, length), dtype=np.float32)
+
+    def layout(self, index, difficulty):
+        # (gaps, xs, spikes) của màn index dưới dạng list Python
+        span = difficulty.gap_high - difficulty.gap_low + 1
+        gaps = difficulty.gap_low + (self.gap_u[index] * span).astype(np.int64)
+        xs = (self.x_u[index] * (int(SCREEN_WIDTH - PLATFORM_WIDTH) + 1)).astype(np.int64)
+        return gaps.tolist(), xs.tolist(), (self.spike_u[index] < difficulty.spike_chance).tolist()
+
 class RapidRollEnv:
-    def __init__(self, headless=False, jump_strength=0.0):
+    # snap_platforms_to_pixels=True giữ đúng hành vi cũ khi Platform còn là pygame.Rect: toạ độ
+    # platform là số nguyên (cắt phần thập phân khi tạo, làm tròn xa số 0 mỗi lần cuộn) và hộp
+    # va chạm của bóng bị cắt về số nguyên. Các model đã huấn luyện dựa trên hành vi này.
+    # snap_platforms_to_pixels=False dùng toạ độ thực liên tục cho cả platform và bóng; khi đó
+    # ngưỡng tiếp đất cộng thêm tốc độ cuộn, vì bóng đang đứng yên trên platform sẽ lún sâu
+    # vy + tốc độ cuộn mỗi frame (bản snap được phép làm tròn nên ngưỡng vy + 2 là đủ).
+    #
+    # self.platforms là deque luôn sắp theo y tăng dần: platform mới luôn sinh thấp hơn platform cuối
+    # và mọi platform cuộn cùng một lượng nên thứ tự không bao giờ đổi. Nhờ vậy platform đã vượt qua
+    # nằm ở đầu deque (popleft), platform cuối là platforms[-1], và self._next_below là con trỏ tới
+    # platform đầu tiên dưới bóng, chỉ cần dịch vài ô mỗi bước.
+    #
+    # next_platforms=K > 0 nối thêm vào state (dx, dy, is_spike) của K platform kế tiếp sau platform
+    # gần nhất bên dưới (chuẩn hoá như 3 chiều platform gốc); state_size = 6 + 3K.
+    #
+    # frame_skip=k > 1: mỗi lần step lặp lại hành động trong k frame vật lý (60 FPS), cộng dồn reward
+    # và dừng sớm khi ván kết thúc. self.ticks đếm số frame vật lý từ lần reset gần nhất.
+    #
+    # difficulty (DifficultyConfig) thay cho các hằng số tốc độ/gai/khoảng cách; reset(difficulty=...) đổi
+    # độ khó từ ván đó trở đi. levels (LevelTable) lấy bố cục platform từ bảng sinh sẵn thay vì self.rng:
+    # reset(seed) chơi màn seed % num_levels. Mặc định (DEFAULT_DIFFICULTY, levels=None) giữ nguyên từng
+    # bit hành vi cũ, nên file ghi ván và model cũ vẫn dùng được.
+    def __init__(self, headless=False, jump_strength=0.0, snap_platforms_to_pixels=True, seed=None, next_platforms=0,
+                 frame_skip=1, difficulty=DEFAULT_DIFFICULTY, levels=None):
         self.headless = headless
+        self.jump_strength = jump_strength
         self.jump_boost = -jump_strength * SCALE_FACTOR
+        self.snap_platforms_to_pixels = snap_platforms_to_pixels
+        # RNG riêng cho mỗi env: cùng seed + cùng chuỗi hành động cho ra đúng cùng một ván
+        self.rng = random.Random(seed)
+        self.next_platforms = next_platforms
+        self.state_size = 6 + 3 * next_platforms
+        self.frame_skip = frame_skip
+        self.difficulty = difficulty
+        self.levels = levels
+        self._layout = None
 
+        self.renderer = None
         if not self.headless:
-            pygame.init()
-            pygame.font.init()
-            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-            pygame.display.set_caption("Rapid Roll AI")
-            self.clock = pygame.time.Clock()
-            self.font = pygame.font.SysFont(None, int(30 * SCALE_FACTOR))
-        self.platforms = []
+            # Import lười: chỉ tải pygame khi thực sự cần cửa sổ hiển thị
+            from renderer import PygameRenderer
+            self.renderer = PygameRenderer()
+        self.platforms = deque()
+        self._next_below = 0
         self.reset()
     
-    def reset(self):
+    def reset(self, seed=None, difficulty=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        if difficulty is not None:
+            self.difficulty = difficulty
+        if self.levels is not None:
+            level = seed % self.levels.num_levels if seed is not None else self.rng.randrange(self.levels.num_levels)
+            self._layout = self.levels.layout(level, self.difficulty)
+            self._layout_index = 0
         self.ball_pos = [SCREEN_WIDTH / 2, 100 * SCALE_FACTOR] 
         self.ball_vel = [0, 0]
         # THÊM: Reset tốc độ mỗi khi chơi lại
-        self.current_scroll_speed = INITIAL_SCROLL_SPEED
+        self.current_scroll_speed = self.difficulty.initial_scroll_speed
         self._generate_initial_platforms()
         self.score = 0
+        self.ticks = 0
         self.game_over = False
         return self._get_state()
 
+    def _make_platform(self, x, y, is_spike):
+        if self.snap_platforms_to_pixels:
+            return Platform(int(x), int(y), int(PLATFORM_WIDTH), int(PLATFORM_HEIGHT), is_spike=is_spike)
+        return Platform(x, y, PLATFORM_WIDTH, PLATFORM_HEIGHT, is_spike=is_spike)
+
     def _generate_initial_platforms(self):
         platforms = []
         y = self.ball_pos[1] + 50 * SCALE_FACTOR
         x = self.ball_pos[0] - PLATFORM_WIDTH / 2
-        platforms.append(Platform(x, y, PLATFORM_WIDTH, PLATFORM_HEIGHT, is_spike=False))
-        
-        for i in range(1, 15):
-            y = platforms[-1].y + random.randint(int(80 * SCALE_FACTOR), int(120 * SCALE_FACTOR))
-            x = random.randint(0, int(SCREEN_WIDTH - PLATFORM_WIDTH))
-            is_spike = random.random() < SPIKE_CHANCE
-            platforms.append(Platform(x, y, PLATFORM_WIDTH, PLATFORM_HEIGHT, is_spike=is_spike))
-            
-        self.platforms = platforms
+        platforms.append(self._make_platform(x, y, is_spike=False))
+        self.platforms = deque(platforms)
+        self._spawn_platforms()
+        self._next_below = 0
+
+    def _spawn_platforms(self):
+        # Bổ sung platform phía dưới cho đủ 15, lấy từ bảng màn chơi hoặc sinh bằng self.rng
+        platforms = self.platforms
+        if self._layout is not None:
+            gaps, xs, spikes = self._layout
+            k = self._layout_index
+            while len(platforms) < 15:
+                last_y = platforms[-1].y if platforms else 0
+                platforms.append(self._make_platform(xs[k], last_y + gaps[k], is_spike=spikes[k]))
+                k = k + 1 if k + 1 < len(gaps) else 0
+            self._layout_index = k
+            return
+        rng = self.rng
+        gap_low, gap_high, spike_chance = self.difficulty.gap_low, self.difficulty.gap_high, self.difficulty.spike_chance
+        while len(platforms) < 15:
+            last_y = platforms[-1].y if platforms else 0
+            y = last_y + rng.randint(gap_low, gap_high)
+            x = rng.randint(0, int(SCREEN_WIDTH - PLATFORM_WIDTH))
+            is_spike = rng.random() < spike_chance
+            platforms.append(self._make_platform(x, y, is_spike=is_spike))
+
+    def _locate_next_below(self):
+        # Dịch con trỏ tới platform đầu tiên có y > y của bóng (len(platforms) nếu không có)
+        platforms = self.platforms
+        ball_y = self.ball_pos[1]
+        i = self._next_below
+        while i > 0 and platforms[i - 1].y > ball_y:
+            i -= 1
+        n = len(platforms)
+        while i < n and platforms[i].y <= ball_y:
+            i += 1
+        self._next_below = i
+        return i
 
     # THAY ĐỔI QUAN TRỌNG: Cập nhật state vector (6 chiều)
     def _get_state(self):
-        platforms_below = [p for p in self.platforms if p.y > self.ball_pos[1]]
+        i = self._locate_next_below()
         
         is_next_spike = 0.0
-        if platforms_below:
-            closest_platform = min(platforms_below, key=lambda p: p.y)
+        if i < len(self.platforms):
+            closest_platform = self.platforms[i]
             relative_px = closest_platform.centerx - self.ball_pos[0]
             relative_py = closest_platform.y - self.ball_pos[1]
             if closest_platform.is_spike:
@@ -91,99 +214,118 @@ class RapidRollEnv:
             relative_px / (SCREEN_WIDTH / 2),
             relative_py / SCREEN_HEIGHT,
             is_next_spike,
-            np.clip(normalized_speed, 0, 1) # Chiều thứ 6: tốc độ hiện tại
+            min(max(normalized_speed, 0.0), 1.0) # Chiều thứ 6: tốc độ hiện tại
         ]
+        if self.next_platforms:
+            platforms, (bx, by) = self.platforms, self.ball_pos
+            for j in range(i + 1, i + 1 + self.next_platforms):
+                if j < len(platforms):
+                    p = platforms[j]
+                    state_vector += ((p.x + p.width // 2 - bx) / (SCREEN_WIDTH / 2), (p.y - by) / SCREEN_HEIGHT,
+                                     1.0 if p.is_spike else 0.0)
+                else:
+                    state_vector += ((SCREEN_WIDTH / 2 - bx) / (SCREEN_WIDTH / 2), 1.0, 0.0)
         return np.array(state_vector, dtype=np.float32)
 
     def step(self, action):
         if self.game_over:
              return self._get_state(), 0, True, {}
+        reward, info = self._advance(action, self.frame_skip)
+        return self._get_state(), reward, self.game_over, info
 
-        # THAY ĐỔI: Tăng tốc độ cuộn theo thời gian
-        if self.current_scroll_speed < MAX_SCROLL_SPEED:
-            self.current_scroll_speed += SPEED_INCREASE_RATE
-
-        # Di chuyển và vật lý
-        if action == 0: self.ball_pos[0] -= BALL_SPEED
-        elif action == 2: self.ball_pos[0] += BALL_SPEED
-        self.ball_pos[0] = np.clip(self.ball_pos[0], BALL_RADIUS, SCREEN_WIDTH - BALL_RADIUS)
-        self.ball_vel[1] += GRAVITY
-        self.ball_pos[1] += self.ball_vel[1]
-        # THAY ĐỔI: Sử dụng tốc độ hiện tại
-        for p in self.platforms: p.y -= self.current_scroll_speed
-
-        # Logic còn lại của step không thay đổi
-        reward = 0.1
-        ball_rect = pygame.Rect(self.ball_pos[0] - BALL_RADIUS, self.ball_pos[1] - BALL_RADIUS, BALL_RADIUS*2, BALL_RADIUS*2)
-        
-        for p in self.platforms:
-            if self.ball_vel[1] > 0 and ball_rect.colliderect(p) and abs(ball_rect.bottom - p.top) < self.ball_vel[1] + 2:
-                if p.is_spike:
-                    self.game_over = True
-                    reward = -200
-                    return self._get_state(), reward, self.game_over, {}
-                else:
-                    self.ball_pos[1] = p.top - BALL_RADIUS
-                    self.ball_vel[1] = self.jump_boost
-                    reward = 10
-                    break
-        
-        old_platform_count = len(self.platforms)
-        self.platforms = [p for p in self.platforms if p.bottom > 0]
-        platforms_passed = old_platform_count - len(self.platforms)
-        if platforms_passed > 0:
-            self.score += platforms_passed
-            reward += platforms_passed * 2
-        if self.ball_pos[0] < SCREEN_WIDTH * 0.1 or self.ball_pos[0] > SCREEN_WIDTH * 0.9:
-            reward -= 0.5
-            
-        while len(self.platforms) < 15:
-            last_y = max(p.y for p in self.platforms) if self.platforms else 0
-            y = last_y + random.randint(int(80*SCALE_FACTOR), int(120*SCALE_FACTOR))
-            x = random.randint(0, int(SCREEN_WIDTH - PLATFORM_WIDTH))
-            is_spike = random.random() < SPIKE_CHANCE
-            self.platforms.append(Platform(x, y, PLATFORM_WIDTH, PLATFORM_HEIGHT, is_spike=is_spike))
-        
-        if self.ball_pos[1] - BALL_RADIUS > SCREEN_HEIGHT or self.ball_pos[1] + BALL_RADIUS < 0:
-            self.game_over = True
-            reward = -100
+    def _advance(self, action, ticks):
+        # Chạy liên tiếp `ticks` frame vật lý với cùng một hành động trong một vòng lặp (không gọi
+        # step/_get_state cho từng frame); trả về (tổng reward, info), dừng ngay khi ván kết thúc.
+        # Với ticks=1 kết quả giống hệt một lần step cũ.
+        ball_pos, ball_vel, platforms = self.ball_pos, self.ball_vel, self.platforms
+        snap = self.snap_platforms_to_pixels
+        max_scroll_speed, speed_increase_rate = self.difficulty.max_scroll_speed, self.difficulty.speed_increase_rate
+        total_reward = 0
+        for _ in range(ticks):
+            self.ticks += 1
+            # THAY ĐỔI: Tăng tốc độ cuộn theo thời gian
+            if self.current_scroll_speed < max_scroll_speed:
+                self.current_scroll_speed += speed_increase_rate
+            scroll_speed = self.current_scroll_speed
 
-        return self._get_state(), reward, self.game_over, {}
-    
-    def _draw_spike_platform(self, surface, platform):
-        base_height = platform.height * 0.4
-        base_rect = pygame.Rect(platform.left, platform.top + platform.height - base_height, platform.width, base_height)
-        pygame.draw.rect(surface, BLUE, base_rect)
-        spike_width = platform.width / NUM_SPIKES
-        spike_height = platform.height * 0.7
-        spike_top_y = platform.top + platform.height - base_height - spike_height
-        for i in range(NUM_SPIKES):
-            p1 = (platform.left + i * spike_width, base_rect.top)
-            p2 = (platform.left + (i + 1) * spike_width, base_rect.top)
-            p3 = (platform.left + (i + 0.5) * spike_width, spike_top_y)
-            pygame.draw.polygon(surface, YELLOW, [p1, p2, p3])
+            # Di chuyển và vật lý
+            if action == 0: ball_pos[0] -= BALL_SPEED
+            elif action == 2: ball_pos[0] += BALL_SPEED
+            ball_pos[0] = min(max(ball_pos[0], BALL_RADIUS), SCREEN_WIDTH - BALL_RADIUS)
+            ball_vel[1] += GRAVITY
+            ball_pos[1] += ball_vel[1]
+            # THAY ĐỔI: Sử dụng tốc độ hiện tại
+            if snap:
+                for p in platforms: p.y = _round_half_away(p.y - scroll_speed)
+            else:
+                for p in platforms: p.y -= scroll_speed
 
-    def render(self):
-        if self.headless: return
-        self.screen.fill(BLACK)
-        
-        pygame.draw.circle(self.screen, RED, (int(self.ball_pos[0]), int(self.ball_pos[1])), int(BALL_RADIUS))
-        
-        for p in self.platforms:
-            if p.is_spike:
-                self._draw_spike_platform(self.screen, p)
+            reward = 0.1
+            # Hộp va chạm AABB của bóng (tương đương pygame.Rect(...).colliderect khi snap)
+            ball_left = ball_pos[0] - BALL_RADIUS
+            ball_top = ball_pos[1] - BALL_RADIUS
+            ball_size = BALL_RADIUS * 2
+            landing_tolerance = ball_vel[1] + 2
+            if snap:
+                ball_left, ball_top, ball_size = int(ball_left), int(ball_top), int(ball_size)
             else:
-                pygame.draw.rect(self.screen, BLUE, p)
-        
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
+                landing_tolerance += scroll_speed
+            ball_right, ball_bottom = ball_left + ball_size, ball_top + ball_size
 
-        # THÊM: Hiển thị tốc độ hiện tại trên màn hình
-        speed_text = self.font.render(f"Speed: {self.current_scroll_speed / SCALE_FACTOR:.2f}", True, WHITE)
-        self.screen.blit(speed_text, (10, 40))
-        
-        pygame.display.flip()
+            if ball_vel[1] > 0:
+                # Platform sắp theo y và cùng chiều cao: chỉ xét cửa sổ platform có đáy dưới đỉnh bóng và
+                # đỉnh trên đáy bóng, theo đúng thứ tự cũ nên platform chạm đầu tiên không đổi
+                i = self._next_below
+                while i > 0 and platforms[i - 1].bottom > ball_top:
+                    i -= 1
+                n = len(platforms)
+                while i < n and platforms[i].bottom <= ball_top:
+                    i += 1
+                while i < n:
+                    p = platforms[i]
+                    if p.y >= ball_bottom:
+                        break
+                    if (ball_left < p.x + p.width and ball_right > p.x
+                            and abs(ball_bottom - p.y) < landing_tolerance):
+                        if p.is_spike:
+                            self.game_over = True
+                            return total_reward - 200, {'death_cause': 'spike'}
+                        else:
+                            ball_pos[1] = p.top - BALL_RADIUS
+                            ball_vel[1] = self.jump_boost
+                            reward = 10
+                            break
+                    i += 1
+
+            platforms_passed = 0
+            while platforms and platforms[0].bottom <= 0:
+                platforms.popleft()
+                platforms_passed += 1
+            if platforms_passed > 0:
+                self._next_below = max(self._next_below - platforms_passed, 0)
+                self.score += platforms_passed
+                reward += platforms_passed * 2
+            if ball_pos[0] < SCREEN_WIDTH * 0.1 or ball_pos[0] > SCREEN_WIDTH * 0.9:
+                reward -= 0.5
+
+            if len(platforms) < 15:
+                self._spawn_platforms()
+
+            # info['death_cause'] chỉ có khi ván kết thúc: 'spike', 'fall' (rơi khỏi đáy) hoặc 'ceiling' (bị cuộn lên quá đỉnh)
+            if ball_pos[1] - BALL_RADIUS > SCREEN_HEIGHT:
+                self.game_over = True
+                return total_reward - 100, {'death_cause': 'fall'}
+            if ball_pos[1] + BALL_RADIUS < 0:
+                self.game_over = True
+                return total_reward - 100, {'death_cause': 'ceiling'}
+            total_reward += reward
+
+        return total_reward, {}
+    
+    def render(self):
+        if self.headless: return
+        self.renderer.render(self)
 
     def tick(self, fps):
         if self.headless: return
-        self.clock.tick(fps)
\ No newline at end of file
+        self.renderer.tick(fps)
\ No newline at end of file
@@ -0,0 +1,131 @@
+# renderer.py
+# Phần vẽ bằng pygame, tách khỏi rapid_roll_env để lõi mô phỏng không cần import pygame.
+# Module này chỉ được import (lười) khi có cửa sổ hiển thị.
+#
+# Mỗi frame chỉ vẽ lại các vùng bẩn (dirty rect): xoá vị trí cũ của bóng/platform/chữ, blit sprite vẽ
+# sẵn (platform, platform gai, bóng) và chữ đã rasterize (cache theo nội dung), rồi gọi
+# pygame.display.update một lần với danh sách vùng thay đổi. Frame đầu tiên và sau invalidate() vẽ
+# lại toàn màn hình (ví dụ sau khi menu đã vẽ đè lên cửa sổ).
+#
+# surface/scale: vẽ thu nhỏ vào một surface con của cửa sổ (main.py --spectate). Khi đó render() không
+# tự cập nhật màn hình mà trả về các vùng đã đổi theo toạ độ cửa sổ, để nơi gọi gộp mọi ván vào một lần
+# pygame.display.update.
+
+import math
+
+import pygame
+from rapid_roll_env import (SCREEN_WIDTH, SCREEN_HEIGHT, SCALE_FACTOR, BALL_RADIUS, PLATFORM_WIDTH, PLATFORM_HEIGHT,
+                            NUM_SPIKES, WHITE, BLACK, RED, BLUE, YELLOW)
+
+_TEXT_CACHE_SIZE = 256
+
+
+class PygameRenderer:
+    def __init__(self, surface=None, scale=1.0):
+        pygame.init()
+        pygame.font.init()
+        self.target = surface
+        self.scale = scale
+        if surface is not None:
+            self.screen = surface
+        else:
+            # Dùng lại cửa sổ đã mở (main.py mở trước khi tạo env) thay vì set_mode lại mỗi ván
+            self.screen = pygame.display.get_surface() or pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Rapid Roll AI")
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont(None, max(8, int(30 * SCALE_FACTOR * scale)))
+        self._text_pos = ((int(10 * scale), int(10 * scale)), (int(10 * scale), int(40 * scale)))
+
+        self._platform_sprite, _ = self._make_platform_sprite(False)
+        self._spike_sprite, self._spike_offset = self._make_platform_sprite(True)
+        radius = max(1, int(BALL_RADIUS * scale))
+        self._ball_sprite = pygame.Surface((2 * radius + 2, 2 * radius + 2)).convert()
+        self._ball_sprite.fill(BLACK)
+        self._ball_sprite.set_colorkey(BLACK)
+        pygame.draw.circle(self._ball_sprite, RED, (radius, radius), radius)
+        self._ball_offset = radius
+
+        self._text_cache = {}
+        self._labels = {}
+        self._previous = []
+        self._full_redraw = True
+
+    def _make_platform_sprite(self, is_spike):
+        # Vẽ đúng như _draw_spike_platform/draw.rect cũ nhưng một lần, lệch một số nguyên pixel (pad)
+        # để chỗ gai nhô lên trên mép platform cũng nằm trong sprite
+        width, height = PLATFORM_WIDTH * self.scale, PLATFORM_HEIGHT * self.scale
+        spike_height = height * 0.7
+        base_height = height * 0.4
+        pad = max(0, math.ceil(spike_height + base_height - height)) if is_spike else 0
+        sprite = pygame.Surface((math.ceil(width) + 1, math.ceil(height) + pad + 1)).convert()
+        sprite.fill(BLACK)
+        sprite.set_colorkey(BLACK)
+        if not is_spike:
+            pygame.draw.rect(sprite, BLUE, (0, pad, width, height))
+            return sprite, pad
+        base_rect = pygame.Rect(0, pad + height - base_height, width, base_height)
+        pygame.draw.rect(sprite, BLUE, base_rect)
+        spike_width = width / NUM_SPIKES
+        spike_top_y = pad + height - base_height - spike_height
+        for i in range(NUM_SPIKES):
+            p1 = (i * spike_width, base_rect.top)
+            p2 = ((i + 1) * spike_width, base_rect.top)
+            p3 = ((i + 0.5) * spike_width, spike_top_y)
+            pygame.draw.polygon(sprite, YELLOW, [p1, p2, p3])
+        return sprite, pad
+
+    def text_surface(self, text, font=None, color=WHITE):
+        # Chữ chỉ rasterize lại khi nội dung đổi (điểm, tốc độ thay đổi chậm so với 60 FPS)
+        key = (text, font, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            if len(self._text_cache) >= _TEXT_CACHE_SIZE:
+                self._text_cache.clear()
+            surface = self._text_cache[key] = (font or self.font).render(text, True, color)
+        return surface
+
+    def set_label(self, name, text, pos, font=None, color=WHITE):
+        # Chữ phủ thêm do nơi gọi quản lý (ví dụ "Mode: AI" của main.py), vẽ cùng lần cập nhật màn hình
+        self._labels[name] = (text, pos, font, color)
+
+    def invalidate(self):
+        self._full_redraw = True
+
+    def render(self, env):
+        screen = self.screen
+        if self._full_redraw:
+            screen.fill(BLACK)
+        else:
+            for rect in self._previous:
+                screen.fill(BLACK, rect)
+
+        blit = screen.blit
+        s = self.scale
+        drawn = [blit(self._ball_sprite, (int(env.ball_pos[0] * s) - self._ball_offset, int(env.ball_pos[1] * s) - self._ball_offset))]
+        for p in env.platforms:
+            if p.is_spike:
+                drawn.append(blit(self._spike_sprite, (p.x * s, p.y * s - self._spike_offset)))
+            else:
+                drawn.append(blit(self._platform_sprite, (p.x * s, p.y * s)))
+
+        score_pos, speed_pos = self._text_pos
+        drawn.append(blit(self.text_surface(f"Score: {env.score}"), score_pos))
+        drawn.append(blit(self.text_surface(f"Speed: {env.current_scroll_speed / SCALE_FACTOR:.2f}"), speed_pos))
+        for text, pos, font, color in self._labels.values():
+            drawn.append(blit(self.text_surface(text, font, color), pos))
+
+        if self.target is not None:
+            dirty = [screen.get_rect()] if self._full_redraw else self._previous + drawn
+            self._full_redraw = False
+            self._previous = drawn
+            ox, oy = screen.get_abs_offset()
+            return [rect.move(ox, oy) for rect in dirty]
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            pygame.display.update(self._previous + drawn)
+        self._previous = drawn
+
+    def tick(self, fps):
+        self.clock.tick(fps)
@@ -0,0 +1,177 @@
+# sweep.py
+# Dò siêu tham số: chạy nhiều trial train_dqn.train() song song trong một pool tiến trình, mỗi trial
+# giới hạn số thread torch. Trial thua rõ rệt bị dừng sớm theo điểm trung bình trượt (100 ván) so với
+# các trial khác ở cùng số ván. Kết quả gom vào một bảng (in ra và ghi summary.csv).
+#
+#   python sweep.py sweep.json --workers 8 --out-dir sweeps/lr
+#
+# File spec (JSON):
+#   {
+#     "method": "random",                 # "grid": tích Descartes của các danh sách; "random": lấy mẫu "trials" lần
+#     "trials": 16,
+#     "parameters": {
+#       "learning_rate": {"log_uniform": [1e-5, 1e-3]},
+#       "epsilon_decay": {"uniform": [0.995, 0.9995]},
+#       "target_update_freq": {"int_uniform": [5, 20]},
+#       "batch_size": [64, 128, 256]      # danh sách: mọi giá trị (grid) hoặc chọn ngẫu nhiên (random)
+#     },
+#     "fixed": {"episodes": 500}          # giống nhau ở mọi trial
+#   }
+# Tên tham số là thuộc tính cấu hình của train_dqn.py (--learning-rate -> learning_rate).
+
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(threads)
+
+
+def sample_value(spec, rng):
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    (kind, (low, high)), = spec.items()
+    if kind == 'uniform':
+        return rng.uniform(low, high)
+    if kind == 'log_uniform':
+        return math.exp(rng.uniform(math.log(low), math.log(high)))
+    if kind == 'int_uniform':
+        return rng.randint(low, high)
+    raise ValueError(f"Kiểu phân phối không hỗ trợ: '{kind}'")
+
+
+def build_trials(spec, seed):
+    parameters = spec['parameters']
+    if spec.get('method', 'grid') == 'grid':
+        for name, values in parameters.items():
+            if not isinstance(values, list):
+                raise ValueError(f"Grid search cần danh sách giá trị cho '{name}'")
+        names = list(parameters)
+        return [dict(zip(names, values)) for values in itertools.product(*(parameters[n] for n in names))]
+    rng = random.Random(seed)
+    return [{name: sample_value(values, rng) for name, values in parameters.items()} for _ in range(spec['trials'])]
+
+
+# Khoá (trial, STOPPED) trong progress giữ điểm TB lúc trial bị dừng sớm
+STOPPED = 'stopped'
+
+
+def should_stop(progress, trial_id, episode, avg_score, rule):
+    # Dừng nếu điểm TB trượt thấp hơn phân vị rule['percentile'] của các trial khác ở cùng số ván. Trial đã bị
+    # dừng trước mốc này vẫn là peer với điểm lúc dừng: nếu chỉ so với các trial còn chạy, phân vị tăng sau
+    # mỗi mốc và loại dần cả những trial tốt
+    if episode < rule['grace'] or episode % rule['every']:
+        return False
+    progress[(trial_id, episode)] = avg_score
+    items = progress.items()
+    peers = {other: score for (other, e), score in items if e == episode and other != trial_id}
+    for (other, e), score in items:
+        if e == STOPPED and other != trial_id and other not in peers:
+            peers[other] = score
+    stop = len(peers) >= rule['min_peers'] and avg_score < np.percentile(list(peers.values()), rule['percentile'])
+    if stop:
+        progress[(trial_id, STOPPED)] = avg_score
+    return stop
+
+
+def run_trial(trial_id, params, fixed, seed, out_dir, progress, rule):
+    from train_dqn import train, default_config
+    prefix = os.path.join(out_dir, f"trial_{trial_id:03d}")
+    config = default_config(**{'seed': seed, 'metrics_file': '', 'checkpoint_every': 0, 'best_model': prefix + '_best.pth',
+                               'final_model': prefix + '_final.pth', **fixed, **params})
+    # Log của từng trial ghi ra file riêng để các tiến trình không in lẫn vào nhau
+    with open(prefix + '.log', 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        on_episode = (lambda episode, avg: should_stop(progress, trial_id, episode, avg, rule)) if rule else None
+        return train(config, on_episode=on_episode)
+
+
+def print_table(rows, param_names):
+    header = f"{'trial':>5} {'avg cuối':>9} {'avg tốt nhất':>12} {'ván':>6} {'bước tới đích':>13} {'phút':>6}  trạng thái  " + \
+             '  '.join(f"{name:>14}" for name in param_names)
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        params = '  '.join(f"{row[name]:>14.6g}" if isinstance(row[name], float) else f"{row[name]:>14}" for name in param_names)
+        steps_to_target = row.get('steps_to_target')
+        print(f"{row['trial']:>5} {row['final_avg_score']:>9.2f} {row['best_avg_score']:>12.2f} {row['episodes']:>6} "
+              f"{steps_to_target if steps_to_target is not None else '-':>13} {row['seconds'] / 60:>6.1f}  {row['status']:10s}  {params}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('spec', help='File JSON mô tả không gian tìm kiếm')
+    parser.add_argument('--threads-per-trial', type=int, default=1, help='Số thread torch của mỗi trial')
+    parser.add_argument('--workers', type=int, default=None, help='Số trial chạy cùng lúc; mặc định số nhân / --threads-per-trial')
+    parser.add_argument('--seed', type=int, default=0, help='Seed huấn luyện dùng chung cho mọi trial và seed lấy mẫu random search')
+    parser.add_argument('--out-dir', default='sweeps', help='Thư mục chứa model, log từng trial và summary.csv')
+    parser.add_argument('--no-early-stop', action='store_true')
+    parser.add_argument('--stop-grace', type=int, default=200, help='Không dừng trial nào trước số ván này')
+    parser.add_argument('--stop-every', type=int, default=50, help='Số ván giữa hai lần xét dừng sớm')
+    parser.add_argument('--stop-percentile', type=float, default=25, help='Dừng trial có điểm TB dưới phân vị này của các trial khác')
+    parser.add_argument('--stop-min-peers', type=int, default=3, help='Cần ít nhất chừng này trial khác để so sánh')
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    trials = build_trials(spec, args.seed)
+    fixed = spec.get('fixed', {})
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_trial)
+    rule = None if args.no_early_stop else {'grace': args.stop_grace, 'every': args.stop_every,
+                                            'percentile': args.stop_percentile, 'min_peers': args.stop_min_peers}
+    os.makedirs(args.out_dir, exist_ok=True)
+    print(f"{len(trials)} trial, {workers} tiến trình x {args.threads_per_trial} thread; log và model trong '{args.out_dir}'")
+
+    rows = []
+    start = time.time()
+    with mp.get_context('spawn').Manager() as manager, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'),
+                                initializer=_init_worker, initargs=(args.threads_per_trial,)) as pool:
+        progress = manager.dict()
+        futures = {pool.submit(run_trial, i, params, fixed, args.seed, args.out_dir, progress, rule): (i, params)
+                   for i, params in enumerate(trials)}
+        for future in as_completed(futures):
+            trial_id, params = futures[future]
+            row = {'trial': trial_id, **params}
+            try:
+                result = future.result()
+                row.update(result, status='dừng sớm' if result['stopped_early'] else 'xong')
+            except Exception as e:
+                row.update(episodes=0, total_steps=0, best_avg_score=float('nan'), final_avg_score=float('nan'),
+                           seconds=0.0, status='lỗi')
+                print(f"Trial {trial_id} lỗi: {e!r}")
+            rows.append(row)
+            print(f"[{len(rows)}/{len(trials)}] trial {trial_id}: {row['status']}, điểm TB cuối {row['final_avg_score']:.2f} "
+                  f"sau {row['episodes']} ván | {params}")
+
+    # Trial chạy đủ số ván xếp trước: điểm TB của trial dừng sớm tính trên ít ván hơn nên không so trực tiếp được
+    status_order = {'xong': 0, 'dừng sớm': 1, 'lỗi': 2}
+    rows.sort(key=lambda r: (status_order[r['status']], -r['final_avg_score'] if r['status'] != 'lỗi' else 0))
+    param_names = list(spec['parameters'])
+    print(f"\n=== Kết quả ({(time.time() - start) / 60:.1f} phút) ===")
+    print_table(rows, param_names)
+
+    summary_path = os.path.join(args.out_dir, 'summary.csv')
+    with open(summary_path, 'w', newline='') as f:
+        fields = ['trial', 'status', 'final_avg_score', 'best_avg_score', 'episodes', 'total_steps', 'steps_to_target',
+                  'curriculum_stage', 'seconds'] + param_names
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nĐã ghi bảng kết quả vào {summary_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+# Cho phép import các module ở thư mục gốc của repo (rapid_roll_env, dqn_agent, ...) khi chạy pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+# AsyncLearner: giữ đúng replay ratio, paused() chặn cập nhật khi chụp checkpoint, stop() dừng thread gọn gàng.
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from async_learner import AsyncLearner, _LockedReplay
+from dqn_agent import DQNAgent
+
+
+def make_agent(memory_size=5000):
+    torch.set_num_threads(1)
+    return DQNAgent(6, 3, batch_size=32, memory_size=memory_size, seed=0)
+
+
+def run_steps(learner, steps, rng):
+    state = rng.random(6, dtype=np.float32)
+    for t in range(steps):
+        action = learner.act(state)
+        next_state = rng.random(6, dtype=np.float32)
+        learner.push(state, action, next_state, float(rng.normal()), t % 200 == 199)
+        state = next_state
+
+
+@pytest.mark.parametrize('replay_ratio', [0.25, 1.0])
+def test_replay_ratio_is_held(replay_ratio):
+    max_lag = 8
+    learner = AsyncLearner(make_agent(), replay_ratio=replay_ratio, max_lag=max_lag).start()
+    run_steps(learner, 3000, np.random.default_rng(0))
+    learner.stop()
+    stats = learner.stats()
+    steps = learner.env_steps - learner._start_steps
+    # Learner không vượt quá ngân sách, actor chờ khi learner tụt lại quá max_lag cập nhật
+    budget = replay_ratio * steps
+    assert budget - max_lag - 1 <= stats['async_updates'] <= budget + 1
+    assert stats['async_replay_ratio'] == pytest.approx(replay_ratio, abs=(max_lag + 1) / steps)
+
+
+def test_paused_blocks_updates():
+    agent = make_agent()
+    # Ngân sách lớn, max_lag lớn: actor không chờ nên learner luôn còn việc khi bị dừng
+    learner = AsyncLearner(agent, replay_ratio=8.0, max_lag=100000).start()
+    run_steps(learner, 500, np.random.default_rng(1))
+    while learner.updates < 5:
+        time.sleep(0.01)
+    with learner.paused():
+        # Lần cập nhật đang chạy lúc lấy khoá có thể vừa tăng bộ đếm ngay sau khi nhả khoá
+        time.sleep(0.05)
+        updates = learner.updates
+        weights = {name: value.clone() for name, value in agent.policy_net.state_dict().items()}
+        assert updates < learner._budget()
+        time.sleep(0.3)
+        assert learner.updates == updates
+        for name, value in agent.policy_net.state_dict().items():
+            assert torch.equal(value, weights[name]), name
+    deadline = time.time() + 10
+    while learner.updates == updates and time.time() < deadline:
+        time.sleep(0.01)
+    assert learner.updates > updates
+    learner.stop()
+
+
+def test_stop_joins_and_restores_memory():
+    agent = make_agent()
+    memory = agent.memory
+    learner = AsyncLearner(agent, replay_ratio=0.5, push_chunk=64).start()
+    assert isinstance(agent.memory, _LockedReplay)
+    run_steps(learner, 1000, np.random.default_rng(2))
+    learner.stop()
+    assert not learner._thread.is_alive()
+    assert agent.memory is memory
+    # Khối transition đang gom dở cũng được ghi vào buffer khi dừng
+    assert len(memory) == 1000
+
+
+def test_learner_error_reaches_actor():
+    agent = make_agent()
+
+    def broken_learn():
+        raise RuntimeError('learn hỏng')
+    agent.learn = broken_learn
+    learner = AsyncLearner(agent, replay_ratio=1.0).start()
+    with pytest.raises(RuntimeError, match='learn hỏng'):
+        run_steps(learner, 5000, np.random.default_rng(3))
+    with pytest.raises(RuntimeError, match='learn hỏng'):
+        learner.stop()
+    assert not learner._thread.is_alive()
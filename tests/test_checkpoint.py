@@ -0,0 +1,55 @@
+# Huấn luyện bị ngắt rồi --resume (có --checkpoint-replay, chế độ đồng bộ) phải cho ra đúng từng bit
+# trọng số và file ghi ván như khi huấn luyện một mạch.
+import os
+
+import pytest
+import torch
+
+from train_dqn import train, default_config
+
+
+def run(tmp_path, name, **overrides):
+    config = default_config(seed=0, batch_size=32, memory_size=2000, print_every=0, metrics_file='',
+                            checkpoint_every=2, checkpoint_replay=True,
+                            checkpoint_dir=str(tmp_path / f'{name}_checkpoints'),
+                            best_model=str(tmp_path / f'{name}_best.pth'), final_model=str(tmp_path / f'{name}_final.pth'),
+                            record_episodes=str(tmp_path / f'{name}.rrec'), **overrides)
+    return train(config)
+
+
+def test_resume_is_bit_identical(tmp_path):
+    full = run(tmp_path, 'full', episodes=8)
+    # Lần chạy thứ hai dừng sau ván 5 (checkpoint ở ván 2, 4 và ván cuối) rồi huấn luyện tiếp tới ván 8
+    run(tmp_path, 'resumed', episodes=5)
+    resumed = run(tmp_path, 'resumed', episodes=8, resume=True)
+    assert resumed['total_steps'] == full['total_steps']
+
+    full_weights = torch.load(tmp_path / 'full_final.pth')
+    resumed_weights = torch.load(tmp_path / 'resumed_final.pth')
+    assert full_weights.keys() == resumed_weights.keys()
+    for name in full_weights:
+        assert torch.equal(full_weights[name], resumed_weights[name]), name
+    assert (tmp_path / 'full.rrec').read_bytes() == (tmp_path / 'resumed.rrec').read_bytes()
+
+
+def test_existing_checkpoint_needs_resume_or_overwrite(tmp_path):
+    run(tmp_path, 'run', episodes=2)
+    checkpoint_dir = tmp_path / 'run_checkpoints'
+    (checkpoint_dir / 'notes.txt').write_text('giữ lại')
+    (checkpoint_dir / 'replay' / 'seg_000000000001.npz').write_bytes(b'stale')
+    (tmp_path / 'run_final.pth').write_bytes(b'old model')
+    with pytest.raises(SystemExit):
+        run(tmp_path, 'run', episodes=2)
+    # Từ chối trước khi xoá bất cứ thứ gì
+    assert (tmp_path / 'run_final.pth').read_bytes() == b'old model'
+
+    run(tmp_path, 'run', episodes=2, overwrite_checkpoint=True)
+    # Chỉ file checkpoint được ghi lại; file khác trong thư mục vẫn còn
+    assert (checkpoint_dir / 'notes.txt').read_text() == 'giữ lại'
+    assert sorted(os.listdir(checkpoint_dir / 'replay')) == ['seg_%012d.npz' % torch.load(
+        checkpoint_dir / 'checkpoint.pt', weights_only=False)['replay']['pushes']]
+
+
+def test_resume_without_checkpoint_exits_cleanly(tmp_path):
+    with pytest.raises(SystemExit, match='Không có checkpoint'):
+        run(tmp_path, 'missing', episodes=2, resume=True)
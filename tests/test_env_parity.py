@@ -0,0 +1,72 @@
+# RapidRollEnv phải giữ đúng từng bit hành vi của env gốc (Platform kế thừa pygame.Rect, random toàn cục).
+# Các digest dưới đây được sinh bằng env gốc (commit baseline) với random.seed(seed) rồi reset(); env hiện
+# tại dùng reset(seed=seed) nên phải cho ra cùng chuỗi state, reward và done.
+import hashlib
+
+import numpy as np
+import pytest
+
+from rapid_roll_env import RapidRollEnv
+
+# seed: (số bước, điểm, 16 ký tự đầu sha256 của states/rewards/dones)
+ORIGINAL_ENV_DIGESTS = {
+    0: (1068, 13, 'a810ad4ac180b1ba'),
+    1: (190, 2, '5783e3f260e7f655'),
+    2: (119, 0, 'c134bf648f76bfc9'),
+    3: (570, 7, 'c077485cefbb339a'),
+    4: (116, 0, '71ce772ad4ae57c6'),
+    5: (294, 3, '1927f66f10cb6d62'),
+}
+
+
+def policy_action(state, rng):
+    # Chủ yếu đi về phía platform gần nhất bên dưới (ván đủ dài để platform bị cuộn bỏ và sinh mới), đôi khi ngẫu nhiên
+    if rng.random() < 0.2:
+        return int(rng.integers(0, 3))
+    return 2 if state[2] > 0.03 else 0 if state[2] < -0.03 else 1
+
+
+@pytest.mark.parametrize('seed', sorted(ORIGINAL_ENV_DIGESTS))
+def test_matches_original_pygame_env(seed):
+    env = RapidRollEnv(headless=True)
+    state = env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    states, rewards, dones = [state], [], []
+    for _ in range(3000):
+        a = policy_action(state, rng)
+        state, reward, done, _ = env.step(a)
+        states.append(state)
+        rewards.append(reward)
+        dones.append(done)
+        if done:
+            break
+    digest = hashlib.sha256(np.array(states, np.float32).tobytes() + np.array(rewards, np.float64).tobytes()
+                            + np.array(dones).tobytes()).hexdigest()[:16]
+    assert (len(rewards), env.score, digest) == ORIGINAL_ENV_DIGESTS[seed]
+
+
+@pytest.mark.parametrize('snap', [True, False])
+@pytest.mark.parametrize('frame_skip', [2, 4])
+def test_frame_skip_equals_single_steps(frame_skip, snap):
+    # Một step với frame_skip=k giống hệt k step liên tiếp cùng hành động (dừng ở frame kết thúc ván)
+    for seed in range(5):
+        skipped = RapidRollEnv(headless=True, frame_skip=frame_skip, snap_platforms_to_pixels=snap)
+        single = RapidRollEnv(headless=True, snap_platforms_to_pixels=snap)
+        state = skipped.reset(seed=seed)
+        np.testing.assert_array_equal(state, single.reset(seed=seed))
+        rng = np.random.default_rng(seed)
+        done = False
+        while not done:
+            action = policy_action(state, rng)
+            state, reward, done, info = skipped.step(action)
+            total = 0
+            for _ in range(frame_skip):
+                single_state, single_reward, single_done, single_info = single.step(action)
+                total += single_reward
+                if single_done:
+                    break
+            np.testing.assert_array_equal(state, single_state)
+            assert reward == total
+            assert done == single_done
+            assert info == single_info
+            assert skipped.ticks == single.ticks
@@ -0,0 +1,104 @@
+# Sum-tree và PrioritizedReplayMemory: phân phối lấy mẫu, trọng số IS, cập nhật priority và dựng lại cây.
+import numpy as np
+import pytest
+
+from dqn_agent import SumTree, PrioritizedReplayMemory
+
+# Ngưỡng chi-square ở mức ý nghĩa 0.001 theo số bậc tự do
+CHI2_CRITICAL = {4: 18.47, 5: 20.52}
+
+
+def chi_square(counts, probs):
+    expected = probs * counts.sum()
+    return float(((counts - expected) ** 2 / expected).sum())
+
+
+def filled_memory(capacity, pushes, **kwargs):
+    memory = PrioritizedReplayMemory(capacity, seed=0, **kwargs)
+    rng = np.random.default_rng(0)
+    for i in range(pushes):
+        memory.push(rng.random(6, dtype=np.float32), i % 3, rng.random(6, dtype=np.float32), 0.0, False)
+    return memory
+
+
+def test_find_samples_proportionally_to_leaves():
+    # capacity 5 nằm trong cây 8 lá: 3 lá rỗng không bao giờ được chọn
+    leaves = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    tree = SumTree(len(leaves))
+    tree.rebuild(leaves)
+    assert tree.total == leaves.sum()
+    values = np.random.default_rng(0).random(100000) * tree.total
+    counts = np.bincount(tree.find(values), minlength=tree.tree_capacity)
+    assert counts[len(leaves):].sum() == 0
+    assert chi_square(counts[:len(leaves)], leaves / leaves.sum()) < CHI2_CRITICAL[4]
+
+
+def test_find_never_lands_on_an_empty_leaf():
+    # Tổng tính ra 0.6 + 1.1 làm tròn lên: giá trị sát tổng còn dư đúng bằng 1.1 sau khi rẽ phải ở gốc, và
+    # trước đây rơi vào lá rỗng số 3
+    tree = SumTree(3)
+    tree.rebuild(np.array([0.1, 0.5, 1.1]))
+    assert tree.find(np.array([np.nextafter(tree.total, 0)]))[0] == 2
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        size = int(rng.integers(1, 40))
+        tree = SumTree(int(rng.integers(size, 41)))
+        tree.rebuild(rng.random(size) ** rng.uniform(0.2, 3))
+        values = np.append(rng.random(50) * tree.total, np.nextafter(tree.total, 0))
+        assert tree.find(values).max() < size
+
+
+def test_sample_follows_priorities():
+    memory = filled_memory(6, 6, alpha=0.7)
+    td_errors = np.array([0.5, 1.0, 2.0, 0.1, 3.0, 1.5])
+    memory.update_priorities(np.arange(6), td_errors)
+    probs = (td_errors + memory.eps) ** 0.7
+    probs /= probs.sum()
+    counts = np.zeros(6)
+    for _ in range(2000):
+        indices = memory.sample(32)[-1]
+        counts += np.bincount(indices, minlength=6)
+    assert chi_square(counts, probs) < CHI2_CRITICAL[5]
+
+
+def test_importance_weights_follow_annealed_beta():
+    memory = filled_memory(8, 8, alpha=0.6, beta=0.4, beta_final=1.0, anneal_steps=10)
+    td_errors = np.linspace(0.1, 4.0, 8)
+    memory.update_priorities(np.arange(8), td_errors)
+    priorities = (td_errors + memory.eps) ** 0.6
+    for k in range(1, 15):
+        *_, weights, indices = memory.sample(16)
+        beta = 0.4 + 0.6 * min(1.0, k / 10)
+        assert memory.beta == pytest.approx(beta)
+        expected = (8 * priorities[indices] / priorities.sum()) ** -beta
+        np.testing.assert_allclose(weights.numpy(), expected / expected.max(), rtol=1e-5)
+
+
+def test_update_priorities_after_wrap():
+    memory = filled_memory(4, 6, alpha=0.5)
+    # Ô 0 và 1 đã bị ghi đè khi vòng lại; mọi ô đều mang priority tối đa ban đầu
+    assert memory.position == 2 and len(memory) == 4
+    np.testing.assert_array_equal(memory.priorities, 1.0)
+    memory.update_priorities(np.array([0, 3]), np.array([-2.0, 0.5]))
+    leaves = memory.tree.tree[memory.tree.tree_capacity:]
+    assert leaves[0] == pytest.approx((2.0 + memory.eps) ** 0.5)
+    assert leaves[3] == pytest.approx((0.5 + memory.eps) ** 0.5)
+    assert memory.max_priority == pytest.approx(2.0 + memory.eps)
+    # Transition mới (ghi vào ô 2) nhận priority lớn nhất hiện có
+    memory.push(np.zeros(6, dtype=np.float32), 0, np.zeros(6, dtype=np.float32), 0.0, False)
+    assert leaves[2] == pytest.approx((2.0 + memory.eps) ** 0.5)
+    assert memory.tree.total == pytest.approx(leaves[:4].sum())
+    assert leaves[4:].sum() == 0
+
+
+def test_alpha_anneal_rebuilds_tree():
+    memory = filled_memory(8, 5, alpha=0.6, alpha_final=0.2, anneal_steps=4)
+    td_errors = np.array([0.2, 1.0, 3.0, 0.7, 2.0])
+    memory.update_priorities(np.arange(5), td_errors)
+    for _ in range(4):
+        memory.sample(4)
+    assert memory.alpha == 0.2
+    leaves = memory.tree.tree[memory.tree.tree_capacity:]
+    np.testing.assert_allclose(leaves[:5], (td_errors + memory.eps) ** 0.2, rtol=1e-6)
+    assert leaves[5:].sum() == 0
+    assert memory.tree.total == pytest.approx(leaves[:5].sum())
@@ -0,0 +1,30 @@
+# PolicyInference đóng băng bản sao của mạng, không đụng tới mạng đang huấn luyện của nơi gọi.
+import numpy as np
+import pytest
+import torch
+
+from dqn_agent import QNetwork
+from policy_inference import PolicyInference
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'torchscript', 'torch'])
+def test_does_not_modify_callers_net(backend):
+    torch.manual_seed(0)
+    net = QNetwork(6, 3).train()
+    before = {name: p.clone() for name, p in net.named_parameters()}
+    engine = PolicyInference(net, backend=backend)
+    assert net.training
+    assert all(p.requires_grad for p in net.parameters())
+
+    states = np.random.default_rng(0).random((32, 6), dtype=np.float32)
+    with torch.no_grad():
+        expected = net(torch.from_numpy(states)).argmax(1).numpy()
+    np.testing.assert_array_equal(engine.act(states), expected)
+
+    # Cập nhật mạng gốc sau khi tạo engine không đổi hành động của engine (trọng số đã chụp lại)
+    with torch.no_grad():
+        for p in net.parameters():
+            p.add_(1.0)
+    np.testing.assert_array_equal(engine.act(states), expected)
+    for name, p in engine.net.named_parameters():
+        assert torch.equal(p, before[name])
@@ -0,0 +1,122 @@
+# File .rrec (seed + chuỗi hành động) phải mô phỏng lại đúng ván đã ghi, ở định dạng hiện tại (v3) và các
+# định dạng cũ v2, v1.
+import numpy as np
+import pytest
+
+import zlib
+
+from curriculum import default_stages
+from episode_recorder import (EpisodeRecorder, read_episodes, replay_episode, state_digest,
+                              _HEADER_V1, _MAGIC_V1, _HEADER_V2, _MAGIC_V2, _CHUNK_LEN)
+from rapid_roll_env import RapidRollEnv, LevelTable, DEFAULT_DIFFICULTY
+
+
+def play(env, seed, recorder=None, max_steps=3000, difficulty=None):
+    rng = np.random.default_rng(seed)
+    env.reset(seed=seed, difficulty=difficulty)
+    if recorder is not None:
+        recorder.begin(env, seed)
+    actions = []
+    total_reward = 0
+    done = False
+    for _ in range(max_steps):
+        action = int(rng.integers(0, 3))
+        _, reward, done, _ = env.step(action)
+        actions.append(action)
+        if recorder is not None:
+            recorder.record(action)
+        total_reward += reward
+        if done:
+            break
+    if recorder is not None:
+        recorder.end(env.score, done, total_reward)
+    return actions, env.score, done, total_reward, state_digest(env)
+
+
+@pytest.mark.parametrize('frame_skip', [1, 3])
+def test_round_trip(tmp_path, frame_skip):
+    path = str(tmp_path / 'episodes.rrec')
+    env = RapidRollEnv(headless=True, frame_skip=frame_skip)
+    # chunk_size nhỏ để một ván trải qua nhiều khối nén
+    recorder = EpisodeRecorder(path, chunk_size=64)
+    played = [play(env, seed, recorder) for seed in range(10)]
+    recorder.close()
+
+    records = list(read_episodes(path))
+    assert len(records) == len(played)
+    for seed, (record, (actions, score, done, total_reward, digest)) in enumerate(zip(records, played)):
+        assert record.seed == seed and record.frame_skip == frame_skip
+        assert record.actions.tolist() == actions
+        assert (record.score, record.done, record.total_reward, record.state_digest) == (score, done, total_reward, digest)
+        assert replay_episode(record) == (len(actions), score, done, total_reward, digest)
+
+
+def test_round_trip_with_difficulty_and_level_tables(tmp_path):
+    # Ván của curriculum (mỗi ván một độ khó) trên bảng màn chơi sinh sẵn, cả toạ độ liên tục
+    path = str(tmp_path / 'curriculum.rrec')
+    recorder = EpisodeRecorder(path)
+    stages = default_stages(5)
+    played = []
+    for snap in (True, False):
+        env = RapidRollEnv(headless=True, snap_platforms_to_pixels=snap, levels=LevelTable(7, 16, 64))
+        played += [play(env, seed, recorder, difficulty=stages[seed % len(stages)]) for seed in range(10)]
+    recorder.close()
+
+    records = list(read_episodes(path))
+    assert len(records) == len(played)
+    for k, (record, (actions, score, done, total_reward, digest)) in enumerate(zip(records, played)):
+        assert record.difficulty == stages[record.seed % len(stages)]
+        assert record.levels == (7, 16, 64)
+        assert record.snap_platforms_to_pixels == (k < 10)
+        assert replay_episode(record) == (len(actions), score, done, total_reward, digest)
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_reads_old_versions(tmp_path, version):
+    # v1 không có frame_skip, v2 chưa có độ khó và bảng màn chơi: đọc ra với giá trị mặc định
+    path = tmp_path / f'v{version}.rrec'
+    frame_skip = 1 if version == 1 else 2
+    env = RapidRollEnv(headless=True, frame_skip=frame_skip)
+    with open(path, 'wb') as f:
+        f.write(_MAGIC_V1 if version == 1 else _MAGIC_V2)
+        for seed in range(3):
+            actions, score, done, total_reward, digest = play(env, seed)
+            chunk = zlib.compress(bytes(actions))
+            if version == 1:
+                f.write(_HEADER_V1.pack(seed, 0.0, True, len(actions), score, done, total_reward, digest, 1))
+            else:
+                f.write(_HEADER_V2.pack(seed, 0.0, True, frame_skip, len(actions), score, done, total_reward, digest, 1))
+            f.write(_CHUNK_LEN.pack(len(chunk)) + chunk)
+    records = list(read_episodes(str(path)))
+    assert [r.seed for r in records] == [0, 1, 2]
+    for record in records:
+        assert record.frame_skip == frame_skip
+        assert record.difficulty == DEFAULT_DIFFICULTY and record.levels is None
+        assert replay_episode(record) == (len(record.actions), record.score, record.done, record.total_reward,
+                                          record.state_digest)
+
+
+def test_training_with_curriculum_records_replayable_episodes(tmp_path):
+    from train_dqn import train, default_config
+    path = str(tmp_path / 'train.rrec')
+    train(default_config(seed=0, episodes=6, curriculum=True, level_tables=8, record_episodes=path, batch_size=32,
+                         memory_size=2000, metrics_file='', checkpoint_every=0, print_every=0,
+                         best_model=str(tmp_path / 'best.pth'), final_model=str(tmp_path / 'final.pth')))
+    records = list(read_episodes(path))
+    assert len(records) == 6
+    for record in records:
+        assert record.difficulty != DEFAULT_DIFFICULTY and record.levels == (0, 8, 256)
+        assert replay_episode(record) == (len(record.actions), record.score, record.done, record.total_reward,
+                                          record.state_digest)
+
+
+def test_training_rejects_old_format_before_deleting_anything(tmp_path):
+    from train_dqn import train, default_config
+    path = tmp_path / 'old.rrec'
+    path.write_bytes(_MAGIC_V2)
+    best = tmp_path / 'best.pth'
+    best.write_bytes(b'old model')
+    with pytest.raises(SystemExit):
+        train(default_config(seed=0, episodes=1, record_episodes=str(path), metrics_file='', checkpoint_every=0,
+                             print_every=0, best_model=str(best), final_model=str(tmp_path / 'final.pth')))
+    assert best.read_bytes() == b'old model'
@@ -0,0 +1,83 @@
+# MemmapReplayMemory: dữ liệu còn lại khi mở lại thư mục, tiến trình đọc readonly + refresh(), và các lỗi
+# khi mở buffer không khớp cấu hình.
+import numpy as np
+import pytest
+import torch
+
+from dqn_agent import MemmapReplayMemory
+
+
+def fill(memory, n, seed=0):
+    rng = np.random.default_rng(seed)
+    states = rng.random((n, 6), dtype=np.float32)
+    next_states = rng.random((n, 6), dtype=np.float32)
+    memory.push_batch(states, rng.integers(0, 3, n), next_states, rng.random(n, dtype=np.float32), rng.random(n) < 0.1)
+    return states, next_states
+
+
+def test_reopen_keeps_transitions(tmp_path):
+    directory = str(tmp_path / 'replay')
+    memory = MemmapReplayMemory(directory, 50, seed=0)
+    states, next_states = fill(memory, 70)
+    columns = [a.copy() for a in (memory.states, memory.actions, memory.rewards, memory.next_states, memory.dones)]
+    memory.close()
+
+    reopened = MemmapReplayMemory(directory, seed=0)
+    assert (reopened.capacity, len(reopened), reopened.position, reopened.pushes) == (50, 50, 20, 70)
+    for saved, column in zip(columns, (reopened.states, reopened.actions, reopened.rewards, reopened.next_states, reopened.dones)):
+        np.testing.assert_array_equal(column, saved)
+    # Hàng 0 là transition thứ 50 (đã vòng lại)
+    np.testing.assert_array_equal(reopened.states[0], states[50])
+    np.testing.assert_array_equal(reopened.next_states[19], next_states[69])
+    # Ghi tiếp từ đúng vị trí cũ
+    reopened.push(np.ones(6, dtype=np.float32), 2, np.ones(6, dtype=np.float32), 1.5, True)
+    assert (reopened.position, reopened.pushes) == (21, 71)
+    assert reopened.rewards[20] == 1.5 and reopened.dones[20] == 1.0
+
+
+def test_readonly_reader_sees_writes_after_refresh(tmp_path):
+    directory = str(tmp_path / 'replay')
+    writer = MemmapReplayMemory(directory, 100, seed=0)
+    fill(writer, 30)
+    writer.flush()
+
+    reader = MemmapReplayMemory(directory, readonly=True, seed=1)
+    assert len(reader) == 30
+    states, actions, rewards, next_states, dones = reader.sample(16)
+    assert states.shape == (16, 6) and next_states.shape == (16, 6) and actions.dtype == torch.int64
+    assert not reader.states.flags.writeable
+
+    new_states, _ = fill(writer, 20, seed=1)
+    # Dữ liệu cột hiện ngay qua mapping dùng chung, còn size chỉ đổi sau flush() + refresh()
+    np.testing.assert_array_equal(reader.states[30:50], new_states)
+    assert len(reader) == 30
+    writer.flush()
+    assert len(reader) == 30
+    reader.refresh()
+    assert (len(reader), reader.position, reader.pushes) == (50, 50, 50)
+
+
+def test_readonly_needs_existing_buffer(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        MemmapReplayMemory(str(tmp_path / 'missing'), readonly=True)
+    with pytest.raises(FileNotFoundError):
+        MemmapReplayMemory(str(tmp_path / 'missing'))
+
+
+def test_mismatched_buffer_is_rejected(tmp_path):
+    directory = str(tmp_path / 'replay')
+    memory = MemmapReplayMemory(directory, 40, n_step=3, gamma=0.9)
+    for t in range(5):
+        memory.push(np.full(6, t, dtype=np.float32), 0, np.full(6, t + 1, dtype=np.float32), 1.0, t == 4)
+    memory.close()
+
+    with pytest.raises(ValueError, match='n_step=1'):
+        MemmapReplayMemory(directory, 40)
+    with pytest.raises(ValueError, match='capacity'):
+        MemmapReplayMemory(directory, 80, n_step=3)
+    with pytest.raises(ValueError, match='state size'):
+        MemmapReplayMemory(directory, 40, state_size=8, n_step=3)
+    # Tiến trình đọc lấy n_step theo buffer
+    assert MemmapReplayMemory(directory, readonly=True).n_step == 3
+    reopened = MemmapReplayMemory(directory, n_step=3, gamma=0.9)
+    assert len(reopened) == 5 and reopened.rewards[0] == pytest.approx(1 + 0.9 + 0.81)
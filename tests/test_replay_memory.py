@@ -0,0 +1,141 @@
+# ReplayMemory: vòng lại khi đầy, push_batch, sample, và return n bước được gộp ngay khi ghi (so với cách tính
+# trực tiếp từ chuỗi reward).
+import numpy as np
+import pytest
+import torch
+
+from dqn_agent import ReplayMemory
+
+
+def transitions(length, seed=0):
+    rng = np.random.default_rng(seed)
+    states = rng.random((length + 1, 6), dtype=np.float32)
+    rewards = rng.normal(size=length).astype(np.float32)
+    return states, rewards
+
+
+def expected_rows(states, rewards, n, gamma, terminal):
+    # Hàng t: (s_t, R_t = sum_k gamma^k r_{t+k} trong tối đa n bước, s_{t+m}, done)
+    length = len(rewards)
+    rows = []
+    for t in range(length):
+        m = min(n, length - t)
+        ret = sum(gamma ** k * float(rewards[t + k]) for k in range(m))
+        rows.append((states[t], ret, states[t + m], terminal and t + m == length))
+    return rows
+
+
+@pytest.mark.parametrize('n_step', [1, 3, 5])
+def test_n_step_returns_on_terminal_episode(n_step):
+    gamma = 0.9
+    states, rewards = transitions(12)
+    memory = ReplayMemory(100, n_step=n_step, gamma=gamma)
+    for t in range(len(rewards)):
+        memory.push(states[t], t % 3, states[t + 1], rewards[t], t == len(rewards) - 1)
+    assert len(memory) == len(rewards)
+    for i, (state, ret, next_state, done) in enumerate(expected_rows(states, rewards, n_step, gamma, True)):
+        np.testing.assert_array_equal(memory.states[i], state)
+        assert memory.actions[i] == i % 3
+        assert memory.rewards[i] == pytest.approx(ret, rel=1e-6)
+        np.testing.assert_array_equal(memory.next_states[i], next_state)
+        # Các bước cuối ván không còn đủ n bước nhưng vẫn kết thúc ở trạng thái terminal
+        assert memory.dones[i] == (1.0 if i + n_step >= len(rewards) else 0.0)
+
+
+def test_truncated_episode_drops_incomplete_returns():
+    # Ván bị cắt vì giới hạn số bước: end_episode() bỏ các bước chưa có đủ n reward, không bootstrap sai
+    gamma, n_step = 0.9, 3
+    states, rewards = transitions(10, seed=1)
+    memory = ReplayMemory(100, n_step=n_step, gamma=gamma)
+    for t in range(len(rewards)):
+        memory.push(states[t], 0, states[t + 1], rewards[t], False)
+    memory.end_episode()
+    assert len(memory) == len(rewards) - n_step + 1
+    for i, (state, ret, next_state, _) in enumerate(expected_rows(states, rewards, n_step, gamma, False)[:len(memory)]):
+        assert memory.rewards[i] == pytest.approx(ret, rel=1e-6)
+        np.testing.assert_array_equal(memory.next_states[i], next_state)
+        assert memory.dones[i] == 0.0
+    # Ván tiếp theo không dính reward của ván trước
+    memory.push(states[0], 0, states[1], 1.0, True)
+    assert memory.rewards[len(memory) - 1] == 1.0
+
+
+def test_push_batch_matches_push():
+    states, rewards = transitions(20, seed=2)
+    dones = np.zeros(20, dtype=np.float32)
+    dones[[7, 19]] = 1
+    actions = np.arange(20) % 3
+    for n_step in (1, 3):
+        one = ReplayMemory(64, n_step=n_step, gamma=0.95)
+        batch = ReplayMemory(64, n_step=n_step, gamma=0.95)
+        for t in range(20):
+            one.push(states[t], actions[t], states[t + 1], rewards[t], bool(dones[t]))
+        batch.push_batch(states[:-1], actions, states[1:], rewards, dones)
+        for column in ('states', 'actions', 'rewards', 'next_states', 'dones'):
+            np.testing.assert_array_equal(getattr(one, column), getattr(batch, column))
+        assert (one.size, one.position, one.pushes) == (batch.size, batch.position, batch.pushes)
+
+
+def test_ring_wraps_at_capacity():
+    states, rewards = transitions(12, seed=3)
+    memory = ReplayMemory(5)
+    for t in range(12):
+        memory.push(states[t], t % 3, states[t + 1], rewards[t], t == 11)
+    assert (len(memory), memory.position, memory.pushes) == (5, 2, 12)
+    # Transition thứ g nằm ở hàng g % capacity: hàng 0, 1 là 10, 11; hàng 2..4 là 7..9
+    for row, t in enumerate([10, 11, 7, 8, 9]):
+        np.testing.assert_array_equal(memory.states[row], states[t])
+        np.testing.assert_array_equal(memory.next_states[row], states[t + 1])
+        assert memory.actions[row] == t % 3 and memory.rewards[row] == rewards[t]
+    assert memory.dones.tolist() == [0.0, 1.0, 0.0, 0.0, 0.0]
+    # next_state None (ván kết thúc) ghi state 0 và done
+    memory.push(states[0], 1, None, 0.5)
+    np.testing.assert_array_equal(memory.next_states[2], 0)
+    assert memory.dones[2] == 1.0 and memory.position == 3
+
+
+def test_push_batch_wraps_like_push():
+    states, rewards = transitions(40, seed=4)
+    dones = (np.arange(40) % 9 == 8).astype(np.float32)
+    actions = np.arange(40) % 3
+    one = ReplayMemory(7)
+    batch = ReplayMemory(7)
+    for t in range(40):
+        one.push(states[t], actions[t], states[t + 1], rewards[t], bool(dones[t]))
+    # Các lô có kích thước khác nhau, có lô vượt qua cuối buffer
+    start = 0
+    for n in (3, 6, 1, 7, 5, 4, 7, 2, 5):
+        end = start + n
+        batch.push_batch(states[start:end], actions[start:end], states[start + 1:end + 1], rewards[start:end], dones[start:end])
+        start = end
+    assert start == 40
+    for column in ('states', 'actions', 'rewards', 'next_states', 'dones'):
+        np.testing.assert_array_equal(getattr(one, column), getattr(batch, column))
+    assert (one.size, one.position, one.pushes) == (batch.size, batch.position, batch.pushes) == (7, 5, 40)
+
+
+def test_sample_shapes_and_dtypes():
+    states, rewards = transitions(30, seed=5)
+    memory = ReplayMemory(100, seed=0)
+    for t in range(30):
+        memory.push(states[t], t % 3, states[t + 1], rewards[t], False)
+    batch = memory.sample(64)
+    assert len(batch) == 5
+    for tensor, shape, dtype in zip(batch, [(64, 6), (64,), (64,), (64, 6), (64,)],
+                                    [torch.float32, torch.int64, torch.float32, torch.float32, torch.float32]):
+        assert tensor.shape == shape and tensor.dtype == dtype and tensor.device.type == 'cpu'
+    # Chỉ lấy từ các hàng đã ghi, và các cột của một mẫu thuộc cùng một transition
+    sampled_states, actions, sampled_rewards, _, _ = (t.numpy() for t in batch)
+    rows = [int(np.flatnonzero((states[:30] == s).all(axis=1))[0]) for s in sampled_states]
+    assert actions.tolist() == [row % 3 for row in rows]
+    np.testing.assert_array_equal(sampled_rewards, rewards[rows])
+    # Cùng seed thì cùng chuỗi mẫu
+    again = ReplayMemory(100, seed=0)
+    again.push_batch(states[:30], np.arange(30) % 3, states[1:31], rewards, np.zeros(30))
+    np.testing.assert_array_equal(again.sample(64)[0].numpy(), sampled_states)
+
+
+def test_nbytes():
+    # Mỗi hàng: 2 state float32 + action int64 + reward, done float32
+    assert ReplayMemory(1000, state_size=6).nbytes == 1000 * (2 * 6 * 4 + 8 + 4 + 4)
+    assert ReplayMemory(10, state_size=11).nbytes == 10 * (2 * 11 * 4 + 8 + 4 + 4)
@@ -0,0 +1,66 @@
+# main.py --spectate: mỗi ván giữ hành động frame_skip frame theo đồng hồ riêng, ván vừa reset chọn hành động ngay.
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import numpy as np
+import pygame
+
+import main
+from rapid_roll_env import RapidRollEnv
+
+FRAME_SKIP = 4
+
+
+class RecordingEnv(RapidRollEnv):
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frames = 0
+        self.log = []
+        RecordingEnv.instances.append(self)
+
+    def reset(self, *args, **kwargs):
+        self.frames = 0
+        return super().reset(*args, **kwargs)
+
+    def step(self, action):
+        self.log.append((self.frames, action))
+        self.frames += 1
+        return super().step(action)
+
+
+class CountingPolicy:
+    # Trả về 0, 1, 2, 0, ... theo lượt chọn của từng hàng để biết hàng nào vừa được chọn lại hành động
+    state_size = 6
+
+    def __init__(self):
+        self.calls = 0
+
+    def act(self, states):
+        self.calls += 1
+        return (self.calls + np.arange(len(states))) % 3
+
+
+def test_each_game_keeps_its_own_frame_skip_clock(monkeypatch):
+    RecordingEnv.instances.clear()
+    monkeypatch.setattr(main, 'RapidRollEnv', RecordingEnv)
+    pygame.init()
+    args = SimpleNamespace(spectate=3, cell_scale=0.2, seed=0, frame_skip=FRAME_SKIP, continuous_physics=False,
+                           fps=0, duration=3.0)
+    main.spectate(CountingPolicy(), args, {'small': pygame.font.Font(None, 20)})
+    pygame.quit()
+
+    resets = 0
+    for env in RecordingEnv.instances:
+        held = None
+        for frames, action in env.log:
+            if frames % FRAME_SKIP == 0:
+                held = action
+            else:
+                # Giữa hai lần quyết định của chính ván này hành động không đổi
+                assert action == held
+            resets += frames == 0
+    # Có ván kết thúc giữa chừng thì phép kiểm tra mới có nghĩa
+    assert resets > len(RecordingEnv.instances)
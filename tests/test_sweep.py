@@ -0,0 +1,105 @@
+# sweep.py: mở rộng spec thành danh sách trial (grid / random) và luật dừng sớm theo phân vị.
+import numpy as np
+import pytest
+
+from sweep import build_trials, should_stop
+
+RULE = {'grace': 100, 'every': 50, 'percentile': 25, 'min_peers': 3}
+
+
+def test_grid_is_cartesian_product_in_order():
+    spec = {'method': 'grid', 'parameters': {'learning_rate': [1e-4, 1e-3], 'batch_size': [64, 128, 256]}}
+    trials = build_trials(spec, seed=0)
+    assert trials == [{'learning_rate': lr, 'batch_size': b} for lr in (1e-4, 1e-3) for b in (64, 128, 256)]
+    # Mặc định là grid
+    del spec['method']
+    assert build_trials(spec, seed=1) == trials
+
+
+def test_grid_needs_lists():
+    with pytest.raises(ValueError, match='learning_rate'):
+        build_trials({'parameters': {'learning_rate': {'uniform': [1e-4, 1e-3]}}}, seed=0)
+
+
+def test_random_samples_within_ranges_and_is_seeded():
+    spec = {'method': 'random', 'trials': 200, 'parameters': {
+        'learning_rate': {'log_uniform': [1e-5, 1e-3]},
+        'epsilon_decay': {'uniform': [0.995, 0.9995]},
+        'target_update_freq': {'int_uniform': [5, 7]},
+        'batch_size': [64, 128, 256],
+    }}
+    trials = build_trials(spec, seed=0)
+    assert len(trials) == 200
+    assert build_trials(spec, seed=0) == trials
+    assert build_trials(spec, seed=1) != trials
+    lrs = np.array([t['learning_rate'] for t in trials])
+    assert lrs.min() >= 1e-5 and lrs.max() <= 1e-3
+    # Log-uniform: khoảng một nửa số mẫu nằm dưới trung bình nhân của hai đầu
+    assert 0.35 < np.mean(lrs < 1e-4) < 0.65
+    assert all(0.995 <= t['epsilon_decay'] <= 0.9995 for t in trials)
+    # int_uniform lấy cả hai đầu mút
+    assert {t['target_update_freq'] for t in trials} == {5, 6, 7}
+    assert {t['batch_size'] for t in trials} == {64, 128, 256}
+
+
+def test_random_rejects_unknown_distribution():
+    with pytest.raises(ValueError, match='normal'):
+        build_trials({'method': 'random', 'trials': 1, 'parameters': {'x': {'normal': [0, 1]}}}, seed=0)
+
+
+def test_should_stop_only_at_checkpoints_after_grace():
+    progress = {}
+    assert not should_stop(progress, 0, 50, -100.0, RULE)
+    assert not should_stop(progress, 0, 120, -100.0, RULE)
+    # Không ghi điểm khi không xét, nên các trial khác không so với những mốc này
+    assert progress == {}
+
+
+def test_should_stop_below_percentile_of_peers():
+    # Trial tới mốc sau cùng so với 8 trial đi trước (điểm 1..8); phân vị 25 của chúng là 2.75
+    peers = {(trial_id, 100): float(trial_id + 1) for trial_id in range(8)}
+    assert np.percentile(list(peers.values()), 25) == 2.75
+    assert should_stop(dict(peers), 99, 100, 2.7, RULE)
+    assert not should_stop(dict(peers), 99, 100, 2.75, RULE)
+    assert not should_stop(dict(peers), 99, 100, 9.0, RULE)
+    # Chỉ so với trial khác ở cùng số ván: ở mốc 150 chưa có trial nào
+    assert not should_stop(dict(peers), 99, 150, -1000.0, RULE)
+    # Chưa đủ min_peers thì không dừng
+    assert not should_stop({(0, 100): 5.0, (1, 100): 6.0}, 99, 100, -1000.0, RULE)
+
+
+def test_should_stop_ignores_own_earlier_score():
+    progress = {}
+    for trial_id in range(3):
+        should_stop(progress, trial_id, 100, 10.0, RULE)
+    # Lần gọi lại của trial 0 ở cùng mốc không tính chính nó là peer
+    assert not should_stop(progress, 0, 100, 10.0, RULE)
+    assert should_stop(progress, 3, 100, 9.0, RULE)
+
+
+def simulate(order, scores, episodes=1000):
+    # Các trial báo điểm ở mỗi mốc theo thứ tự order (tốc độ mỗi worker); trả về tập trial bị dừng
+    progress = {}
+    stopped = set()
+    for episode in range(50, episodes + 1, 50):
+        for trial_id in order:
+            if trial_id not in stopped and should_stop(progress, int(trial_id), episode, scores(trial_id), RULE):
+                stopped.add(int(trial_id))
+    return stopped
+
+
+def test_stopped_trials_stay_in_the_peer_pool():
+    # Trial 4..7 tới mỗi mốc trước trial 0..3. Nếu chỉ so với các trial còn chạy, phân vị tăng sau mỗi lần
+    # dừng và loại dần tới nửa số trial (0..3); trial đã dừng phải vẫn được tính với điểm lúc dừng
+    assert simulate([4, 5, 6, 7, 0, 1, 2, 3], lambda k: float(k)) == {0, 1}
+
+
+def test_best_trials_are_never_stopped():
+    # 12 trial, trial k có điểm k + nhiễu ở mỗi mốc, thứ tự worker ngẫu nhiên nhưng cố định trong một sweep
+    counts = np.zeros(12, dtype=int)
+    for seed in range(100):
+        rng = np.random.default_rng(seed)
+        for trial_id in simulate(rng.permutation(12), lambda k: k + rng.normal(0, 0.3)):
+            counts[trial_id] += 1
+    assert counts[:2].min() > 80
+    assert counts[8:].sum() == 0
@@ -0,0 +1,62 @@
+# VectorRapidRollEnv phải cho ra đúng states, rewards, dones như RapidRollEnv từng bước một. Hai env dùng
+# RNG khác nhau (NumPy / random.Random) nên bố cục platform của ván vector được chép sang env đơn trước
+# mỗi bước; vật lý, va chạm, tính điểm và state do mỗi bên tự tính.
+from collections import deque
+
+import numpy as np
+import pytest
+
+from rapid_roll_env import RapidRollEnv, Platform, PLATFORM_WIDTH, PLATFORM_HEIGHT
+from vector_env import VectorRapidRollEnv
+
+
+def copy_layout(env, vec, row):
+    order = np.argsort(vec.platform_y[row], kind='stable')
+    width, height = (int(PLATFORM_WIDTH), int(PLATFORM_HEIGHT)) if env.snap_platforms_to_pixels else (PLATFORM_WIDTH, PLATFORM_HEIGHT)
+    cast = int if env.snap_platforms_to_pixels else float
+    env.platforms = deque(Platform(cast(vec.platform_x[row, k]), cast(vec.platform_y[row, k]), width, height,
+                                   bool(vec.platform_spike[row, k])) for k in order)
+    env._next_below = 0
+
+
+def copy_game(env, vec, row):
+    env.reset()
+    env.ball_pos = [float(vec.ball_x[row]), float(vec.ball_y[row])]
+    env.ball_vel = [0, float(vec.ball_vy[row])]
+    env.current_scroll_speed = float(vec.scroll_speed[row])
+    env.score = int(vec.score[row])
+    copy_layout(env, vec, row)
+
+
+@pytest.mark.parametrize('snap', [True, False])
+def test_lockstep_with_rapid_roll_env(snap):
+    num_envs = 8
+    vec = VectorRapidRollEnv(num_envs, seed=0, snap_platforms_to_pixels=snap)
+    envs = [RapidRollEnv(headless=True, snap_platforms_to_pixels=snap) for _ in range(num_envs)]
+    for row, env in enumerate(envs):
+        copy_game(env, vec, row)
+    states = vec._get_state()
+    np.testing.assert_array_equal(states, np.stack([env._get_state() for env in envs]))
+
+    rng = np.random.default_rng(0)
+    episodes = 0
+    for _ in range(3000):
+        actions = rng.integers(0, 3, num_envs)
+        states, rewards, dones, info = vec.step(actions)
+        finals = dict(zip(info.get('done_rows', []), zip(info.get('final_state', []), info.get('final_score', []))))
+        for row, env in enumerate(envs):
+            state, reward, done, _ = env.step(int(actions[row]))
+            assert rewards[row] == reward
+            assert dones[row] == done
+            if done:
+                final_state, final_score = finals[row]
+                np.testing.assert_array_equal(final_state, state)
+                assert final_score == env.score
+                copy_game(env, vec, row)
+                episodes += 1
+            else:
+                np.testing.assert_array_equal(states[row], state)
+                # Platform mới sinh ở đáy lấy theo RNG của mỗi env: chép lại bố cục của ván vector
+                copy_layout(env, vec, row)
+            np.testing.assert_array_equal(states[row], env._get_state())
+    assert episodes > 0
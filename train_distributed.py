@@ -0,0 +1,230 @@
+# train_distributed.py
+# Huấn luyện DQN với K tiến trình actor (mỗi actor chạy nhiều RapidRollEnv headless)
+# và một learner duy nhất giữ replay buffer, tính gradient và phát hành trọng số mới.
+
+import argparse
+import os
+import queue
+import time
+from collections import deque
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from rapid_roll_env import RapidRollEnv
+from dqn_agent import DQNAgent, QNetwork
+
+STATE_SIZE = 6
+ACTION_SIZE = 3
+MAX_STEPS_PER_EPISODE = 3000
+
+
+def actor_epsilon_floor(actor_id, num_actors, base=0.4, spread=7.0):
+    # Epsilon sàn riêng cho từng actor theo kiểu Ape-X: actor 0 khám phá nhiều, actor cuối gần như tham lam
+    if num_actors == 1:
+        return 0.01
+    return base ** (1 + spread * actor_id / (num_actors - 1))
+
+
+def actor_process(actor_id, num_actors, args, shared_net, weights_version, weights_lock, transition_queue, stop_event):
+    torch.set_num_threads(1)
+    seed = args.seed + actor_id
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+
+    local_net = QNetwork(STATE_SIZE, ACTION_SIZE)
+    with weights_lock:
+        local_net.load_state_dict(shared_net.state_dict())
+        local_version = weights_version.value
+    local_net.eval()
+
+    envs = [RapidRollEnv(headless=True, jump_strength=0.0, seed=seed * 1000 + i) for i in range(args.envs_per_actor)]
+    states = np.stack([env.reset() for env in envs])
+    episode_steps = np.zeros(len(envs), dtype=np.int64)
+    episode_rewards = np.zeros(len(envs))
+    epsilon = 1.0
+    epsilon_floor = actor_epsilon_floor(actor_id, num_actors)
+
+    chunk = []
+    finished_scores = []
+    steps_since_sync = 0
+    try:
+        while not stop_event.is_set():
+            # Một lần forward theo batch cho tất cả env của actor
+            with torch.no_grad():
+                greedy = local_net(torch.from_numpy(states)).argmax(1).numpy()
+            explore = rng.random(len(envs)) < epsilon
+            actions = np.where(explore, rng.integers(0, ACTION_SIZE, len(envs)), greedy)
+
+            next_states = np.empty_like(states)
+            rewards = np.empty(len(envs), dtype=np.float32)
+            dones = np.zeros(len(envs), dtype=np.float32)
+            for i, env in enumerate(envs):
+                next_state, reward, done, _ = env.step(actions[i])
+                next_states[i], rewards[i], dones[i] = next_state, reward, done
+            chunk.append((states, actions, next_states, rewards, dones))
+
+            episode_steps += 1
+            episode_rewards += rewards
+            states = next_states.copy()
+            for i in np.flatnonzero(dones.astype(bool) | (episode_steps >= MAX_STEPS_PER_EPISODE)):
+                finished_scores.append(episode_rewards[i])
+                states[i] = envs[i].reset()
+                episode_steps[i] = 0
+                episode_rewards[i] = 0
+                epsilon = max(epsilon_floor, epsilon * args.epsilon_decay)
+
+            if len(chunk) * len(envs) >= args.chunk_size:
+                batch = tuple(np.concatenate(col) for col in zip(*chunk))
+                transition_queue.put((actor_id, batch, finished_scores))
+                chunk, finished_scores = [], []
+
+            steps_since_sync += 1
+            if steps_since_sync >= args.sync_every and weights_version.value != local_version:
+                with weights_lock:
+                    local_net.load_state_dict(shared_net.state_dict())
+                    local_version = weights_version.value
+                steps_since_sync = 0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Không chờ feeder thread của queue khi thoát, tránh treo nếu learner đã ngừng đọc
+        transition_queue.cancel_join_thread()
+
+
+def publish_weights(agent, shared_net, weights_version, weights_lock):
+    state_dict = {k: v.detach().cpu() for k, v in agent.policy_net.state_dict().items()}
+    with weights_lock:
+        shared_net.load_state_dict(state_dict)
+        weights_version.value += 1
+
+
+def drain(transition_queue, agent, scores_window, max_items=None):
+    transitions = 0
+    items = 0
+    while max_items is None or items < max_items:
+        try:
+            _, batch, scores = transition_queue.get_nowait()
+        except queue.Empty:
+            break
+        agent.memory.push_batch(*batch)
+        scores_window.extend(scores)
+        transitions += len(batch[0])
+        items += 1
+    return transitions
+
+
+def replay_ratio(grad_steps, total_transitions, learn_start):
+    received = total_transitions - learn_start if learn_start is not None else 0
+    return grad_steps / received if received else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--actors', type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument('--envs-per-actor', type=int, default=4)
+    parser.add_argument('--total-steps', type=int, default=2_000_000, help='Tổng số transition cần thu thập')
+    parser.add_argument('--duration', type=float, default=None, help='Giới hạn thời gian huấn luyện (giây)')
+    parser.add_argument('--learner-threads', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=256, help='Số transition mỗi lần actor gửi')
+    parser.add_argument('--sync-every', type=int, default=200, help='Số bước actor giữa các lần kiểm tra trọng số mới')
+    parser.add_argument('--replay-ratio', type=float, default=0.25,
+                        help='Số gradient step trên mỗi transition nhận được; learner chờ actor khi đã đủ (0: không giới hạn)')
+    parser.add_argument('--max-lag', type=int, default=64,
+                        help='Learner tụt lại quá số gradient step này thì ngừng đọc queue, actor chờ ở put() khi queue đầy')
+    parser.add_argument('--publish-every', type=int, default=100, help='Số gradient step giữa các lần phát hành trọng số')
+    parser.add_argument('--target-update-every', type=int, default=2000, help='Số gradient step giữa các lần cập nhật target net')
+    parser.add_argument('--epsilon-decay', type=float, default=0.999)
+    parser.add_argument('--report-every', type=float, default=10.0, help='Chu kỳ in thống kê (giây)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-path', default='dqn_rapid_roll_distributed.pth')
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.learner_threads)
+    agent = DQNAgent(STATE_SIZE, ACTION_SIZE, seed=args.seed)
+
+    ctx = mp.get_context('spawn')
+    shared_net = QNetwork(STATE_SIZE, ACTION_SIZE)
+    shared_net.load_state_dict({k: v.cpu() for k, v in agent.policy_net.state_dict().items()})
+    shared_net.share_memory()
+    weights_version = ctx.Value('i', 0)
+    weights_lock = ctx.Lock()
+    transition_queue = ctx.Queue(maxsize=args.actors * 64)
+    stop_event = ctx.Event()
+
+    actors = [ctx.Process(target=actor_process, daemon=True,
+                          args=(i, args.actors, args, shared_net, weights_version, weights_lock, transition_queue, stop_event))
+              for i in range(args.actors)]
+    for p in actors:
+        p.start()
+
+    print(f"Bắt đầu huấn luyện phân tán: {args.actors} actor x {args.envs_per_actor} env, learner trên {agent.device}")
+
+    scores_window = deque(maxlen=100)
+    total_transitions = 0
+    grad_steps = 0
+    # Số transition lúc learner bắt đầu học; ngân sách cập nhật tính từ mốc này
+    learn_start = None
+    start_time = last_report = time.time()
+    last_transitions = last_grad_steps = 0
+    try:
+        while total_transitions < args.total_steps:
+            if args.duration is not None and time.time() - start_time >= args.duration:
+                break
+            # Learner tụt lại quá max_lag thì để transition nằm trong queue; queue đầy sẽ chặn actor ở put()
+            if (not args.replay_ratio or learn_start is None
+                    or grad_steps + args.max_lag >= args.replay_ratio * (total_transitions - learn_start)):
+                total_transitions += drain(transition_queue, agent, scores_window, max_items=args.actors)
+
+            if learn_start is None:
+                if len(agent.memory) < agent.batch_size:
+                    time.sleep(0.001)
+                    continue
+                learn_start = total_transitions
+            if args.replay_ratio and grad_steps >= args.replay_ratio * (total_transitions - learn_start):
+                # Đã đủ số cập nhật cho lượng transition đã nhận: nhường CPU cho actor thay vì học lại dữ liệu cũ
+                time.sleep(0.001)
+            else:
+                agent.learn()
+                grad_steps += 1
+                if grad_steps % args.target_update_every == 0:
+                    agent.update_target_net()
+                if grad_steps % args.publish_every == 0:
+                    publish_weights(agent, shared_net, weights_version, weights_lock)
+
+            now = time.time()
+            if now - last_report >= args.report_every:
+                dt = now - last_report
+                avg_score = np.mean(scores_window) if scores_window else float('nan')
+                print(f"Transitions: {total_transitions} | {(total_transitions - last_transitions) / dt:.0f} trans/s | "
+                      f"Grad steps: {grad_steps} | {(grad_steps - last_grad_steps) / dt:.1f} steps/s | "
+                      f"Replay ratio: {replay_ratio(grad_steps, total_transitions, learn_start):.3f} | "
+                      f"Replay: {len(agent.memory)} | Avg Score: {avg_score:.2f}")
+                last_report, last_transitions, last_grad_steps = now, total_transitions, grad_steps
+    except KeyboardInterrupt:
+        print("\nNhận tín hiệu dừng, đang tắt các actor...")
+    finally:
+        # Transition đọc ra khi tắt không được học, không tính vào replay ratio
+        final_ratio = replay_ratio(grad_steps, total_transitions, learn_start)
+        stop_event.set()
+        # Đọc hết queue để các actor không bị chặn ở put() trước khi join
+        deadline = time.time() + 10
+        while any(p.is_alive() for p in actors) and time.time() < deadline:
+            drain(transition_queue, agent, scores_window)
+            time.sleep(0.01)
+        for p in actors:
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+
+    elapsed = time.time() - start_time
+    torch.save(agent.policy_net.state_dict(), args.save_path)
+    print(f"\nHoàn tất trong {elapsed / 60:.2f} phút: {total_transitions / elapsed:.0f} trans/s, {grad_steps / elapsed:.1f} grad steps/s, "
+          f"replay ratio {final_ratio:.3f}")
+    print(f"Model đã được lưu tại: {args.save_path}")
+
+
+if __name__ == '__main__':
+    main()
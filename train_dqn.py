@@ -1,86 +1,386 @@
 # train_dqn.py
+# Chạy trực tiếp (python train_dqn.py ...) hoặc import: train(default_config(learning_rate=3e-4, episodes=500))
+# trả về dict kết quả; sweep.py dùng cách này để chạy nhiều trial song song.
 
 import torch
-from rapid_roll_env import RapidRollEnv
+from rapid_roll_env import RapidRollEnv, LevelTable, SCALE_FACTOR
 from dqn_agent import DQNAgent
+from curriculum import Curriculum, default_stages
+from instrumentation import PhaseTimer, MetricsLogger, StepProfiler
+from episode_recorder import EpisodeRecorder, check_appendable
+from async_learner import AsyncLearner
+from checkpoint import CheckpointWriter, load_checkpoint, restore_replay, remove_checkpoint, CHECKPOINT_NAME
 from collections import deque
 import numpy as np
+import argparse
+import random
 import time
 import os
 
-# --- Các tham số huấn luyện ---
+# --- Các tham số huấn luyện (giá trị mặc định, đổi được qua dòng lệnh hoặc train(config)) ---
 NUM_EPISODES = 2000 
 TARGET_UPDATE_FREQ = 10
 LEARN_EVERY_N_STEPS = 4
 PRINT_EVERY = 10
+MAX_EPISODE_TICKS = 3000 # Giới hạn độ dài ván theo frame vật lý, không phụ thuộc frame skip
 
 # --- Tên file model ---
 BEST_MODEL_SAVE_PATH = 'dqn_rapid_roll_best.pth'
 FINAL_MODEL_SAVE_PATH = 'dqn_rapid_roll_final.pth'
 
-# --- Thiết lập môi trường và agent ---
-env = RapidRollEnv(headless=True, jump_strength=0.0)
-state_size = 6
-action_size = 3
-agent = DQNAgent(state_size, action_size)
-
-if os.path.exists(BEST_MODEL_SAVE_PATH):
-    print(f"Phát hiện model cũ '{BEST_MODEL_SAVE_PATH}'. Xóa để huấn luyện lại từ đầu.")
-    os.remove(BEST_MODEL_SAVE_PATH)
-if os.path.exists(FINAL_MODEL_SAVE_PATH):
-    os.remove(FINAL_MODEL_SAVE_PATH)
-
-# --- Bắt đầu huấn luyện ---
-print(f"Bắt đầu huấn luyện trên thiết bị: {agent.device} ở chế độ HEADLESS...")
-print(f"State size: {state_size}, Action size: {action_size}")
-
-scores_window = deque(maxlen=100)
-best_avg_score = -float('inf')
-total_steps = 0
-start_time = time.time()
-
-for episode in range(1, NUM_EPISODES + 1):
-    state = env.reset()
+
+# --- Tham số dòng lệnh ---
+def build_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--episodes', type=int, default=NUM_EPISODES, help='Số ván huấn luyện')
+    parser.add_argument('--target-update-freq', type=int, default=TARGET_UPDATE_FREQ, help='Số ván giữa hai lần cập nhật target network')
+    parser.add_argument('--learn-every', type=int, default=LEARN_EVERY_N_STEPS, help='Số bước env giữa hai lần learn (chế độ đồng bộ)')
+    parser.add_argument('--learning-rate', type=float, default=1e-4)
+    parser.add_argument('--gamma', type=float, default=0.99)
+    parser.add_argument('--epsilon-decay', type=float, default=0.999, help='Hệ số giảm epsilon sau mỗi ván')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--double-dqn', action='store_true', help='Target Double DQN: policy_net chọn hành động, target_net đánh giá')
+    parser.add_argument('--dueling', action='store_true', help='QNetwork với hai đầu V(s) và A(s, a)')
+    parser.add_argument('--n-step', type=int, default=1, help='Return n bước, gộp ngay khi ghi vào replay buffer')
+    parser.add_argument('--step-budget', type=int, default=None, help='Dừng khi tổng số bước env đạt mức này')
+    parser.add_argument('--target-score', type=float, default=None,
+                        help='Dừng khi điểm TB 100 ván đạt mức này; kết quả ghi số bước env đã dùng (steps_to_target)')
+    parser.add_argument('--print-every', type=int, default=PRINT_EVERY, help='Số ván giữa hai dòng tiến độ; 0 để tắt')
+    parser.add_argument('--best-model', default=BEST_MODEL_SAVE_PATH, help='Nơi lưu model có điểm TB cao nhất')
+    parser.add_argument('--final-model', default=FINAL_MODEL_SAVE_PATH, help='Nơi lưu model cuối cùng')
+    parser.add_argument('--seed', type=int, default=None, help='Seed cho env, agent và seed của từng ván')
+    parser.add_argument('--frame-skip', type=int, default=1, help='Lặp lại mỗi hành động trong k frame vật lý (main.py cần cùng giá trị). Thử nghiệm: '
+                        'với k > 1 chưa đạt được điểm như k = 1')
+    parser.add_argument('--next-platforms', type=int, default=0, help='Thêm (dx, dy, is_spike) của K platform kế tiếp vào state')
+    parser.add_argument('--continuous-physics', action='store_true',
+                        help='Toạ độ platform liên tục (snap_platforms_to_pixels=False); cần cho vùng tốc độ cao, xem curriculum.py')
+    parser.add_argument('--curriculum', action='store_true', help='Tăng dần tốc độ bắt đầu ván và lượng gai theo điểm đạt được '
+                                                                  '(curriculum.py); điểm TB khi đó gồm ván ở mọi bậc')
+    parser.add_argument('--curriculum-stages', type=int, default=5, help='Số bậc độ khó của --curriculum')
+    parser.add_argument('--promote-score', type=float, default=10, help='Lên bậc khi điểm TB (số platform) của 50 ván gần nhất ở bậc hiện tại đạt mức này')
+    parser.add_argument('--level-tables', type=int, default=0, help='Lấy bố cục platform từ bảng N màn sinh sẵn theo --seed (0: sinh bằng RNG như cũ)')
+    parser.add_argument('--record-episodes', default=None, help='Ghi seed + chuỗi hành động của mọi ván vào file .rrec')
+    parser.add_argument('--async-learner', action='store_true', help='Chạy learner trên thread nền, song song với env')
+    parser.add_argument('--replay-ratio', type=float, default=None, help='Số cập nhật trên mỗi bước env (chế độ --async-learner); mặc định 1 / --learn-every')
+    parser.add_argument('--sync-every', type=int, default=50, help='Số cập nhật giữa hai lần đồng bộ bản sao suy luận (chế độ --async-learner)')
+    parser.add_argument('--memory-size', type=int, default=100000, help='Dung lượng replay buffer (số transition)')
+    parser.add_argument('--replay-dir', default=None, help='Đặt replay buffer trên đĩa (numpy.memmap) trong thư mục này; '
+                                                             'buffer cũ trong thư mục được dùng tiếp')
+    parser.add_argument('--checkpoint-dir', default='checkpoints', help='Thư mục checkpoint để huấn luyện tiếp')
+    parser.add_argument('--checkpoint-every', type=int, default=0, help='Số ván giữa hai lần checkpoint; 0 (mặc định) để tắt')
+    parser.add_argument('--checkpoint-replay', action='store_true', help='Lưu cả replay buffer (ghi tăng dần) để huấn luyện tiếp bit-for-bit')
+    parser.add_argument('--resume', action='store_true', help='Huấn luyện tiếp từ checkpoint trong --checkpoint-dir')
+    parser.add_argument('--overwrite-checkpoint', action='store_true',
+                        help='Huấn luyện lại từ đầu dù --checkpoint-dir đã có checkpoint (chỉ xoá file checkpoint, không xoá thư mục)')
+    parser.add_argument('--metrics-file', default='training_metrics.jsonl', help='File metric (.jsonl hoặc .csv); chuỗi rỗng để tắt')
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help='Chu kỳ ghi metric (giây)')
+    parser.add_argument('--metrics-max-bytes', type=int, default=10 * 1024 * 1024, help='Kích thước tối đa trước khi xoay vòng file metric')
+    parser.add_argument('--profile', choices=['cprofile', 'torch'], default=None, help='Bật profiler cho một đoạn huấn luyện')
+    parser.add_argument('--profile-steps', type=int, default=2000, help='Số bước env được profile')
+    parser.add_argument('--profile-start', type=int, default=10000, help='Bắt đầu profile sau số bước env này')
+    parser.add_argument('--profile-dir', default='profiles')
+    return parser
+
+
+def default_config(**overrides):
+    # Cấu hình mặc định như khi chạy không tham số dòng lệnh, ghi đè bằng keyword (tên như thuộc tính args)
+    config = build_parser().parse_args([])
+    for name, value in overrides.items():
+        if not hasattr(config, name):
+            raise ValueError(f"Tham số huấn luyện không tồn tại: '{name}'")
+        setattr(config, name, value)
+    return config
+
+
+def train(config, on_episode=None):
+    # on_episode(episode, avg_score) được gọi cuối mỗi ván; trả về True để dừng sớm (sweep.py dùng để loại trial kém)
+
+    # Kiểm tra trước khi xoá hay ghi đè bất cứ thứ gì (model cũ, checkpoint cũ)
+    checkpoint_exists = os.path.exists(os.path.join(config.checkpoint_dir, CHECKPOINT_NAME))
+    if config.resume and not checkpoint_exists:
+        raise SystemExit(f"Không có checkpoint trong '{config.checkpoint_dir}' để huấn luyện tiếp (--resume).")
+    has_old_checkpoint = config.checkpoint_every > 0 and checkpoint_exists
+    if has_old_checkpoint and not config.resume and not config.overwrite_checkpoint:
+        raise SystemExit(f"'{config.checkpoint_dir}' đã có checkpoint. Dùng --resume để huấn luyện tiếp hoặc "
+                         f"--overwrite-checkpoint để huấn luyện lại từ đầu.")
+    if config.record_episodes:
+        try:
+            check_appendable(config.record_episodes)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+    # --- Thiết lập môi trường và agent ---
+    levels = LevelTable(config.seed or 0, config.level_tables) if config.level_tables else None
+    env = RapidRollEnv(headless=True, jump_strength=0.0, seed=config.seed, next_platforms=config.next_platforms,
+                       frame_skip=config.frame_skip, levels=levels, snap_platforms_to_pixels=not config.continuous_physics)
+    curriculum = Curriculum(default_stages(config.curriculum_stages), config.promote_score, seed=config.seed) if config.curriculum else None
+    if curriculum is not None and not config.continuous_physics:
+        print("CẢNH BÁO: với toạ độ platform làm tròn (mặc định), bóng không đứng được trên platform khi tốc độ cuộn "
+              "trên ~1.6; các bậc cao của curriculum cần --continuous-physics.")
+    state_size = env.state_size
+    action_size = 3
+    agent = DQNAgent(state_size, action_size, learning_rate=config.learning_rate, gamma=config.gamma,
+                     epsilon_decay=config.epsilon_decay, batch_size=config.batch_size, memory_size=config.memory_size,
+                     replay_dir=config.replay_dir, double_dqn=config.double_dqn, dueling=config.dueling,
+                     n_step=config.n_step, seed=config.seed)
+    if config.replay_dir and len(agent.memory):
+        print(f"Dùng tiếp {len(agent.memory)} transition trong replay buffer '{config.replay_dir}'.")
+    # Mỗi ván bắt đầu từ một seed riêng để có thể mô phỏng lại chính xác từ file ghi
+    episode_seeds = random.Random(config.seed)
+
+    scores_window = deque(maxlen=100)
+    best_avg_score = -float('inf')
+    total_steps = 0
+    start_episode = 1
+    elapsed_before = 0.0
+    checkpoint = None
+    if config.resume:
+        checkpoint = load_checkpoint(config.checkpoint_dir)
+        if checkpoint['state_size'] != state_size or checkpoint['frame_skip'] != config.frame_skip:
+            raise SystemExit(f"Checkpoint được tạo với state size {checkpoint['state_size']}, frame skip {checkpoint['frame_skip']}; "
+                             f"hiện tại là {state_size}, {config.frame_skip}")
+        agent.load_training_state(checkpoint['agent'])
+        if not restore_replay(agent.memory, config.checkpoint_dir, checkpoint) and not config.replay_dir:
+            print("Checkpoint không có replay buffer: huấn luyện tiếp với buffer rỗng (không còn bit-for-bit).")
+        episode_seeds.setstate(checkpoint['episode_seeds'])
+        if curriculum is not None and checkpoint.get('curriculum') is not None:
+            curriculum.load_state_dict(checkpoint['curriculum'])
+        scores_window.extend(checkpoint['scores_window'])
+        best_avg_score = checkpoint['best_avg_score']
+        total_steps = checkpoint['total_steps']
+        start_episode = checkpoint['episode'] + 1
+        elapsed_before = checkpoint['elapsed']
+        if config.record_episodes and checkpoint['recorder_offset'] is not None:
+            # Bỏ các ván ghi sau checkpoint; chúng sẽ được chơi lại y hệt
+            if os.path.getsize(config.record_episodes) < checkpoint['recorder_offset']:
+                raise SystemExit(f"File ghi ván '{config.record_episodes}' ngắn hơn lúc checkpoint")
+            os.truncate(config.record_episodes, checkpoint['recorder_offset'])
+        print(f"Huấn luyện tiếp từ '{config.checkpoint_dir}' sau ván {checkpoint['episode']} ({total_steps} bước, "
+              f"replay {len(agent.memory)} transition).")
+    elif has_old_checkpoint:
+        print(f"Xóa checkpoint cũ trong '{config.checkpoint_dir}' để huấn luyện lại từ đầu (--overwrite-checkpoint).")
+        remove_checkpoint(config.checkpoint_dir)
+    checkpoints = CheckpointWriter(config.checkpoint_dir, config.checkpoint_replay, checkpoint) if config.checkpoint_every > 0 else None
+
+    recorder = EpisodeRecorder(config.record_episodes) if config.record_episodes else None
+    replay_ratio = config.replay_ratio if config.replay_ratio is not None else 1 / config.learn_every
+    learner = AsyncLearner(agent, replay_ratio=replay_ratio, sync_every=config.sync_every) if config.async_learner else None
+
+    PHASES = ('act', 'env', 'replay_push', 'replay_sample', 'forward', 'backward', 'target_update', 'save', 'other')
+    timer = PhaseTimer(PHASES)
+    agent.timer = timer
+    metrics = MetricsLogger(config.metrics_file, config.metrics_interval, config.metrics_max_bytes) if config.metrics_file else None
+    profiler = StepProfiler(config.profile, config.profile_steps, config.profile_start, config.profile_dir) if config.profile else None
+
+    if not config.resume and os.path.exists(config.best_model):
+        print(f"Phát hiện model cũ '{config.best_model}'. Xóa để huấn luyện lại từ đầu.")
+        os.remove(config.best_model)
+    if os.path.exists(config.final_model):
+        os.remove(config.final_model)
+
+    # --- Bắt đầu huấn luyện ---
+    print(f"Bắt đầu huấn luyện trên thiết bị: {agent.device} ở chế độ HEADLESS...")
+    print(f"State size: {state_size}, Action size: {action_size}, Frame skip: {config.frame_skip}")
+
+    start_time = time.time() - elapsed_before
+    last_log = {'time': time.perf_counter(), 'steps': total_steps, 'learn_steps': agent.learn_steps}
     total_reward = 0
-    done = False
+    current_avg_score = np.mean(scores_window) if scores_window else 0.0
+
+    def log_metrics(episode):
+        now = time.perf_counter()
+        dt = now - last_log['time']
+        phases = timer.snapshot()
+        record = {
+            'time': time.time(),
+            'episode': episode,
+            'total_steps': total_steps,
+            'steps_per_sec': (total_steps - last_log['steps']) / dt,
+            'updates_per_sec': (agent.learn_steps - last_log['learn_steps']) / dt,
+            'replay_size': len(agent.memory),
+            'replay_capacity': agent.memory.capacity,
+            'loss': agent.last_loss.item() if agent.last_loss is not None else None,
+            'mean_q': agent.last_mean_q.item() if agent.last_mean_q is not None else None,
+            'epsilon': agent.epsilon,
+            'last_score': total_reward,
+            'avg_score': current_avg_score,
+        }
+        if curriculum is not None:
+            record['curriculum_stage'] = curriculum.stage
+        record.update({f"time_{phase}": seconds for phase, seconds in phases.items()})
+        if learner is not None:
+            record.update(learner.stats())
+        if checkpoints is not None:
+            record.update(checkpoint_capture_seconds=checkpoints.last_capture_seconds,
+                          checkpoint_write_seconds=checkpoints.last_write_seconds)
+        metrics.write(record)
+        last_log.update(time=now, steps=total_steps, learn_steps=agent.learn_steps)
+
+    def save_checkpoint(episode):
+        # Chụp trạng thái trên thread chính (nhanh), ghi đĩa trên thread nền
+        state = {
+            'agent': agent.training_state(),
+            'episode': episode,
+            'total_steps': total_steps,
+            'best_avg_score': best_avg_score,
+            'scores_window': list(scores_window),
+            'episode_seeds': episode_seeds.getstate(),
+            'curriculum': curriculum.state_dict() if curriculum is not None else None,
+            'elapsed': time.time() - start_time,
+            'recorder_offset': recorder.tell() if recorder is not None else None,
+            'state_size': state_size,
+            'frame_skip': config.frame_skip,
+        }
+        checkpoints.save(state, learner.memory if learner is not None else agent.memory)
+
+    if learner is not None:
+        learner.start()
+    timer.mark()
+    episode = start_episode - 1
+    stopped_early = False
+    steps_to_target = None
+    for episode in range(start_episode, config.episodes + 1):
+        episode_seed = episode_seeds.getrandbits(63)
+        state = env.reset(seed=episode_seed, difficulty=curriculum.next_difficulty() if curriculum is not None else None)
+        if recorder is not None:
+            recorder.begin(env, episode_seed)
+        total_reward = 0
+        done = False
     
-    for step in range(3000): # Giới hạn số bước
-        total_steps += 1
-        action = agent.choose_action(state)
-        next_state, reward, done, _ = env.step(action)
-        agent.memory.push(state, action, next_state, reward)
-        state = next_state
-        total_reward += reward
+        for step in range(-(-MAX_EPISODE_TICKS // config.frame_skip)): # Giới hạn số bước
+            total_steps += 1
+            action = learner.act(state) if learner is not None else agent.choose_action(state)
+            timer.lap('act')
+            next_state, reward, done, _ = env.step(action)
+            timer.lap('env')
+            if recorder is not None:
+                recorder.record(action)
+            if learner is not None:
+                learner.push(state, action, next_state, reward, done)
+            else:
+                agent.memory.push(state, action, next_state, reward, done)
+            timer.lap('replay_push')
+            state = next_state
+            total_reward += reward
         
-        if total_steps % LEARN_EVERY_N_STEPS == 0:
-            agent.learn()
+            if learner is None and total_steps % config.learn_every == 0:
+                agent.learn()
+
+            if profiler is not None:
+                profiler.step()
+            if metrics is not None and total_steps % 256 == 0 and metrics.due():
+                log_metrics(episode)
+            timer.lap('other')
         
-        if done:
-            break
+            if done:
+                break
 
-    if episode % TARGET_UPDATE_FREQ == 0:
-        agent.update_target_net()
+        if recorder is not None:
+            recorder.end(env.score, done, total_reward)
+        if not done:
+            # Ván bị cắt vì giới hạn số bước: các bước n-step còn chờ không có return đầy đủ
+            if learner is not None:
+                learner.end_episode()
+            else:
+                agent.memory.end_episode()
+        if config.replay_dir:
+            if learner is not None:
+                learner.flush()
+            agent.memory.flush()
+
+        if episode % config.target_update_freq == 0:
+            if learner is not None:
+                learner.request_target_update()
+            else:
+                agent.update_target_net()
+            timer.lap('target_update')
     
-    agent.update_epsilon()
+        agent.update_epsilon()
+        if curriculum is not None and curriculum.record(env.score):
+            d = curriculum.stages[curriculum.stage]
+            print(f"Ván {episode}: lên bậc {curriculum.stage}/{len(curriculum.stages) - 1} (tốc độ bắt đầu "
+                  f"{d.initial_scroll_speed / SCALE_FACTOR:.2f}, gai {d.spike_chance:.0%})")
     
-    scores_window.append(total_reward)
-    current_avg_score = np.mean(scores_window)
-
-    if len(scores_window) == 100 and current_avg_score > best_avg_score:
-        best_avg_score = current_avg_score
-        torch.save(agent.policy_net.state_dict(), BEST_MODEL_SAVE_PATH)
-        print(f"\n--- Episode {episode}: KỶ LỤC MỚI! Điểm TB: {current_avg_score:.2f}. Đã lưu model. ---\n")
-
-    if episode % PRINT_EVERY == 0:
-        elapsed_time = time.time() - start_time
-        eps_per_sec = episode / elapsed_time if elapsed_time > 0 else 0
-        print(f"E: {episode}/{NUM_EPISODES} | Avg Score: {current_avg_score:.2f} | Best Avg: {best_avg_score:.2f} | Epsilon: {agent.epsilon:.4f} | Steps: {total_steps} | Speed: {eps_per_sec:.2f} eps/s")
-
-
-# --- Kết thúc và lưu model cuối cùng ---
-total_training_time = time.time() - start_time
-print(f"\nHuấn luyện hoàn tất trong {total_training_time / 60:.2f} phút.")
-torch.save(agent.policy_net.state_dict(), FINAL_MODEL_SAVE_PATH)
-print(f"Model cuối cùng đã được lưu tại: {FINAL_MODEL_SAVE_PATH}")
-print(f"Model tốt nhất trong quá trình huấn luyện được lưu tại: {BEST_MODEL_SAVE_PATH}")
-print(f"Điểm số trung bình cao nhất đạt được: {best_avg_score:.2f}")
\ No newline at end of file
+        scores_window.append(total_reward)
+        current_avg_score = np.mean(scores_window)
+
+        if len(scores_window) == 100 and current_avg_score > best_avg_score:
+            best_avg_score = current_avg_score
+            best_state_dict = learner.snapshot_state_dict() if learner is not None else agent.policy_net.state_dict()
+            if checkpoints is not None:
+                checkpoints.save_state_dict(best_state_dict, config.best_model)
+            else:
+                torch.save(best_state_dict, config.best_model)
+            timer.lap('save')
+            print(f"\n--- Episode {episode}: KỶ LỤC MỚI! Điểm TB: {current_avg_score:.2f}. Đã lưu model. ---\n")
+
+        if config.print_every and episode % config.print_every == 0:
+            elapsed_time = time.time() - start_time
+            eps_per_sec = episode / elapsed_time if elapsed_time > 0 else 0
+            stage = f" | Stage: {curriculum.stage}" if curriculum is not None else ""
+            print(f"E: {episode}/{config.episodes} | Avg Score: {current_avg_score:.2f} | Best Avg: {best_avg_score:.2f} | Epsilon: {agent.epsilon:.4f} | Steps: {total_steps} | Speed: {eps_per_sec:.2f} eps/s{stage}")
+        timer.lap('other')
+
+        if checkpoints is not None and (episode % config.checkpoint_every == 0 or episode == config.episodes):
+            if learner is not None:
+                with learner.paused():
+                    save_checkpoint(episode)
+            else:
+                save_checkpoint(episode)
+            timer.lap('save')
+
+        if config.target_score is not None and len(scores_window) == 100 and current_avg_score >= config.target_score:
+            steps_to_target = total_steps
+            print(f"\nĐạt điểm TB {config.target_score} sau ván {episode} ({total_steps} bước env).")
+            break
+
+        if config.step_budget is not None and total_steps >= config.step_budget:
+            print(f"\nĐã dùng hết {config.step_budget} bước env sau ván {episode}.")
+            break
+
+        if on_episode is not None and on_episode(episode, current_avg_score):
+            print(f"\nDừng sớm sau ván {episode} (điểm TB {current_avg_score:.2f}).")
+            stopped_early = True
+            break
+
+    if learner is not None:
+        learner.stop()
+        stats = learner.stats()
+        print(f"Async learner: {stats['async_updates']} cập nhật | replay ratio {stats['async_replay_ratio']:.3f} | "
+              f"learner bận {stats['async_learner_busy_frac']:.0%} | actor chờ {stats['async_actor_wait_frac']:.0%} | "
+              f"độ chồng lấn {stats['async_concurrency']:.2f}")
+    if profiler is not None:
+        profiler.stop()
+    if metrics is not None:
+        log_metrics(episode)
+        metrics.close()
+    if recorder is not None:
+        recorder.close()
+    if config.replay_dir:
+        agent.memory.close()
+    if checkpoints is not None:
+        checkpoints.close()
+        print(f"Checkpoint: chụp {checkpoints.last_capture_seconds * 1000:.1f} ms trên thread chính, "
+              f"ghi {checkpoints.last_write_seconds * 1000:.1f} ms trên thread nền ('{config.checkpoint_dir}')")
+
+    # --- Kết thúc và lưu model cuối cùng ---
+    total_training_time = time.time() - start_time
+    print(f"\nHuấn luyện hoàn tất trong {total_training_time / 60:.2f} phút.")
+    torch.save(agent.policy_net.state_dict(), config.final_model)
+    print(f"Model cuối cùng đã được lưu tại: {config.final_model}")
+    print(f"Model tốt nhất trong quá trình huấn luyện được lưu tại: {config.best_model}")
+    print(f"Điểm số trung bình cao nhất đạt được: {best_avg_score:.2f}")
+    return {
+        'episodes': episode,
+        'total_steps': total_steps,
+        'best_avg_score': best_avg_score,
+        'final_avg_score': float(current_avg_score),
+        'stopped_early': stopped_early,
+        'steps_to_target': steps_to_target,
+        'curriculum_stage': curriculum.stage if curriculum is not None else None,
+        'seconds': total_training_time,
+    }
+
+
+if __name__ == '__main__':
+    train(build_parser().parse_args())
\ No newline at end of file
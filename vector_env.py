@@ -0,0 +1,201 @@
+# vector_env.py
+
+import numpy as np
+from rapid_roll_env import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, SCALE_FACTOR, BALL_RADIUS, PLATFORM_WIDTH, PLATFORM_HEIGHT,
+    BALL_SPEED, GRAVITY, SPIKE_CHANCE, INITIAL_SCROLL_SPEED, MAX_SCROLL_SPEED, SPEED_INCREASE_RATE,
+)
+
+NUM_PLATFORMS = 15
+STATE_SIZE = 6
+
+# Khi snap_platforms_to_pixels=True (mặc định, giống RapidRollEnv), toạ độ platform là số nguyên:
+# cắt phần thập phân khi tạo, làm tròn xa số 0 mỗi lần cuộn; hộp va chạm của bóng cũng bị cắt.
+# Khi tắt, ngưỡng tiếp đất cộng thêm tốc độ cuộn như RapidRollEnv.
+_PLATFORM_W = int(PLATFORM_WIDTH)
+_PLATFORM_H = int(PLATFORM_HEIGHT)
+_BALL_SIZE = int(BALL_RADIUS * 2)
+_GAP_LOW, _GAP_HIGH = int(80 * SCALE_FACTOR), int(120 * SCALE_FACTOR)
+_X_HIGH = int(SCREEN_WIDTH - PLATFORM_WIDTH)
+# Dịch chuyển ngang theo hành động (0: trái, 1: đứng yên, 2: phải); x + (-s) bằng đúng x - s
+_ACTION_DX = np.array([-BALL_SPEED, 0.0, BALL_SPEED])
+
+
+# --- N ván RapidRollEnv chạy song song trên mảng NumPy (headless, tự reset khi kết thúc) ---
+# step(actions) trả về (states, rewards, dones, info). Với các ván vừa kết thúc, states là trạng
+# thái sau reset; trạng thái cuối nằm ở info['final_state'], điểm ở info['final_score'].
+class VectorRapidRollEnv:
+    def __init__(self, num_envs, jump_strength=0.0, seed=None, snap_platforms_to_pixels=True):
+        self.num_envs = num_envs
+        self.jump_boost = -jump_strength * SCALE_FACTOR
+        self.snap_platforms_to_pixels = snap_platforms_to_pixels
+        self.rng = np.random.default_rng(seed)
+
+        self.ball_x = np.zeros(num_envs)
+        self.ball_y = np.zeros(num_envs)
+        self.ball_vy = np.zeros(num_envs)
+        self.scroll_speed = np.zeros(num_envs)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        # Bảng platform kích thước cố định. Mỗi hàng là một vòng tròn đã sắp theo y: platform cao nhất ở ô
+        # head, các ô tiếp theo (head + k) % NUM_PLATFORMS thấp dần. Platform cuộn qua mép trên luôn là ô
+        # head và được thay bằng platform mới nối tiếp platform thấp nhất (ô head - 1), nên thứ tự giữ nguyên
+        # và mọi phép tìm platform chỉ cần đếm số platform phía trên một mức y.
+        self.platform_x = np.zeros((num_envs, NUM_PLATFORMS))
+        self.platform_y = np.zeros((num_envs, NUM_PLATFORMS))
+        self.platform_spike = np.zeros((num_envs, NUM_PLATFORMS), dtype=bool)
+        self.head = np.zeros(num_envs, dtype=np.int64)
+        self._rows = np.arange(num_envs)
+        self._row_offsets = self._rows * NUM_PLATFORMS
+        self._scratch = np.empty((num_envs, NUM_PLATFORMS))
+        self.reset()
+
+    def reset(self):
+        self._reset_rows(self._rows)
+        return self._get_state()
+
+    def _reset_rows(self, rows):
+        n = len(rows)
+        if n == 0:
+            return
+        self.ball_x[rows] = SCREEN_WIDTH / 2
+        self.ball_y[rows] = 100 * SCALE_FACTOR
+        self.ball_vy[rows] = 0.0
+        self.scroll_speed[rows] = INITIAL_SCROLL_SPEED
+        self.score[rows] = 0
+        self.head[rows] = 0
+
+        first_y = 100 * SCALE_FACTOR + 50 * SCALE_FACTOR
+        gaps = self.rng.integers(_GAP_LOW, _GAP_HIGH + 1, size=(n, NUM_PLATFORMS - 1))
+        self.platform_y[rows, 0] = np.trunc(first_y)
+        self.platform_y[rows, 1:] = np.trunc(first_y) + np.cumsum(gaps, axis=1)
+        self.platform_x[rows, 0] = np.trunc(SCREEN_WIDTH / 2 - PLATFORM_WIDTH / 2)
+        self.platform_x[rows, 1:] = self.rng.integers(0, _X_HIGH + 1, size=(n, NUM_PLATFORMS - 1))
+        self.platform_spike[rows, 0] = False
+        self.platform_spike[rows, 1:] = self.rng.random((n, NUM_PLATFORMS - 1)) < SPIKE_CHANCE
+
+    def _first_below(self, rows, above_mask):
+        # above_mask: platform nào nằm trên một mức y (luôn là một đoạn đầu của vòng tròn). Trả về ô (chỉ số
+        # phẳng) của platform đầu tiên không thuộc đoạn đó trên mỗi hàng, và hàng đó có platform như vậy không.
+        # rows=None: mọi hàng (tránh sao chép khi chạy cả batch)
+        above = np.add.reduce(above_mask, axis=1)
+        slots = self.head + above if rows is None else self.head[rows] + above
+        slots[slots >= NUM_PLATFORMS] -= NUM_PLATFORMS
+        slots += self._row_offsets if rows is None else self._row_offsets[rows]
+        return slots, above < NUM_PLATFORMS
+
+    def _get_state(self, rows=None):
+        if rows is None:
+            platform_y, ball_x, ball_y = self.platform_y, self.ball_x, self.ball_y
+            ball_vy, scroll_speed = self.ball_vy, self.scroll_speed
+        else:
+            platform_y, ball_x, ball_y = self.platform_y[rows], self.ball_x[rows], self.ball_y[rows]
+            ball_vy, scroll_speed = self.ball_vy[rows], self.scroll_speed[rows]
+        closest, has_below = self._first_below(rows, platform_y <= ball_y[:, None])
+        closest_x = self.platform_x.ravel()[closest] + _PLATFORM_W // 2
+        closest_y = self.platform_y.ravel()[closest]
+
+        relative_px = np.where(has_below, closest_x, SCREEN_WIDTH / 2) - ball_x
+        relative_py = np.where(has_below, closest_y - ball_y, SCREEN_HEIGHT)
+        is_next_spike = has_below & self.platform_spike.ravel()[closest]
+        normalized_speed = (scroll_speed - INITIAL_SCROLL_SPEED) / (MAX_SCROLL_SPEED - INITIAL_SCROLL_SPEED)
+
+        state = np.empty((len(ball_x), STATE_SIZE), dtype=np.float32)
+        state[:, 0] = ball_x / SCREEN_WIDTH
+        state[:, 1] = ball_vy / (10 * SCALE_FACTOR)
+        state[:, 2] = relative_px / (SCREEN_WIDTH / 2)
+        state[:, 3] = relative_py / SCREEN_HEIGHT
+        state[:, 4] = is_next_spike
+        state[:, 5] = np.minimum(np.maximum(normalized_speed, 0), 1)
+        return state
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+
+        speed = self.scroll_speed
+        speed[speed < MAX_SCROLL_SPEED] += SPEED_INCREASE_RATE
+
+        ball_x = self.ball_x
+        ball_x += _ACTION_DX[actions]
+        np.minimum(np.maximum(ball_x, BALL_RADIUS, out=ball_x), SCREEN_WIDTH - BALL_RADIUS, out=ball_x)
+        self.ball_vy += GRAVITY
+        self.ball_y += self.ball_vy
+        platform_y = self.platform_y
+        platform_y -= speed[:, None]
+        if self.snap_platforms_to_pixels:
+            # Làm tròn xa số 0 tại chỗ: trunc(y + copysign(0.5, y))
+            scratch = np.copysign(0.5, platform_y, out=self._scratch)
+            scratch += platform_y
+            np.trunc(scratch, out=platform_y)
+
+        rewards = np.full(self.num_envs, 0.1)
+
+        # Va chạm AABB giống ball_rect.colliderect(p). Khoảng cách giữa các platform lớn hơn
+        # chiều cao bóng + platform nên mỗi ván chỉ có tối đa một ứng viên: platform trên cùng
+        # có đáy thấp hơn đỉnh bóng, tức platform cao nhất có y > đỉnh bóng - chiều cao platform.
+        ball_top = self.ball_y - BALL_RADIUS
+        ball_left = ball_x - BALL_RADIUS
+        if self.snap_platforms_to_pixels:
+            ball_top, ball_left = np.trunc(ball_top), np.trunc(ball_left)
+        ball_size = _BALL_SIZE if self.snap_platforms_to_pixels else BALL_RADIUS * 2
+        ball_bottom = ball_top + ball_size
+        cand, reach = self._first_below(None, platform_y + _PLATFORM_H <= ball_top[:, None])
+        cand_y = platform_y.ravel()[cand]
+        cand_x = self.platform_x.ravel()[cand]
+        vy = self.ball_vy
+        landing_tolerance = vy + 2 if self.snap_platforms_to_pixels else vy + 2 + speed
+        hit = ((vy > 0) & reach
+               & (ball_left < cand_x + _PLATFORM_W) & (ball_left + ball_size > cand_x)
+               & (ball_bottom > cand_y) & (np.abs(ball_bottom - cand_y) < landing_tolerance))
+        hit_spike = hit & self.platform_spike.ravel()[cand]
+        landed = hit & ~hit_spike
+
+        if landed.any():
+            self.ball_y[landed] = cand_y[landed] - BALL_RADIUS
+            vy[landed] = self.jump_boost
+            rewards[landed] = 10
+        rewards[hit_spike] = -200
+
+        # Ván chết vì gai kết thúc ngay, không cuộn bỏ platform và không phạt biên
+        alive = ~hit_spike
+        passed = platform_y.ravel()[self._row_offsets + self.head] + _PLATFORM_H <= 0
+        if passed.any():
+            self._respawn(np.flatnonzero(passed & alive), rewards)
+        at_edge = (ball_x < SCREEN_WIDTH * 0.1) | (ball_x > SCREEN_WIDTH * 0.9)
+        np.subtract(rewards, 0.5, out=rewards, where=at_edge & alive)
+
+        fell = alive & ((self.ball_y - BALL_RADIUS > SCREEN_HEIGHT) | (self.ball_y + BALL_RADIUS < 0))
+        rewards[fell] = -100
+        dones = hit_spike | fell
+
+        states = self._get_state()
+        info = {}
+        if dones.any():
+            done_rows = np.flatnonzero(dones)
+            info['final_state'] = states[done_rows]
+            info['final_score'] = self.score[done_rows].copy()
+            info['done_rows'] = done_rows
+            self._reset_rows(done_rows)
+            states[done_rows] = self._get_state(done_rows)
+        return states, rewards, dones, info
+
+    def _respawn(self, rows, rewards):
+        # Mỗi vòng thay platform ở ô head của mỗi hàng đã cuộn qua mép trên bằng platform mới nối tiếp
+        # platform thấp nhất (ô head - 1), như vòng while của RapidRollEnv, rồi dịch head sang ô kế
+        platform_y = self.platform_y.ravel()
+        while len(rows):
+            n = len(rows)
+            offsets = self._row_offsets[rows]
+            head = self.head[rows]
+            last_y = platform_y[offsets + (head - 1) % NUM_PLATFORMS]
+            # Chỉ xảy ra khi mọi platform của hàng đều đã qua mép trên
+            last_y[last_y + _PLATFORM_H <= 0] = 0
+            slots = offsets + head
+            platform_y[slots] = last_y + self.rng.integers(_GAP_LOW, _GAP_HIGH + 1, size=n)
+            self.platform_x.ravel()[slots] = self.rng.integers(0, _X_HIGH + 1, size=n)
+            self.platform_spike.ravel()[slots] = self.rng.random(n) < SPIKE_CHANCE
+            self.score[rows] += 1
+            rewards[rows] += 2
+            head += 1
+            head[head == NUM_PLATFORMS] = 0
+            self.head[rows] = head
+            rows = rows[platform_y[offsets + head] + _PLATFORM_H <= 0]
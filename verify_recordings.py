@@ -0,0 +1,67 @@
+# verify_recordings.py
+# Mô phỏng lại hàng loạt ván đã ghi (episode_recorder) trên nhiều tiến trình và kiểm tra điểm,
+# tổng reward, trạng thái kết thúc và digest trạng thái mô phỏng có khớp từng bit với lúc ghi hay không.
+#
+#   python verify_recordings.py episodes.rrec [more.rrec ...] --workers 8
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from episode_recorder import read_episodes, replay_episode
+
+
+def verify_batch(records):
+    mismatches = []
+    steps = 0
+    for record in records:
+        replayed = replay_episode(record)
+        recorded = (len(record.actions), record.score, record.done, record.total_reward, record.state_digest)
+        steps += len(record.actions)
+        if replayed != recorded:
+            mismatches.append((record.seed, recorded, replayed))
+    return len(records), steps, mismatches
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=32, help='Số ván mỗi tác vụ gửi cho tiến trình con')
+    args = parser.parse_args()
+
+    start = time.time()
+    episodes = steps = 0
+    mismatches = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for path in args.paths:
+            for n, s, bad in pool.map(verify_batch, batched(read_episodes(path), args.batch_size)):
+                episodes += n
+                steps += s
+                mismatches.extend(bad)
+
+    elapsed = time.time() - start
+    print(f"Đã mô phỏng lại {episodes} ván ({steps} bước) trong {elapsed:.2f}s: "
+          f"{episodes / elapsed:.1f} ván/s, {steps / elapsed:.0f} bước/s")
+    if mismatches:
+        print(f"KHÔNG KHỚP: {len(mismatches)} ván")
+        for seed, recorded, replayed in mismatches[:20]:
+            print(f"  seed={seed}: ghi {recorded}, mô phỏng lại {replayed}")
+        raise SystemExit(1)
+    print("Tất cả các ván khớp (số bước, điểm, trạng thái kết thúc, tổng reward, digest trạng thái).")
+
+
+if __name__ == '__main__':
+    main()